@@ -8,9 +8,14 @@ import type { CatalogRequest, CatalogResponse } from '@/types/book';
  */
 export const getCatalog = async (params: CatalogRequest): Promise<CatalogResponse> => {
   try {
-    const requestData = {
+    const requestData: CatalogRequest = {
       novel_id: params.novel_id
     };
+    // 分页请求：只返回该范围的章节
+    if (params.offset !== undefined || params.limit !== undefined) {
+      requestData.offset = params.offset ?? 0;
+      requestData.limit = params.limit;
+    }
     
     const response = await httpClient.post<CatalogResponse>('/api/catalog', requestData, {
       headers: {
@@ -24,8 +29,9 @@ export const getCatalog = async (params: CatalogRequest): Promise<CatalogRespons
     }
     
     // 确保章节数据完整性
+    const firstIndex = response.page?.offset || 0;
     response.data.chapters = response.data.chapters.map((chapter, index) => ({
-      title: chapter.title || `第${index + 1}章`,
+      title: chapter.title || `第${firstIndex + index + 1}章`,
       url: chapter.url || '',
     }));
     
@@ -34,7 +40,7 @@ export const getCatalog = async (params: CatalogRequest): Promise<CatalogRespons
       novel_id: response.data.novel_info.novel_id || '',
       novel_title: response.data.novel_info.novel_title || '未知书名',
       author: response.data.novel_info.author || '未知作者',
-      total_chapters: response.data.novel_info.total_chapters || response.data.chapters.length,
+      total_chapters: response.page?.total || response.data.novel_info.total_chapters || response.data.chapters.length,
       domain: response.data.novel_info.domain || '',
       detail_url: response.data.novel_info.detail_url || '',
     };
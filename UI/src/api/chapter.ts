@@ -0,0 +1,30 @@
+import httpClient from '@/utils/request';
+import type { ChapterResponse } from '@/types/book';
+
+/**
+ * 获取章节内容（在线阅读），服务端同时在后台预取其后的章节
+ * @param bookName 书名
+ * @param chapterIndex 章节索引（从1开始）
+ * @returns 清洗后的章节内容
+ */
+export const getChapter = async (bookName: string, chapterIndex: number): Promise<ChapterResponse> => {
+  try {
+    const response = await httpClient.get<ChapterResponse>(
+      `/api/chapter/${encodeURIComponent(bookName)}/${chapterIndex}`
+    );
+
+    if (!response.data || typeof response.data.content !== 'string') {
+      throw new Error('章节数据格式错误');
+    }
+
+    return response;
+  } catch (error: any) {
+    console.error('[API] 获取章节失败:', error);
+
+    throw {
+      status: 'error',
+      message: error.message || '获取章节失败，请重试',
+      data: null,
+    };
+  }
+};
@@ -4,7 +4,8 @@ import type {
   StartDownloadResponse,
   DownloadStatusResponse,
   DownloadTasksResponse,
-  BatchOperationRequest
+  BatchOperationRequest,
+  DownloadFormat
 } from '@/types/download';
 import type { ApiResponse } from '@/types/common';
 
@@ -82,6 +83,8 @@ export const getDownloadStatus = async (taskId: string): Promise<DownloadStatusR
       total: response.data.total || 0,
       percentage: response.data.percentage || 0,
       failed_chapters: response.data.failed_chapters || [],
+      message: response.data.message,
+      resumable: response.data.resumable,
       created_at: response.data.created_at,
       updated_at: response.data.updated_at,
       error_message: response.data.error_message,
@@ -136,6 +139,30 @@ export const stopDownload = async (taskId: string): Promise<ApiResponse> => {
   }
 };
 
+/**
+ * 继续已暂停或已停止的下载任务（从中断处继续，已下载的章节不会重新下载）
+ * @param taskId 任务ID
+ * @returns 操作结果
+ */
+export const resumeDownload = async (taskId: string): Promise<ApiResponse> => {
+  try {
+    const response = await httpClient.post<ApiResponse>(`/api/download/resume/${taskId}`, {}, {
+      headers: {
+        'Content-Type': 'application/json'
+      }
+    });
+    return response;
+  } catch (error: any) {
+    console.error('[API] 继续下载失败:', error);
+    
+    throw {
+      status: 'error',
+      message: error.message || '继续下载失败',
+      data: null,
+    } as ApiResponse;
+  }
+};
+
 /**
  * 获取所有下载任务
  * @returns 下载任务列表
@@ -160,6 +187,7 @@ export const getDownloadTasks = async (): Promise<DownloadTasksResponse> => {
       total: task.total || 0,
       percentage: task.percentage || 0,
       failed_chapters: task.failed_chapters || [],
+      resumable: task.resumable,
       created_at: task.created_at,
       updated_at: task.updated_at,
       error_message: task.error_message,
@@ -232,4 +260,15 @@ export const retryFailedChapters = async (
       data: null,
     } as ApiResponse;
   }
-};
\ No newline at end of file
+};
+
+/**
+ * 获取已下载小说文件的下载地址（浏览器直接下载，支持断点续传）
+ * @param bookName 书名
+ * @param mode 文件格式
+ * @returns 文件下载地址
+ */
+export const getDownloadFileUrl = (bookName: string, mode: DownloadFormat = 'txt'): string => {
+  const baseUrl = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
+  return `${baseUrl}/api/download/file/${encodeURIComponent(bookName)}?mode=${mode}`;
+};
@@ -9,6 +9,7 @@ export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:80
 export * from './search';
 export * from './catalog';
 export * from './download';
+export * from './chapter';
 
 // 健康检查接口
 export const healthCheck = async (): Promise<ApiResponse> => {
@@ -46,6 +47,11 @@ export const createAPI = (): BookCrawlerAPI => {
       return stopDownload(taskId);
     },
     
+    resumeDownload: async (taskId) => {
+      const { resumeDownload } = await import('./download');
+      return resumeDownload(taskId);
+    },
+    
     getDownloadTasks: async () => {
       const { getDownloadTasks } = await import('./download');
       return getDownloadTasks();
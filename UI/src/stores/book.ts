@@ -17,6 +17,9 @@ const STORAGE_KEYS = {
   BOOK_CATALOG: 'book_crawler_book_catalog'
 };
 
+// 目录分页大小：先显示第一页，其余章节在后台逐页加载
+const CATALOG_PAGE_SIZE = 200;
+
 export const useBookStore = defineStore('book', () => {
   // 状态
   const currentBook = ref<BookDetail | null>(
@@ -85,20 +88,24 @@ export const useBookStore = defineStore('book', () => {
     clearError();
 
     try {
-      const response = await getCatalog({ novel_id: novelId });
+      const response = await getCatalog({ novel_id: novelId, offset: 0, limit: CATALOG_PAGE_SIZE });
       
       if (response.status === 'success' && response.data) {
         bookCatalog.value = response.data;
-        sessionStorage.set(STORAGE_KEYS.BOOK_CATALOG, response.data);
         
         // 更新当前书籍信息
         if (currentBook.value) {
           currentBook.value.catalog = response.data;
           currentBook.value.total_chapters = response.data.novel_info.total_chapters;
-          sessionStorage.set(STORAGE_KEYS.CURRENT_BOOK, currentBook.value);
         }
         
         clearError();
+        if (response.page?.has_more) {
+          // 第一页已可显示，其余章节在后台加载
+          void loadRemainingChapters(novelId, bookCatalog.value, response.page.offset + response.page.limit);
+        } else {
+          saveCatalog(response.data);
+        }
       } else {
         throw new Error(response.message || '加载目录失败');
       }
@@ -115,6 +122,32 @@ export const useBookStore = defineStore('book', () => {
     }
   };
 
+  const loadRemainingChapters = async (novelId: number, catalog: CatalogData, offset: number): Promise<void> => {
+    try {
+      while (bookCatalog.value === catalog) {
+        const response = await getCatalog({ novel_id: novelId, offset, limit: CATALOG_PAGE_SIZE });
+        if (bookCatalog.value !== catalog || response.status !== 'success' || !response.page) {
+          return;
+        }
+        catalog.chapters.push(...response.data.chapters);
+        offset = response.page.offset + response.page.limit;
+        if (!response.page.has_more || response.data.chapters.length === 0) {
+          saveCatalog(catalog);
+          return;
+        }
+      }
+    } catch (error) {
+      console.error('加载剩余目录失败:', error);
+    }
+  };
+
+  const saveCatalog = (catalog: CatalogData): void => {
+    sessionStorage.set(STORAGE_KEYS.BOOK_CATALOG, catalog);
+    if (currentBook.value) {
+      sessionStorage.set(STORAGE_KEYS.CURRENT_BOOK, currentBook.value);
+    }
+  };
+
   const retryLoadCatalog = async (): Promise<void> => {
     if (currentBook.value?.novel_id) {
       const novelId = parseInt(currentBook.value.novel_id);
@@ -4,6 +4,7 @@ import {
   startDownload as startDownloadAPI,
   getDownloadStatus,
   stopDownload,
+  resumeDownload,
   getDownloadTasks,
   batchOperation,
   retryFailedChapters
@@ -226,7 +227,7 @@ export const useDownloadStore = defineStore('download', () => {
         downloadTasks.value.set(taskId, normalizedTask);
         
         // 如果任务已完成或失败，停止轮询
-        if (['completed', 'failed', 'stopped'].includes(normalizedTask.status)) {
+        if (['completed', 'failed', 'stopped', 'paused'].includes(normalizedTask.status)) {
           stopPolling(taskId);
         }
       }
@@ -265,6 +266,36 @@ export const useDownloadStore = defineStore('download', () => {
     pollTimers.value.clear();
   };
 
+  const resumeDownloadTask = async (taskId: string): Promise<boolean> => {
+    try {
+      const response = await resumeDownload(taskId);
+      
+      if (response.status === 'success') {
+        // 重新开始轮询
+        const task = downloadTasks.value.get(taskId);
+        if (task) {
+          task.status = 'running';
+          task.resumable = false;
+          task.updated_at = new Date().toISOString();
+          downloadTasks.value.set(taskId, task);
+        }
+        startPolling(taskId);
+        
+        return true;
+      } else {
+        throw new Error(response.message || '继续下载失败');
+      }
+    } catch (error: any) {
+      console.error('继续下载失败:', error);
+      setError({
+        code: 'RESUME_DOWNLOAD_ERROR',
+        message: error.message || '继续下载失败',
+        details: error
+      });
+      return false;
+    }
+  };
+
   const performBatchOperation = async (
     operation: BatchOperationRequest['operation'],
     taskIds: string[]
@@ -477,6 +508,7 @@ export const useDownloadStore = defineStore('download', () => {
     normalizeTaskProgress,
     startDownload,
     stopDownloadTask,
+    resumeDownloadTask,
     loadAllTasks,
     refreshTaskStatus,
     startPolling,
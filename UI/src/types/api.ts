@@ -44,6 +44,7 @@ export interface BookCrawlerAPI {
   startDownload: (params: DownloadRequest) => Promise<StartDownloadResponse>;
   getDownloadStatus: (taskId: string) => Promise<DownloadStatusResponse>;
   stopDownload: (taskId: string) => Promise<ApiResponse>;
+  resumeDownload: (taskId: string) => Promise<ApiResponse>;
   getDownloadTasks: () => Promise<DownloadTasksResponse>;
   
   // 批量操作
@@ -46,6 +46,16 @@ export interface CatalogData {
 // 目录请求
 export interface CatalogRequest {
   novel_id: number;
+  offset?: number;         // 分页起点（0-based）
+  limit?: number;          // 每页章节数
+}
+
+// 目录分页信息
+export interface CatalogPage {
+  offset: number;
+  limit: number;
+  total: number;
+  has_more: boolean;
 }
 
 // 目录响应
@@ -53,6 +63,23 @@ export interface CatalogResponse extends ApiResponse<CatalogData> {
   novel_id: number;
   book_name: string;
   novel_url: string;
+  page?: CatalogPage;      // 分页请求时返回
+}
+
+// 章节内容（在线阅读）
+export interface ChapterContent {
+  book_name: string;
+  chapter_index: number;   // 从1开始
+  title: string;
+  content: string;
+  url: string;
+  total_chapters: number;
+}
+
+// 章节内容响应
+export interface ChapterResponse extends ApiResponse<ChapterContent> {
+  source: 'chapter_store' | 'fetched';
+  prefetching: number[];   // 后台预取的章节索引
 }
 
 // 书籍详情（用于前端展示）
@@ -29,6 +29,8 @@ export interface DownloadStatus {
   total: number;
   percentage: number;
   failed_chapters: number[];
+  message?: string;
+  resumable?: boolean;
   created_at?: string;
   updated_at?: string;
   error_message?: string;
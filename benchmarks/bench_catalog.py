@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+目录读取基准测试 - 对比解析整个目录JSON与使用二进制目录索引
+
+生成一个合成目录（默认 5000 章），分别测量：
+- 旧方式 json.load 带缩进的目录文件，再取一段章节
+- 打开目录索引（复用 mmap）并读取同一段章节
+- /api/catalog 的响应体：解析后重新序列化 vs 原样嵌入目录文件内容
+
+用法:
+    python benchmarks/bench_catalog.py
+    python benchmarks/bench_catalog.py --chapters 20000 --range 100
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def make_catalog(chapters: int) -> dict:
+    """生成合成目录"""
+    return {
+        "novel_info": {"novel_id": "/book/1/", "novel_title": "测试书", "author": "作者",
+                       "total_chapters": chapters, "domain": "www.example.com",
+                       "detail_url": "https://www.example.com/book/1/"},
+        "chapters": [{"title": f"第{i}章 这是一个有点长的章节标题", "url": f"/book/1/{i}.html"}
+                     for i in range(1, chapters + 1)],
+        "catalog_version": 1,
+    }
+
+
+def timeit(fn: Callable[[], object], repeat: int) -> float:
+    """返回每次调用的平均耗时（毫秒）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=5000, help="目录章节数")
+    parser.add_argument("--range", type=int, default=100, help="读取的章节范围长度")
+    parser.add_argument("--page-size", type=int, default=200, help="分页请求每页章节数")
+    parser.add_argument("--repeat", type=int, default=50, help="每项重复次数")
+    args = parser.parse_args()
+
+    from book_crawler.catalogs import save_catalog
+    from book_crawler.catalog_index import open_catalog_index
+
+    catalog = make_catalog(args.chapters)
+    middle = args.chapters // 2
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_file = os.path.join(tmp, "legacy.json")
+        with open(legacy_file, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=4)
+        catalog_file = os.path.join(tmp, "catalog.json")
+        save_catalog(catalog_file, catalog)
+
+        index = open_catalog_index(catalog_file)
+        assert index.to_dict()["chapters"] == catalog["chapters"]
+        assert index.slice(middle, middle + args.range) == catalog["chapters"][middle:middle + args.range]
+
+        def legacy_slice():
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                return json.load(f)["chapters"][middle:middle + args.range]
+
+        def index_slice():
+            return open_catalog_index(catalog_file).slice(middle, middle + args.range)
+
+        def legacy_response():
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return json.dumps({"status": "success", "data": data}, ensure_ascii=False).encode("utf-8")
+
+        def raw_response():
+            with open(catalog_file, "rb") as f:
+                raw = f.read()
+            return b'{"status": "success", "data": ' + raw + b"}"
+
+        def page_response():
+            page = open_catalog_index(catalog_file)
+            data = {"novel_info": page.novel_info, "chapters": page.slice(0, args.page_size)}
+            return json.dumps({"status": "success", "data": data}, ensure_ascii=False).encode("utf-8")
+
+        print(f"目录 {args.chapters} 章，读取 {args.range} 章")
+        print(f"文件大小: 带缩进JSON {os.path.getsize(legacy_file) / 1024:.0f}KB  "
+              f"紧凑JSON {os.path.getsize(catalog_file) / 1024:.0f}KB  "
+              f"索引 {os.path.getsize(index.path) / 1024:.0f}KB")
+        print(f"读取章节范围: json.load {timeit(legacy_slice, args.repeat):8.3f}ms  "
+              f"索引 {timeit(index_slice, args.repeat):8.3f}ms")
+        print(f"目录接口响应: 解析再序列化 {timeit(legacy_response, args.repeat):8.3f}ms  "
+              f"原样嵌入 {timeit(raw_response, args.repeat):8.3f}ms")
+        print(f"目录第一页响应: {args.page_size} 章 {len(page_response()) / 1024:.0f}KB "
+              f"{timeit(page_response, args.repeat):8.3f}ms  "
+              f"（整个目录 {len(raw_response()) / 1024:.0f}KB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+爬虫运行方式基准测试 - 对比 `scrapy crawl` 子进程与进程内爬虫引擎的延迟
+
+默认运行不带 novel_url 的 catalog 爬虫：爬虫会立即结束，测得的正好是
+每次请求的固定启动开销。传入 --spider search --keyword 剑来 可测真实搜索。
+
+用法:
+    python benchmarks/bench_crawl_engine.py -n 20
+    python benchmarks/bench_crawl_engine.py -n 10 --spider search --keyword 剑来
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def bench_subprocess(spider: str, spider_args: Dict[str, str], n: int) -> List[float]:
+    """每次运行启动一个 scrapy crawl 子进程"""
+    cmd = ["scrapy", "crawl", spider, "-s", "LOG_LEVEL=ERROR"]
+    for key, value in spider_args.items():
+        cmd += ["-a", f"{key}={value}"]
+
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        subprocess.run(cmd, capture_output=True, cwd=PROJECT_ROOT)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_inprocess(spider: str, spider_args: Dict[str, str], n: int) -> List[float]:
+    """复用常驻的进程内爬虫引擎"""
+    from fastapi_app.engine import CrawlEngine
+
+    engine = CrawlEngine(log_level="ERROR")
+    engine.start()
+    # 预热一次，排除首次导入爬虫模块的开销
+    engine.run(spider, **spider_args)
+
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        engine.run(spider, **spider_args)
+        samples.append(time.perf_counter() - start)
+    engine.shutdown()
+    return samples
+
+
+def report(name: str, samples: List[float]) -> None:
+    print(f"{name:<12} n={len(samples):<4} "
+          f"p50={percentile(samples, 50) * 1000:8.1f}ms  "
+          f"p99={percentile(samples, 99) * 1000:8.1f}ms  "
+          f"mean={statistics.mean(samples) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="子进程与进程内爬虫引擎延迟对比")
+    parser.add_argument("-n", type=int, default=20, help="每种方式的运行次数")
+    parser.add_argument("--spider", default="catalog", help="爬虫名称")
+    parser.add_argument("--keyword", default=None, help="search 爬虫的关键词")
+    args = parser.parse_args()
+
+    spider_args = {"keyword": args.keyword} if args.keyword else {}
+
+    os.chdir(PROJECT_ROOT)
+    report("subprocess", bench_subprocess(args.spider, spider_args, args.n))
+    report("inprocess", bench_inprocess(args.spider, spider_args, args.n))
+
+
+if __name__ == "__main__":
+    main()
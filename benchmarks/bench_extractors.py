@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+正文提取器基准测试 - 对比各提取后端每秒处理的章节数
+
+语料为保存下来的章节页面HTML（目录中的 *.html 文件，按 UTF-8 读取）；
+不指定 --corpus 时生成与笔趣阁章节页结构相同的合成页面。
+"legacy" 为改造前的实现：Scrapy 选择器 + 逐个关键词 `in` 判断。
+
+用法:
+    python benchmarks/bench_extractors.py
+    python benchmarks/bench_extractors.py --corpus temp/pages -r 5
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+from typing import List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from book_crawler.config import INVALID_CHAPTER_KEYWORDS, PARAGRAPH_INDENT
+from book_crawler.extractors import EXTRACTORS
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}_笔趣阁</title>
+<script>var bookid = "1"; var chapterid = "{index}";</script>
+<link rel="stylesheet" href="/css/style.css"></head>
+<body>
+<div class="header"><div class="wrap"><a href="/">首页</a><a href="/sort/">分类</a><a href="/top/">排行</a></div></div>
+<div class="book reader">
+<div class="path wap_none"><a href="/">笔趣阁</a> &gt; <a href="/book/1/">书名</a> &gt; {title}</div>
+<div class="content">
+<h1 class="wap_none">{title}</h1>
+<div class="Readpage pagedown"><a href="/book/1/" id="pb_mulu">返回目录</a><a href="/book/1/{prev}.html" id="pb_prev">上一页</a><a href="/book/1/{next}.html" id="pb_next">下一页</a></div>
+<div id="chaptercontent" class="Readarea ReadAjax_content">{paragraphs}<br /><br />请收藏本站：https://www.example.com。笔趣阁手机版：https://m.example.com <br /><br /><p class="readinline"><a href="javascript:addBookCase();">『点此报错』</a><a href="javascript:addBookMark();">『加入书签』</a></p></div>
+<div class="Readpage pagedown"><a href="/book/1/{prev}.html">上一页</a><a href="/book/1/">返回目录</a><a href="/book/1/{next}.html">下一页</a></div>
+</div></div>
+<div class="footer"><p>本站所有小说为转载作品，所有章节均由网友上传，转载至本站只是为了宣传，让更多读者欣赏。</p></div>
+</body></html>'''
+
+WORDS = "天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光"
+
+
+def make_synthetic_corpus(n: int, paragraphs: int = 60, seed: int = 0) -> List[bytes]:
+    """生成 n 个合成章节页面，每章约 paragraphs 段、每段 30~80 字"""
+    rng = random.Random(seed)
+    pages = []
+    for index in range(1, n + 1):
+        body = "<br /><br />".join(
+            "&emsp;&emsp;" + "".join(rng.choice(WORDS) for _ in range(rng.randint(30, 80)))
+            for _ in range(paragraphs)
+        )
+        page = PAGE_TEMPLATE.format(title=f"第{index}章 测试章节", index=index,
+                                    prev=index - 1, next=index + 1, paragraphs=body)
+        pages.append(page.encode("utf-8"))
+    return pages
+
+
+def load_corpus(corpus_dir: str, n: int) -> List[bytes]:
+    """读取语料目录中的章节页面，未指定目录时生成合成语料"""
+    if not corpus_dir:
+        return make_synthetic_corpus(n)
+    files = sorted(glob.glob(os.path.join(corpus_dir, "*.html")))
+    if not files:
+        sys.exit(f"语料目录中没有 *.html 文件: {corpus_dir}")
+    pages = []
+    for path in files:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+class LegacyExtractor:
+    """改造前 ContentSpider.parse 的实现，作为对比基线"""
+
+    name = "legacy"
+
+    def __init__(self):
+        from parsel import Selector
+        self._selector = Selector
+
+    def extract(self, body: bytes, encoding: str) -> Tuple[str, str]:
+        sel = self._selector(text=body.decode(encoding, errors="replace"))
+        title = sel.css("h1::text").get()
+        raw_texts = sel.xpath('//*[@id="chaptercontent"]//text()').getall()
+        text = "\n".join(raw_texts).strip() if raw_texts else ""
+        valid_lines = []
+        for line in (line.strip() for line in text.splitlines()):
+            if not line:
+                continue
+            if any(kw in line for kw in INVALID_CHAPTER_KEYWORDS):
+                continue
+            valid_lines.append(PARAGRAPH_INDENT + line)
+        return title, "\n".join(valid_lines)
+
+
+def bench(extractor, pages: List[bytes], rounds: int) -> float:
+    """返回最好一轮的每秒章节数"""
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for page in pages:
+            extractor.extract(page, "utf-8")
+        best = max(best, len(pages) / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文提取器基准测试")
+    parser.add_argument("--corpus", default=None, help="章节页面HTML目录（*.html）")
+    parser.add_argument("-n", type=int, default=500, help="合成语料的章节数")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="每个后端的测试轮数（取最好一轮）")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.n)
+    size = sum(map(len, pages)) / len(pages) / 1024
+    print(f"语料: {len(pages)} 章，平均 {size:.1f} KB/章")
+
+    baseline = LegacyExtractor()
+    expected = [baseline.extract(page, "utf-8") for page in pages]
+    extractors = [baseline]
+    for name, cls in EXTRACTORS.items():
+        try:
+            extractors.append(cls())
+        except ImportError:
+            print(f"{name:<12} 未安装，跳过")
+
+    legacy_rate = None
+    for extractor in extractors:
+        results = [extractor.extract(page, "utf-8") for page in pages]
+        mismatched = sum(result != exp for result, exp in zip(results, expected))
+        rate = bench(extractor, pages, args.rounds)
+        legacy_rate = legacy_rate or rate
+        print(f"{extractor.name:<12} {rate:10.1f} 章/秒  x{rate / legacy_rate:5.2f}  "
+              f"与基线不一致: {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+章节解析进程池基准测试 - 测量不同工作进程数下每秒解析的章节数
+
+0 个工作进程表示在当前线程中直接解析（PARSE_WORKERS = 0 时爬虫的行为）。
+语料与 bench_extractors.py 相同：--corpus 指定保存的章节页面目录，否则使用合成页面。
+
+用法:
+    python benchmarks/bench_parse_workers.py
+    python benchmarks/bench_parse_workers.py -w 0 1 2 4 8 --extractor parsel
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import wait
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_extractors import load_corpus
+from book_crawler.config import CONTENT_EXTRACTOR
+from book_crawler.extractors import get_extractor
+from book_crawler.parse_pool import ParsePool
+
+
+def bench_inline(extractor_name, pages, rounds):
+    extractor = get_extractor(extractor_name)
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for page in pages:
+            extractor.extract(page, "utf-8")
+        best = max(best, len(pages) / (time.perf_counter() - start))
+    return best
+
+
+def bench_pool(extractor_name, workers, pages, rounds):
+    pool = ParsePool(workers, extractor_name)
+    # 预热：启动全部工作进程并创建提取器
+    wait([pool.submit(page, "utf-8") for page in pages[:workers * 4]])
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        wait([pool.submit(page, "utf-8") for page in pages])
+        best = max(best, len(pages) / (time.perf_counter() - start))
+    pool.shutdown()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="章节解析进程池基准测试")
+    parser.add_argument("--corpus", default=None, help="章节页面HTML目录（*.html）")
+    parser.add_argument("-n", type=int, default=2000, help="合成语料的章节数")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="每种配置的测试轮数（取最好一轮）")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[0, 1, 2, 4],
+                        help="要测试的工作进程数")
+    parser.add_argument("--extractor", default=CONTENT_EXTRACTOR, help="正文提取后端")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.n)
+    print(f"语料: {len(pages)} 章，提取器: {args.extractor}，CPU: {os.cpu_count()}")
+
+    baseline = None
+    for workers in args.workers:
+        if workers == 0:
+            rate = bench_inline(args.extractor, pages, args.rounds)
+        else:
+            rate = bench_pool(args.extractor, workers, pages, args.rounds)
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:10.1f} 章/秒  x{rate / baseline:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+请求优先级基准测试 - 批量下载占满下载许可时，在线阅读请求的等待时间
+
+模拟若干个批量下载爬虫持续发出请求（每个请求耗时 --latency 秒），期间每隔一段时间
+发出一个在线阅读请求，分别测量：
+- 先来先服务（所有请求同一类别，相当于没有优先级）
+- PriorityGate 按类别分配许可（批量请求保留 --reserved 个许可给高优先级请求）
+另外测量在线阅读请求持续占满许可时，批量请求的最长等待时间（防饿死）。
+
+用法:
+    python benchmarks/bench_priority.py
+    python benchmarks/bench_priority.py --bulk-crawlers 4 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from book_crawler.priority import PriorityGate, INTERACTIVE, BULK
+
+
+async def bulk_crawler(gate: PriorityGate, priority_class: str, concurrency: int,
+                       latency: float, stop: asyncio.Event):
+    """一个批量下载爬虫：始终保持 concurrency 个请求在等待或下载"""
+    async def worker():
+        while not stop.is_set():
+            await gate.acquire(priority_class)
+            await asyncio.sleep(latency)
+            gate.release(priority_class)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def measure_reads(gate: PriorityGate, read_class: str, bulk_class: str, args) -> list:
+    """批量下载运行期间，在线阅读请求取得许可的等待时间（毫秒）"""
+    stop = asyncio.Event()
+    crawlers = [asyncio.create_task(bulk_crawler(gate, bulk_class, args.concurrency, args.latency, stop))
+                for _ in range(args.bulk_crawlers)]
+    await asyncio.sleep(args.latency * 2)
+    waits = []
+    for _ in range(args.reads):
+        start = time.perf_counter()
+        await gate.acquire(read_class)
+        waits.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(args.latency)
+        gate.release(read_class)
+        await asyncio.sleep(args.latency / 2)
+    stop.set()
+    await asyncio.gather(*crawlers)
+    return waits
+
+
+async def measure_starvation(args) -> float:
+    """在线阅读请求持续占满许可时，一个批量请求的等待时间（秒）"""
+    gate = PriorityGate(args.max_active, args.reserved, args.max_wait)
+    stop = asyncio.Event()
+    readers = asyncio.create_task(bulk_crawler(gate, INTERACTIVE, args.max_active * 2, args.latency, stop))
+    await asyncio.sleep(args.latency)
+    start = time.perf_counter()
+    await gate.acquire(BULK)
+    waited = time.perf_counter() - start
+    gate.release(BULK)
+    stop.set()
+    await readers
+    return waited
+
+
+def describe(waits: list) -> str:
+    waits = sorted(waits)
+    return (f"中位数 {statistics.median(waits):7.1f}ms  "
+            f"p90 {waits[int(len(waits) * 0.9) - 1]:7.1f}ms  最大 {waits[-1]:7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-active", type=int, default=16, help="下载许可总数")
+    parser.add_argument("--reserved", type=int, default=2, help="为高优先级请求保留的许可数")
+    parser.add_argument("--max-wait", type=float, default=2.0, help="防饿死的最长等待时间（秒）")
+    parser.add_argument("--bulk-crawlers", type=int, default=3, help="同时运行的批量下载爬虫数")
+    parser.add_argument("--concurrency", type=int, default=16, help="每个批量下载爬虫的并发请求数")
+    parser.add_argument("--latency", type=float, default=0.1, help="每个请求的下载耗时（秒）")
+    parser.add_argument("--reads", type=int, default=30, help="在线阅读请求数")
+    args = parser.parse_args()
+
+    fifo = await measure_reads(PriorityGate(args.max_active, 0, float("inf")), BULK, BULK, args)
+    prioritized = await measure_reads(PriorityGate(args.max_active, args.reserved, args.max_wait),
+                                      INTERACTIVE, BULK, args)
+    starved = await measure_starvation(args)
+
+    print(f"{args.bulk_crawlers} 个批量下载 x {args.concurrency} 并发，许可 {args.max_active}，"
+          f"请求耗时 {args.latency * 1000:.0f}ms")
+    print(f"在线阅读等待  先来先服务: {describe(fifo)}")
+    print(f"在线阅读等待  按优先级:   {describe(prioritized)}")
+    print(f"批量请求在在线阅读占满许可时的等待: {starved:.2f}s（max_wait {args.max_wait}s）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+章节请求窗口基准测试 - 对比一次性生成所有章节请求与按窗口逐步生成时的内存占用
+
+生成一个合成目录（默认 10000 章），分别测量调度器中同时存在的章节请求占用的内存：
+- 旧方式：一次性为范围内每个章节构造 Request，meta 中带章节字典的副本
+- 新方式：同时只有 CONTENT_REQUEST_WINDOW 个 Request，meta 中只有章节索引
+
+用法:
+    python benchmarks/bench_request_window.py
+    python benchmarks/bench_request_window.py --chapters 50000 --window 64
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import scrapy
+
+from bench_catalog import make_catalog
+
+
+def eager_requests(catalog) -> list:
+    """旧方式：整个范围的请求同时存在，每个请求带章节字典"""
+    return [
+        scrapy.Request(f"https://www.example.com{chapter['url']}", dont_filter=True,
+                       meta={"chapter": dict(chapter), "chapter_index": idx + 1,
+                             "tried_domains": ["example.com"], "priority_class": "bulk"})
+        for idx, chapter in enumerate(catalog.slice(0, len(catalog)))
+    ]
+
+
+def windowed_requests(catalog, window: int) -> list:
+    """新方式：同时只存在一个窗口的请求，按块读取目录索引"""
+    return [
+        scrapy.Request(f"https://www.example.com{chapter['url']}", dont_filter=True,
+                       meta={"chapter_index": idx + 1, "tried_domains": ["example.com"],
+                             "priority_class": "bulk"})
+        for idx, chapter in enumerate(catalog.slice(0, window))
+    ]
+
+
+def measure(fn) -> float:
+    """返回 fn 返回的对象占用的内存（KB）"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=10000, help="目录章节数")
+    parser.add_argument("--window", type=int, default=None, help="请求窗口大小（默认取配置）")
+    args = parser.parse_args()
+
+    from book_crawler.catalogs import save_catalog
+    from book_crawler.catalog_index import open_catalog_index
+    from book_crawler.config import CONTENT_REQUEST_WINDOW
+
+    window = args.window or CONTENT_REQUEST_WINDOW
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_file = os.path.join(tmp, "catalog.json")
+        save_catalog(catalog_file, make_catalog(args.chapters))
+        catalog = open_catalog_index(catalog_file)
+
+        eager = measure(lambda: eager_requests(catalog))
+        windowed = measure(lambda: windowed_requests(catalog, window))
+
+    print(f"目录 {args.chapters} 章，请求窗口 {window}")
+    print(f"一次性生成全部请求: {eager:10.0f}KB")
+    print(f"按窗口生成请求:     {windowed:10.0f}KB（与章节数无关）")
+
+
+if __name__ == "__main__":
+    main()
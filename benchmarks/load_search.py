@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+搜索接口并发负载测试 - 对比阻塞式处理函数与异步处理函数下其他请求的延迟
+
+在进程内直接调用 ASGI 应用（不需要 uvicorn/httpx），用一个假的爬虫引擎代替
+真实爬取：每次搜索耗时 --latency 秒。测试同时发起 --searches 个搜索请求，
+并以固定间隔轮询 /api/stats/domains，统计轮询请求的延迟（从计划发出时刻算起）：
+
+- legacy: 与改造前相同，在 async 处理函数中同步等待爬虫（阻塞事件循环）
+- async:  当前的 /api/search，等待爬虫时让出事件循环
+
+最后用相同关键词的并发搜索验证请求合并：只应触发一次爬取。
+
+用法:
+    python benchmarks/load_search.py
+    python benchmarks/load_search.py --searches 8 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class FakeEngine:
+    """假的爬虫引擎：每次运行在 latency 秒后返回一条搜索结果"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def submit(self, spider_name: str, settings: Optional[Dict[str, Any]] = None,
+               tag: Optional[str] = None, **spider_kwargs: Any) -> Future:
+        from fastapi_app.engine import CrawlResult
+
+        self.calls += 1
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        result = CrawlResult(spider_name)
+        result.items = [{"articlename": spider_kwargs.get("keyword"), "url_list": "/book/1/"}]
+        result.reason = "finished"
+        threading.Timer(self.latency, future.set_result, (result,)).start()
+        return future
+
+    def run(self, spider_name: str, timeout: Optional[float] = None, **kwargs: Any):
+        return self.submit(spider_name, **kwargs).result(timeout)
+
+    def stop(self, tag: str) -> bool:
+        return False
+
+
+async def asgi_call(app, method: str, path: str, body: Any = None) -> Tuple[int, bytes]:
+    """直接调用 ASGI 应用处理一个 HTTP 请求"""
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    received = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def run_load(app, search_path: str, searches: int, poll_interval: float,
+                   same_keyword: bool = False) -> Dict[str, Any]:
+    """并发发起搜索，同时轮询轻量接口，返回轮询延迟和搜索总耗时"""
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    keywords = [prefix if same_keyword else f"{prefix}-{i}" for i in range(searches)]
+    poll_latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def poller():
+        # 延迟从计划发出轮询的时刻算起，事件循环被阻塞的时间也计入其中
+        while not done.is_set():
+            scheduled = time.perf_counter() + poll_interval
+            await asyncio.sleep(poll_interval)
+            await poll_once(app, "GET", "/api/stats/domains")
+            poll_latencies.append(time.perf_counter() - scheduled)
+
+    async def search(keyword: str):
+        status, _ = await asgi_call(app, "POST", search_path, {"keyword": keyword})
+        return status
+
+    poll_task = asyncio.ensure_future(poller())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(search(keyword) for keyword in keywords))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await poll_task
+    return {"elapsed": elapsed, "polls": poll_latencies, "statuses": statuses}
+
+
+async def poll_once(app, method: str, path: str) -> None:
+    """轮询请求，忽略单次失败"""
+    try:
+        await asgi_call(app, method, path)
+    except Exception:
+        pass
+
+
+def report(name: str, result: Dict[str, Any], calls: int) -> None:
+    polls = result["polls"]
+    print(f"{name:<8} 搜索总耗时 {result['elapsed']:.2f}s  爬取次数 {calls:<3} "
+          f"轮询 {len(polls):>4} 次  p50 {statistics.median(polls) * 1000:8.1f}ms  "
+          f"p99 {percentile(polls, 99) * 1000:8.1f}ms  max {max(polls) * 1000:8.1f}ms  "
+          f"状态码 {sorted(set(result['statuses']))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=6, help="并发搜索请求数")
+    parser.add_argument("--latency", type=float, default=0.5, help="每次爬取的模拟耗时（秒）")
+    parser.add_argument("--poll-interval", type=float, default=0.02, help="轮询间隔（秒）")
+    args = parser.parse_args()
+
+    from fastapi import Body
+    import fastapi_app.main as api
+
+    engine = FakeEngine(args.latency)
+    api.crawl_engine = engine
+
+    @api.app.post("/bench/legacy_search")
+    async def legacy_search(request: api.SearchRequest = Body(None)):
+        # 改造前的写法：在事件循环中同步等待爬虫
+        result = api.run_spider("search", keyword=request.keyword)
+        return {"status": "success", "data": result.items if result else []}
+
+    print(f"并发搜索 {args.searches} 个，每次爬取 {args.latency}s，轮询间隔 {args.poll_interval * 1000:.0f}ms")
+    for name, path in (("legacy", "/bench/legacy_search"), ("async", "/api/search")):
+        engine.calls = 0
+        result = asyncio.run(run_load(api.app, path, args.searches, args.poll_interval))
+        report(name, result, engine.calls)
+
+    print("\n相同关键词的并发搜索:")
+    for name, path in (("legacy", "/bench/legacy_search"), ("async", "/api/search")):
+        engine.calls = 0
+        result = asyncio.run(run_load(api.app, path, args.searches, args.poll_interval, same_keyword=True))
+        report(name, result, engine.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+目录二进制索引 - 按章节位置 O(1) 读取目录
+
+目录 JSON 仍是唯一的数据来源；每次保存目录时在旁边生成同名的 .idx 文件，
+JSON 比索引新（例如被手工修改）时在下次打开时重建。索引以只读 mmap 打开，
+读取任意章节范围只需解码这些章节，不必解析整个目录。
+
+文件格式（小端）:
+    头部      magic "NCIX" | 格式版本 u16 | 保留 u16 | 章节数 u32 | 元数据长度 u32
+    元数据    UTF-8 JSON（目录中除 chapters 外的字段），补齐到 4 字节
+    偏移表    章节数 + 1 个 u32，第 i 个章节的记录位于 [off[i], off[i+1])
+    记录区    每个章节一条 UTF-8 记录: 标题 \\x1f URL \\x1f 版本
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"NCIX"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHII")
+_SEP = "\x1f"
+
+
+def index_path(catalog_path: str) -> str:
+    """目录文件对应的索引文件路径"""
+    return os.path.splitext(catalog_path)[0] + ".idx"
+
+
+def write_catalog_index(catalog_path: str, catalog: Dict[str, Any]) -> str:
+    """根据目录数据生成索引文件，返回索引文件路径"""
+    chapters = catalog.get("chapters") or []
+    meta = json.dumps({key: value for key, value in catalog.items() if key != "chapters"},
+                      ensure_ascii=False).encode("utf-8")
+    meta += b" " * (-len(meta) % 4)
+
+    records = []
+    offsets = array("I", [0])
+    for chapter in chapters:
+        record = _SEP.join(
+            str(chapter.get(key) or "").replace(_SEP, " ") for key in ("title", "url", "version")
+        ).encode("utf-8")
+        records.append(record)
+        offsets.append(offsets[-1] + len(record))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    path = index_path(catalog_path)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(chapters), len(meta)))
+        f.write(meta)
+        f.write(offsets.tobytes())
+        f.write(b"".join(records))
+    os.replace(tmp_path, path)
+    return path
+
+
+class CatalogIndex:
+    """以 mmap 打开的目录索引"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._count, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"不是有效的目录索引文件: {path}")
+        self._meta_at = _HEADER.size
+        self._meta_len = meta_len
+        self._offsets_at = self._meta_at + meta_len
+        self._records_at = self._offsets_at + 4 * (self._count + 1)
+        self._meta: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self.slice(index, index + 1)[0]
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """目录中除章节列表外的字段（novel_info、catalog_version 等）"""
+        if self._meta is None:
+            self._meta = json.loads(self._mm[self._meta_at:self._meta_at + self._meta_len])
+        return self._meta
+
+    @property
+    def novel_info(self) -> Dict[str, Any]:
+        return self.meta.get("novel_info") or {}
+
+    def slice(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """读取 [start, end) 范围的章节（0-based，越界部分自动截断）"""
+        return list(self.iter_range(start, end))
+
+    def iter_range(self, start: int, end: int) -> Iterator[Dict[str, Any]]:
+        """逐个读取 [start, end) 范围的章节"""
+        start, end = max(0, start), min(end, self._count)
+        if start >= end:
+            return
+        offsets = struct.unpack_from(f"<{end - start + 1}I", self._mm, self._offsets_at + 4 * start)
+        # 一次取出整段记录，再按偏移切分
+        base = offsets[0]
+        data = self._mm[self._records_at + base:self._records_at + offsets[-1]]
+        for i in range(end - start):
+            yield self._decode(data[offsets[i] - base:offsets[i + 1] - base])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """还原为目录 JSON 的数据结构"""
+        return dict(self.meta, chapters=self.slice(0, self._count))
+
+    def close(self) -> None:
+        self._mm.close()
+
+    @staticmethod
+    def _decode(record: bytes) -> Dict[str, Any]:
+        title, url, version = record.decode("utf-8").split(_SEP)
+        chapter: Dict[str, Any] = {"title": title, "url": url}
+        if version:
+            chapter["version"] = int(version)
+        return chapter
+
+
+# 已打开的索引：索引文件路径 -> ((mtime_ns, size, inode), CatalogIndex)
+_open_indexes: Dict[str, Tuple[Tuple[int, int, int], CatalogIndex]] = {}
+_open_lock = threading.Lock()
+
+
+def open_catalog_index(catalog_path: str) -> Optional[CatalogIndex]:
+    """
+    打开目录文件对应的索引，索引不存在或比目录文件旧时先重建
+
+    同一索引文件在未变化时复用已打开的 mmap；目录文件不存在时返回 None
+    """
+    try:
+        source_mtime = os.stat(catalog_path).st_mtime_ns
+    except OSError:
+        return None
+    path = index_path(catalog_path)
+    with _open_lock:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is None or stat.st_mtime_ns < source_mtime:
+            try:
+                with open(catalog_path, "r", encoding="utf-8") as f:
+                    catalog = json.load(f)
+            except (OSError, ValueError):
+                return None
+            write_catalog_index(catalog_path, catalog)
+            stat = os.stat(path)
+
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cached = _open_indexes.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        # 旧的 mmap 不主动关闭：可能仍有爬虫在读取，没有引用后自动释放
+        index = CatalogIndex(path)
+        _open_indexes[path] = (key, index)
+        return index
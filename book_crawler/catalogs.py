@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+目录文件读写与增量合并
+
+目录文件是 JSON：novel_info + chapters（按目录顺序，章节在列表中的位置就是
+chapter_index - 1）。增量刷新时按章节URL与已保存的目录比较，只把新出现的章节
+追加到末尾并打上版本号，已有章节的位置保持不变，因此已下载的输出文件和断点
+日志中的章节索引仍然有效。
+
+附加字段:
+    catalog_version: 目录版本，首次保存为 1，每次追加了新章节加 1
+    checked_at:      最近一次向站点确认目录的时间戳
+    updates:         每个版本追加的章节 [{"version", "time", "first_index", "count"}]
+    validators:      目录页的 ETag / Last-Modified，用于条件请求
+    downloaded:      各格式输出文件已包含的章节数 {"txt": n, "epub": n}，更新下载从其后开始
+
+保存目录时同时生成二进制索引（见 catalog_index），按范围读取章节时使用索引。
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from book_crawler.catalog_index import write_catalog_index
+
+
+# 串行化 mark_downloaded 的读取-修改-写入，同时结束的任务不会覆盖彼此的记录
+_mark_lock = threading.Lock()
+
+
+def load_catalog(path: str) -> Optional[Dict[str, Any]]:
+    """读取目录文件，不存在或无法解析时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_catalog(path: str, catalog: Dict[str, Any]) -> None:
+    """原子地写入目录文件（紧凑JSON）并重建索引"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 同一本书的多个任务可能同时保存目录，临时文件按线程区分
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    write_catalog_index(path, catalog)
+
+
+def catalog_checked_at(catalog: Dict[str, Any], path: str) -> float:
+    """目录最近一次确认的时间，旧格式的目录文件以文件修改时间为准"""
+    checked_at = catalog.get("checked_at")
+    if checked_at is not None:
+        return checked_at
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def stamp_catalog(catalog: Dict[str, Any], validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """为首次保存的目录加上版本信息"""
+    catalog.setdefault("catalog_version", 1)
+    catalog.setdefault("updates", [])
+    catalog["checked_at"] = time.time()
+    catalog["validators"] = validators or {}
+    return catalog
+
+
+def mark_downloaded(path: str, mode: str, count: int, staging: Optional[str] = None) -> Optional[str]:
+    """
+    记录某种格式的输出文件已包含目录的前 count 个章节
+
+    参数:
+        staging: EPUB输出文件对应的暂存目录所属的任务ID，更新下载把新章节合并到这个暂存目录
+
+    返回:
+        被替换的暂存任务ID（其暂存目录不再需要）
+    """
+    with _mark_lock:
+        catalog = load_catalog(path)
+        if catalog is None:
+            return None
+        catalog.setdefault("downloaded", {})[mode] = count
+        replaced = None
+        if staging is not None:
+            replaced = catalog.get("epub_staging")
+            catalog["epub_staging"] = staging
+        save_catalog(path, catalog)
+    return replaced if replaced != staging else None
+
+
+def merge_catalog(old: Dict[str, Any], fresh: Dict[str, Any],
+                  validators: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    把新抓取的目录合并到已保存的目录
+
+    返回:
+        (合并后的目录, 新追加的章节)；没有新章节时目录版本不变
+    """
+    chapters = list(old.get("chapters") or [])
+    known = {chapter.get("url") for chapter in chapters}
+    added = [dict(chapter) for chapter in fresh.get("chapters") or [] if chapter.get("url") not in known]
+
+    merged = dict(old)
+    merged["novel_info"] = dict(old.get("novel_info") or {}, **{
+        key: value for key, value in (fresh.get("novel_info") or {}).items() if value is not None
+    })
+    version = old.get("catalog_version", 1)
+    updates = list(old.get("updates") or [])
+    if added:
+        version += 1
+        for chapter in added:
+            chapter["version"] = version
+        updates.append({
+            "version": version,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "first_index": len(chapters) + 1,
+            "count": len(added),
+        })
+        chapters.extend(added)
+
+    merged["chapters"] = chapters
+    merged["novel_info"]["total_chapters"] = len(chapters)
+    merged["catalog_version"] = version
+    merged["updates"] = updates
+    merged["checked_at"] = time.time()
+    merged["validators"] = validators if validators is not None else old.get("validators", {})
+    return merged, added
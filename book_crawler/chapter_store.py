@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+章节存储 - 以 (小说ID, 章节URL) 为键持久化清洗后的章节内容
+
+同一本书的章节下载过一次后，再次下载（例如换成另一种格式）时直接从本地读取。
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from book_crawler.config import CHAPTER_STORE_FILE, CHAPTER_STORE_MAX_AGE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    novel_id   TEXT NOT NULL,
+    url        TEXT NOT NULL,
+    title      TEXT NOT NULL,
+    content    TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (novel_id, url)
+) WITHOUT ROWID
+"""
+
+# SQLite 单条语句的参数个数上限较低，批量查询时分批
+_QUERY_BATCH = 500
+
+
+class ChapterStore:
+    """基于 SQLite 的章节存储"""
+
+    def __init__(self, db_path: str, max_age: float = 0):
+        """
+        参数:
+            db_path: 数据库文件路径
+            max_age: 章节有效期（秒），0 表示永不过期
+        """
+        self.db_path = db_path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def get(self, novel_id: str, url: str) -> Optional[Dict]:
+        """获取单个章节，不存在或已过期时返回 None"""
+        return self.get_many(novel_id, [url]).get(url)
+
+    def get_many(self, novel_id: str, urls: Iterable[str]) -> Dict[str, Dict]:
+        """
+        批量获取章节
+
+        返回:
+            {章节URL: {'title': ..., 'content': ..., 'fetched_at': ...}}，只包含命中的章节
+        """
+        urls = list(urls)
+        min_fetched_at = time.time() - self.max_age if self.max_age else 0
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(urls), _QUERY_BATCH):
+                batch = urls[i:i + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT url, title, content, fetched_at FROM chapters "
+                    f"WHERE novel_id = ? AND fetched_at >= ? AND url IN ({placeholders})",
+                    [novel_id, min_fetched_at, *batch],
+                )
+                for url, title, content, fetched_at in rows:
+                    found[url] = {"title": title, "content": content, "fetched_at": fetched_at}
+        return found
+
+    def put(self, novel_id: str, url: str, title: str, content: str) -> None:
+        """写入或更新一个章节"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO chapters (novel_id, url, title, content, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (novel_id, url, title, content, time.time()),
+            )
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+
+# 进程级单例
+chapter_store = ChapterStore(CHAPTER_STORE_FILE, CHAPTER_STORE_MAX_AGE)
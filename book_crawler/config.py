@@ -7,21 +7,24 @@ import os
 from random import choice
 from config import (
     TEMP_OUTPUT_DIRECTORY,
+    CACHE_DIRECTORY,
     REQUEST_CONCURRENCY,
     WRITE_CONCURRENCY,
     CONCURRENT_REQUESTS_PER_DOMAIN,
     DOWNLOAD_DELAY,
-    RANDOMIZE_DOWNLOAD_DELAY
+    RANDOMIZE_DOWNLOAD_DELAY,
+    ADAPTIVE_THROTTLE_ENABLED,
+    PRIORITY_GATE_ENABLED
 )
-from book_crawler.tools import get_supported_domains
+from book_crawler.domains import DomainRegistry
 
-# 支持的域名列表
-SUPPORTED_DOMAINS = get_supported_domains()
-# 默认域名
-DEFAULT_DOMAIN = SUPPORTED_DOMAINS[0]
+# 域名列表缓存配置
+DOMAIN_CACHE_FILE = os.path.join(CACHE_DIRECTORY, 'domains.json')
+DOMAIN_CACHE_TTL = 24 * 3600  # 缓存有效期（秒），过期后在后台刷新
+FALLBACK_DOMAINS = ['bqg128.com']  # 无法获取域名列表时使用的备用域名
 
-# 当前域名（会被 spider 动态更新）
-CURRENT_DOMAIN = DEFAULT_DOMAIN
+# 支持的域名列表（延迟加载，导入本模块时不会发起网络请求）
+domain_registry = DomainRegistry(DOMAIN_CACHE_FILE, DOMAIN_CACHE_TTL, FALLBACK_DOMAINS)
 
 # 请求头配置（基础头，referer/cookie 在 spider 动态生成）
 # 请求头配置
@@ -39,6 +42,23 @@ REQUEST_HEADERS = {
     "user-agent": choice(USER_AGENT),
 }
 
+# hm Cookie 池配置（搜索接口需要）
+HM_COOKIE_CACHE_FILE = os.path.join(CACHE_DIRECTORY, 'hm_cookies.json')
+HM_COOKIE_TTL = 30 * 60  # 响应未声明过期时间时的默认有效期（秒）
+HM_COOKIE_POOL_SIZE = 2  # 每个域名保留的有效Cookie数
+HM_COOKIE_REFRESH_MARGIN = 120  # Cookie剩余有效期低于该值（秒）时在后台补充
+
+# 搜索结果缓存配置 - 关键词规范化后作为缓存键，内存LRU + SQLite持久化
+SEARCH_CACHE_FILE = os.path.join(CACHE_DIRECTORY, 'search.db')
+SEARCH_CACHE_TTL = 6 * 3600          # 有结果时的有效期（秒）
+SEARCH_CACHE_EMPTY_TTL = 10 * 60     # 空结果的有效期（秒），0表示不缓存空结果
+SEARCH_CACHE_MEMORY_SIZE = 256       # 内存中保留的条目数
+SEARCH_CACHE_MAX_ENTRIES = 5000      # 持久化保留的条目数上限，0表示不限制
+
+# 章节存储配置 - 已下载的章节缓存在本地，重复下载时不再请求网络
+CHAPTER_STORE_FILE = os.path.join(CACHE_DIRECTORY, 'chapters.db')
+CHAPTER_STORE_MAX_AGE = 0  # 章节有效期（秒），0表示永不过期
+
 # 默认关键词
 DEFAULT_KEYWORD = "剑来"
 
@@ -46,7 +66,6 @@ KEYWORD = DEFAULT_KEYWORD
 
 # 重试配置
 MAX_RETRY_TIMES = 3  # 每个域名最多重试次数
-MAX_TOTAL_ATTEMPTS = len(SUPPORTED_DOMAINS) * MAX_RETRY_TIMES
 RETRY_DELAY = 3  # 秒
 
 # 日志/输出配置 - 确保使用项目根目录的output
@@ -65,18 +84,24 @@ def get_search_output_file(keyword=None):
 
 # 目录爬虫配置
 def get_catalog_output_file(keyword=None):
-    """根据当前关键词动态生成输出文件路径"""
+    """根据当前关键词动态生成输出文件路径
+
+    目录保存着已下载章节数、目录版本和条件请求校验值，属于持久状态，
+    放在缓存目录中，不受退出时临时文件清理的影响
+    """
     key = keyword or KEYWORD
-    return os.path.join(TEMP_OUTPUT_DIRECTORY, f"catalog_{key}_result.json")
+    return os.path.join(CACHE_DIRECTORY, f"catalog_{key}_result.json")
 
 # 并发控制配置
-REQUEST_CONCURRENCY = REQUEST_CONCURRENCY# 请求并发数（降低以避免反爬虫）
+REQUEST_CONCURRENCY = REQUEST_CONCURRENCY# 全局请求并发上限
 WRITE_CONCURRENCY = WRITE_CONCURRENCY  # 写入并发数
 CONCURRENT_REQUESTS_PER_DOMAIN = CONCURRENT_REQUESTS_PER_DOMAIN  # 每个域名的并发数
 
 # 反爬虫配置
 DOWNLOAD_DELAY = DOWNLOAD_DELAY  # 请求间隔（秒）
 RANDOMIZE_DOWNLOAD_DELAY = RANDOMIZE_DOWNLOAD_DELAY  # 随机延迟范围
+ADAPTIVE_THROTTLE_ENABLED = ADAPTIVE_THROTTLE_ENABLED  # 按域名自适应调整请求间隔和并发
+PRIORITY_GATE_ENABLED = PRIORITY_GATE_ENABLED  # 按请求优先级类别分配所有爬虫共享的下载许可
 
 # 内容格式配置
 CHAPTER_SEPARATOR = "\n\n\n--------\n\n\n"  # 章节分隔符
@@ -99,6 +124,19 @@ INVALID_CHAPTER_KEYWORDS = [
 
 INVALID_CHAPTER_PREFIXES = ['展开', '收起', '<<<', '>>>']
 
+# 正文提取后端："lxml"（默认）、"parsel"（Scrapy 选择器）或 "selectolax"（需安装 selectolax）
+CONTENT_EXTRACTOR = "lxml"
+
+# 章节解析进程数 - 大于 0 时把正文提取和清洗交给进程池，爬虫线程只做网络 I/O；0 表示在爬虫线程中解析
+PARSE_WORKERS = 0
+
+# 章节重新分派配置 - 清洗后的正文短于 CHAPTER_MIN_LENGTH 或下载失败时换一个镜像站重新下载
+CHAPTER_MIN_LENGTH = 10      # 有效章节正文的最少字符数
+CHAPTER_MAX_REDISPATCH = 2   # 每个章节最多重新分派的次数
+
+# 章节请求窗口 - 内容爬虫同时处于调度器和下载器中的章节请求数上限，其余章节完成一个再发出一个
+CONTENT_REQUEST_WINDOW = 64
+
 NAVIGATION_KEYWORDS = ['请假条', '单章感言', '作者有话说']
 
 # 目录爬取CSS选择器配置
@@ -110,3 +148,18 @@ CSS_SELECTORS = {
     'chapter_title': '::text',
     'chapter_url': '::attr(href)'
 }
+
+
+def __getattr__(name):
+    """
+    延迟解析依赖域名列表的配置项：SUPPORTED_DOMAINS、DEFAULT_DOMAIN、
+    CURRENT_DOMAIN（仅为兼容保留，等同于 DEFAULT_DOMAIN；爬虫使用的域名保存在各自实例上）
+    和 MAX_TOTAL_ATTEMPTS
+    """
+    if name == 'SUPPORTED_DOMAINS':
+        return domain_registry.get()
+    if name in ('DEFAULT_DOMAIN', 'CURRENT_DOMAIN'):
+        return domain_registry.get()[0]
+    if name == 'MAX_TOTAL_ATTEMPTS':
+        return len(domain_registry.get()) * MAX_RETRY_TIMES
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+hm Cookie 池 - 按域名缓存搜索接口需要的 hm Cookie
+
+Cookie 由 SearchSpider 通过 Scrapy 自身的下载器获取，写入本池后在过期前
+被不同关键词的搜索复用，并持久化到磁盘供后续进程使用。
+"""
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from http.cookies import SimpleCookie
+from typing import Dict, List, Optional, Tuple
+
+from book_crawler.config import (
+    HM_COOKIE_CACHE_FILE,
+    HM_COOKIE_TTL,
+    HM_COOKIE_POOL_SIZE,
+    HM_COOKIE_REFRESH_MARGIN,
+)
+
+# 说明 Cookie 被站点拒绝的响应状态码：重定向（如跳转到验证页）、未授权、禁止访问、请求过多
+HM_COOKIE_REJECT_STATUSES = (301, 302, 303, 307, 308, 401, 403, 429)
+
+
+def is_cookie_rejected(response) -> bool:
+    """
+    搜索响应是否说明使用的 hm Cookie 被站点拒绝
+
+    只有被重定向或返回上述状态码才算；接口返回空结果（"1"、空 JSON）说明 Cookie 可用，
+    网络错误与 Cookie 无关，都不应让池中的 Cookie 失效
+    """
+    if response is None:
+        return False
+    if response.status in HM_COOKIE_REJECT_STATUSES:
+        return True
+    request = getattr(response, "request", None)
+    return bool(request is not None and request.meta.get("redirect_urls"))
+
+
+def parse_hm_cookie(set_cookie_headers: List[bytes], default_ttl: float) -> Optional[Tuple[str, float]]:
+    """
+    从响应的 Set-Cookie 头中解析 hm Cookie
+
+    返回:
+        (cookie值, 过期时间戳)；没有 Cookie 时返回 None
+    """
+    fallback = None
+    for header in set_cookie_headers:
+        cookie = SimpleCookie()
+        try:
+            cookie.load(header.decode("latin-1"))
+        except Exception:
+            continue
+        for name, morsel in cookie.items():
+            expires_at = time.time() + default_ttl
+            if morsel["max-age"]:
+                try:
+                    expires_at = time.time() + int(morsel["max-age"])
+                except ValueError:
+                    pass
+            elif morsel["expires"]:
+                try:
+                    expires_at = parsedate_to_datetime(morsel["expires"]).timestamp()
+                except (TypeError, ValueError):
+                    pass
+            parsed = (morsel.value, expires_at)
+            if name == "hm":
+                return parsed
+            # 与原先 requests 实现一致：没有 hm 时取第一个 Cookie
+            fallback = fallback or parsed
+    return fallback
+
+
+class HmCookiePool:
+    """按域名维护的 hm Cookie 池"""
+
+    def __init__(self, cache_file: str, ttl: float, pool_size: int, refresh_margin: float):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._pool: Dict[str, List[List]] = {}  # domain -> [[cookie值, 过期时间戳], ...]
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def acquire(self, domain: str) -> Optional[str]:
+        """取出一个有效的 Cookie（不会从池中移除），没有时返回 None"""
+        with self._lock:
+            entries = self._valid_entries(domain)
+            if not entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # 使用最晚过期的 Cookie
+            return max(entries, key=lambda entry: entry[1])[0]
+
+    def add(self, domain: str, value: str, expires_at: Optional[float] = None) -> None:
+        with self._lock:
+            entries = self._valid_entries(domain)
+            entries = [entry for entry in entries if entry[0] != value]
+            entries.append([value, expires_at or time.time() + self.ttl])
+            # 只保留最新的 pool_size 个
+            entries.sort(key=lambda entry: entry[1])
+            self._pool[domain] = entries[-self.pool_size:]
+            self.refreshes += 1
+            self._save()
+
+    def invalidate(self, domain: str, value: str) -> None:
+        """移除失效的 Cookie（搜索请求被站点拒绝时使用的 Cookie，见 is_cookie_rejected）"""
+        with self._lock:
+            entries = self._valid_entries(domain)
+            self._pool[domain] = [entry for entry in entries if entry[0] != value]
+            self._save()
+
+    def needs_refresh(self, domain: str) -> bool:
+        """有效 Cookie 不足，或最晚过期的 Cookie 也即将过期时需要补充"""
+        with self._lock:
+            entries = self._valid_entries(domain)
+            if len(entries) < self.pool_size:
+                return True
+            return max(entry[1] for entry in entries) - time.time() < self.refresh_margin
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "domains": {domain: len(self._valid_entries(domain)) for domain in self._pool},
+            }
+
+    def _valid_entries(self, domain: str) -> List[List]:
+        if not self._loaded:
+            self._load()
+        now = time.time()
+        entries = [entry for entry in self._pool.get(domain, []) if entry[1] > now]
+        self._pool[domain] = entries
+        return entries
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._pool = data
+        except (OSError, ValueError) as e:
+            print(f"Cookie 缓存读取失败: {e}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._pool, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Cookie 缓存写入失败: {e}")
+
+
+# 进程级单例，进程内爬虫引擎中的多次搜索共享
+hm_cookie_pool = HmCookiePool(HM_COOKIE_CACHE_FILE, HM_COOKIE_TTL, HM_COOKIE_POOL_SIZE, HM_COOKIE_REFRESH_MARGIN)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+镜像站健康度统计与自适应限速
+
+按域名记录响应延迟、成功率和封禁信号（403/429/503），并据此调整该域名
+下载槽的请求间隔和并发数：
+- 持续成功且延迟不高时先逐步缩短请求间隔，间隔降到下限后再逐个增加并发
+- 失败时先减半并发，并发降到下限后再加倍请求间隔
+- 封禁时直接降到最保守的设置，并在冷却期内标记为不可用
+
+统计保存在进程级单例中，进程内引擎的多次爬取共享同一份统计。请求间隔和并发数
+是该域名的总预算，由同时运行的爬虫平分，多个下载任务并行时对镜像站的总压力不变。
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import (
+    DOWNLOAD_DELAY,
+    CONCURRENT_REQUESTS_PER_DOMAIN,
+    ADAPTIVE_MIN_DELAY,
+    ADAPTIVE_MAX_DELAY,
+    ADAPTIVE_MIN_CONCURRENCY,
+    ADAPTIVE_MAX_CONCURRENCY,
+    ADAPTIVE_TARGET_LATENCY,
+    ADAPTIVE_BAN_COOLDOWN,
+)
+
+
+def domain_of(url_or_host: str) -> str:
+    """从URL或主机名中取出域名（去掉 www. 前缀），与 SUPPORTED_DOMAINS 的写法一致"""
+    host = urlparse(url_or_host).hostname if "//" in url_or_host else url_or_host
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class DomainHealth:
+    """单个域名的健康度和当前限速设置"""
+
+    def __init__(self, delay: float, concurrency: int):
+        self.delay = delay
+        self.concurrency = concurrency
+        self.latency: Optional[float] = None  # 响应延迟的指数移动平均（秒）
+        self.success_rate = 1.0               # 成功率的指数移动平均
+        self.requests = 0
+        self.failures = 0
+        self.bans = 0
+        self.banned_until = 0.0
+        self.streak = 0                       # 上次调整后连续成功的次数
+        self.recent: Deque[float] = deque()   # 最近的响应时间戳，用于计算速率
+
+
+class DomainHealthTracker:
+    """线程安全的域名健康度统计"""
+
+    def __init__(self, start_delay: float, start_concurrency: int,
+                 min_delay: float, max_delay: float,
+                 min_concurrency: int, max_concurrency: int,
+                 target_latency: float, ban_cooldown: float,
+                 alpha: float = 0.2, increase_after: int = 10, rate_window: float = 60):
+        """
+        参数:
+            start_delay / start_concurrency: 新域名的初始请求间隔和并发数
+            target_latency: 平均延迟超过该值的两倍时主动降速
+            ban_cooldown: 被封禁后的冷却时间（秒），响应带 Retry-After 时以其为准
+            alpha: 指数移动平均的平滑系数
+            increase_after: 连续成功多少次后提速一档
+            rate_window: 计算当前速率的时间窗口（秒）
+        """
+        self.start_delay = start_delay
+        self.start_concurrency = start_concurrency
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.ban_cooldown = ban_cooldown
+        self.alpha = alpha
+        self.increase_after = increase_after
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        self._domains: Dict[str, DomainHealth] = {}
+        self._crawlers = 0  # 正在运行的爬虫数
+
+    def attach(self) -> None:
+        """登记一个开始运行的爬虫"""
+        with self._lock:
+            self._crawlers += 1
+
+    def detach(self) -> None:
+        """注销一个结束运行的爬虫"""
+        with self._lock:
+            self._crawlers = max(0, self._crawlers - 1)
+
+    def limits(self, domain: str) -> Tuple[float, int]:
+        """返回单个爬虫对该域名应使用的 (请求间隔, 并发数)，即总预算按正在运行的爬虫数平分"""
+        with self._lock:
+            health = self._get(domain)
+            share = max(1, self._crawlers)
+            return health.delay * share, max(1, health.concurrency // share)
+
+    def is_banned(self, domain: str) -> bool:
+        with self._lock:
+            health = self._domains.get(domain)
+            return bool(health and health.banned_until > time.time())
+
+    def choose(self, domains: List[str], exclude: Iterable[str] = ()) -> str:
+        """
+        按健康度加权随机选择一个域名
+
+        权重为 成功率² / 平均延迟，冷却期内的域名和 exclude 中的域名不参与选择；
+        全部被排除时退回到未被 exclude 的域名，再退回到全部域名。
+        """
+        exclude = set(exclude)
+        now = time.time()
+        with self._lock:
+            candidates = [d for d in domains if d not in exclude] or list(domains)
+            healthy = [d for d in candidates
+                       if d not in self._domains or self._domains[d].banned_until <= now] or candidates
+            weights = []
+            for domain in healthy:
+                health = self._domains.get(domain)
+                if health is None:
+                    weights.append(1.0 / self.target_latency)
+                    continue
+                latency = health.latency if health.latency is not None else self.target_latency
+                weights.append(max(health.success_rate, 0.05) ** 2 / max(latency, 0.05))
+        return random.choices(healthy, weights)[0]
+
+    def record_success(self, domain: str, latency: float) -> None:
+        """记录一次成功的响应"""
+        with self._lock:
+            health = self._get(domain)
+            self._record(health, True)
+            health.latency = latency if health.latency is None else \
+                self.alpha * latency + (1 - self.alpha) * health.latency
+            health.streak += 1
+
+            if health.latency > self.target_latency * 2:
+                health.streak = 0
+                self._slow_down(health)
+            elif health.streak >= self.increase_after and health.latency <= self.target_latency:
+                health.streak = 0
+                self._speed_up(health)
+
+    def record_failure(self, domain: str) -> None:
+        """记录一次失败（超时、连接错误、5xx 等）"""
+        with self._lock:
+            health = self._get(domain)
+            self._record(health, False)
+            health.failures += 1
+            health.streak = 0
+            self._slow_down(health)
+
+    def record_invalid(self, domain: str) -> None:
+        """
+        记录一次内容无效的响应（空章节、错误页等）
+
+        该响应已作为成功请求记录过，这里只修正成功率并降速，不重复计数
+        """
+        with self._lock:
+            health = self._get(domain)
+            health.success_rate = (1 - self.alpha) * health.success_rate
+            health.failures += 1
+            health.streak = 0
+            self._slow_down(health)
+
+    def record_ban(self, domain: str, retry_after: Optional[float] = None) -> None:
+        """记录一次封禁信号，进入冷却期"""
+        with self._lock:
+            health = self._get(domain)
+            self._record(health, False)
+            health.failures += 1
+            health.bans += 1
+            health.streak = 0
+            health.banned_until = time.time() + (retry_after or self.ban_cooldown)
+            health.concurrency = self.min_concurrency
+            health.delay = self.max_delay
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """各域名的统计数据，供统计接口展示"""
+        now = time.time()
+        with self._lock:
+            result = {}
+            for domain, health in sorted(self._domains.items()):
+                self._trim(health, now)
+                result[domain] = {
+                    "delay": round(health.delay, 3),
+                    "concurrency": health.concurrency,
+                    "rate": round(len(health.recent) / self.rate_window, 3),
+                    "latency": round(health.latency, 3) if health.latency is not None else None,
+                    "success_rate": round(health.success_rate, 3),
+                    "requests": health.requests,
+                    "failures": health.failures,
+                    "bans": health.bans,
+                    "banned_for": max(0, round(health.banned_until - now, 1)),
+                }
+            return result
+
+    def _get(self, domain: str) -> DomainHealth:
+        health = self._domains.get(domain)
+        if health is None:
+            health = self._domains[domain] = DomainHealth(self.start_delay, self.start_concurrency)
+        return health
+
+    def _record(self, health: DomainHealth, success: bool) -> None:
+        now = time.time()
+        health.requests += 1
+        health.success_rate = self.alpha * success + (1 - self.alpha) * health.success_rate
+        health.recent.append(now)
+        self._trim(health, now)
+
+    def _trim(self, health: DomainHealth, now: float) -> None:
+        while health.recent and health.recent[0] < now - self.rate_window:
+            health.recent.popleft()
+
+    def _speed_up(self, health: DomainHealth) -> None:
+        """提速一档：先缩短请求间隔，间隔到下限后增加并发"""
+        if health.delay > self.min_delay:
+            health.delay = health.delay * 0.75
+            if health.delay < self.min_delay + 0.05:
+                health.delay = self.min_delay
+        elif health.concurrency < self.max_concurrency:
+            health.concurrency += 1
+
+    def _slow_down(self, health: DomainHealth) -> None:
+        """降速一档：先减半并发，并发到下限后加倍请求间隔"""
+        if health.concurrency > self.min_concurrency:
+            health.concurrency = max(self.min_concurrency, health.concurrency // 2)
+        else:
+            health.delay = min(self.max_delay, max(health.delay * 2, 0.5))
+
+
+# 进程级单例
+domain_health = DomainHealthTracker(
+    start_delay=DOWNLOAD_DELAY,
+    start_concurrency=CONCURRENT_REQUESTS_PER_DOMAIN,
+    min_delay=ADAPTIVE_MIN_DELAY,
+    max_delay=ADAPTIVE_MAX_DELAY,
+    min_concurrency=ADAPTIVE_MIN_CONCURRENCY,
+    max_concurrency=ADAPTIVE_MAX_CONCURRENCY,
+    target_latency=ADAPTIVE_TARGET_LATENCY,
+    ban_cooldown=ADAPTIVE_BAN_COOLDOWN,
+)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+域名注册表 - 延迟加载支持的域名列表
+
+域名列表在第一次被访问时才加载：优先读取磁盘缓存，缓存过期时先返回旧列表，
+再在后台线程中刷新；只有从未缓存过时才会同步请求一次 compc.js。
+"""
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class DomainRegistry:
+    """带磁盘缓存和后台刷新的域名列表"""
+
+    def __init__(self, cache_file: str, ttl: float, fallback: List[str]):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.fallback = list(fallback)
+        self._domains: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> List[str]:
+        """
+        获取域名列表
+
+        返回:
+            List[str]: 非空的域名列表，网络不可用时返回内置的备用域名
+        """
+        if self._domains is None:
+            with self._lock:
+                if self._domains is None:
+                    self._load()
+
+        if self.is_stale():
+            self.refresh_async()
+        return self._domains
+
+    def is_stale(self) -> bool:
+        return time.time() - self._fetched_at > self.ttl
+
+    def refresh(self) -> List[str]:
+        """同步从网站拉取域名列表并写入缓存，失败时保留当前列表"""
+        from book_crawler.tools import get_supported_domains
+
+        domains = get_supported_domains()
+        if domains:
+            self._domains = domains
+            self._fetched_at = time.time()
+            self._save_cache(domains, self._fetched_at)
+        return self._domains or self.fallback
+
+    def refresh_async(self) -> None:
+        """在后台线程中刷新域名列表（同一时间只有一个刷新线程）"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                self.refresh()
+            finally:
+                # 刷新失败也推迟下次重试，避免每次访问都启动线程
+                self._fetched_at = max(self._fetched_at, time.time() - self.ttl + 60)
+                self._refreshing = False
+
+        threading.Thread(target=worker, name="domain-refresh", daemon=True).start()
+
+    def _load(self) -> None:
+        cached = self._load_cache()
+        if cached:
+            self._domains, self._fetched_at = cached
+            return
+
+        # 从未缓存过：同步拉取一次
+        self.refresh()
+        if not self._domains:
+            self._domains = list(self.fallback)
+            # 一分钟后再在后台重试
+            self._fetched_at = time.time() - self.ttl + 60
+
+    def _load_cache(self) -> Optional[Tuple[List[str], float]]:
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            domains = data.get("domains") or []
+            if not domains:
+                return None
+            return domains, float(data.get("fetched_at", 0))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"域名缓存读取失败: {e}")
+            return None
+
+    def _save_cache(self, domains: List[str], fetched_at: float) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"domains": domains, "fetched_at": fetched_at}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"域名缓存写入失败: {e}")
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+流式EPUB写入器
+
+每个章节到达时立即格式化为 XHTML 写入暂存目录，标题追加到暂存目录的 toc.tsv。
+关闭时按章节索引生成 content.opf / toc.ncx / nav.xhtml，再把暂存文件逐个
+流式写入 zip 容器，因此峰值内存与章节数基本无关。
+"""
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from html import escape
+from typing import Dict
+
+EPUB_STYLE = '''
+body {
+    font-family: "SimSun", "Songti SC", serif;
+    line-height: 1.8;
+    margin: 2em;
+    color: #333;
+}
+h1 {
+    text-align: center;
+    color: #333;
+    margin: 2em 0;
+    font-size: 1.5em;
+    border-bottom: 1px solid #ccc;
+    padding-bottom: 0.5em;
+}
+p {
+    text-indent: 2em;
+    margin: 1em 0;
+    text-align: justify;
+}
+'''
+
+CONTAINER_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="EPUB/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+'''
+
+TOC_FILE = "toc.tsv"  # 暂存目录中的章节元数据：每行 "索引\t标题"
+
+
+class StreamingEpubWriter:
+    """按章节增量写入的EPUB生成器"""
+
+    def __init__(self, output_path: str, staging_dir: str, title: str,
+                 author: str = "未知作者", language: str = "zh", resume: bool = False):
+        """
+        参数:
+            resume: 为 True 时保留暂存目录中已有的章节，与新章节合并生成EPUB
+        """
+        self.output_path = output_path
+        self.staging_dir = staging_dir
+        self.title = title
+        self.author = author
+        self.language = language
+        self.identifier = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, title)}"
+        self._count = 0
+        self._titles: Dict[int, str] = {}
+
+        if not resume:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._toc = open(os.path.join(self.staging_dir, TOC_FILE), "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add_chapter(self, index: int, title: str, content: str) -> None:
+        """写入一个章节到暂存目录"""
+        with open(os.path.join(self.staging_dir, self._chapter_file(index)), "w", encoding="utf-8") as f:
+            f.write(self._format_chapter(title, content))
+        self._toc.write(f"{index}\t{title.replace(chr(9), ' ').replace(chr(10), ' ')}\n")
+        self._toc.flush()
+        self._count += 1
+
+    def close(self, assemble: bool = True) -> int:
+        """
+        生成EPUB文件（包含暂存目录中的全部章节）
+
+        暂存目录会保留，供续传时合并新章节；下一次非续传的下载会清空它。
+
+        参数:
+            assemble: 为 False 时只关闭暂存目录，不生成EPUB（批量下载的中间分段）
+
+        返回:
+            写入的章节数（不生成EPUB时为本次写入暂存目录的章节数）
+        """
+        self._toc.close()
+        if not assemble:
+            return self._count
+        self._titles = self._read_toc()
+        indexes = sorted(self._titles)
+
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        tmp_path = f"{self.output_path}.part"
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            # mimetype 必须是第一个且不压缩
+            zf.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            zf.writestr("META-INF/container.xml", CONTAINER_XML)
+            zf.writestr("EPUB/content.opf", self._build_opf(indexes))
+            zf.writestr("EPUB/toc.ncx", self._build_ncx(indexes))
+            zf.writestr("EPUB/nav.xhtml", self._build_nav(indexes))
+            zf.writestr("EPUB/style/nav.css", EPUB_STYLE)
+            for index in indexes:
+                file_name = self._chapter_file(index)
+                zf.write(os.path.join(self.staging_dir, file_name), f"EPUB/{file_name}")
+        os.replace(tmp_path, self.output_path)
+        return len(indexes)
+
+    def _read_toc(self) -> Dict[int, str]:
+        """读取暂存目录中的章节标题，同一索引以最后一次写入为准"""
+        titles = {}
+        with open(os.path.join(self.staging_dir, TOC_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                index, _, title = line.rstrip("\n").partition("\t")
+                titles[int(index)] = title
+        return titles
+
+    @staticmethod
+    def _chapter_file(index: int) -> str:
+        return f"chapter_{index:04d}.xhtml"
+
+    def _format_chapter(self, title: str, content: str) -> str:
+        """格式化EPUB章节内容"""
+        paragraphs = [
+            f"<p>{escape(paragraph.strip())}</p>"
+            for paragraph in content.split("\n")
+            if paragraph.strip()
+        ]
+        content_html = "\n".join(paragraphs)
+        title = escape(title)
+        return f'''<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="{self.language}" xml:lang="{self.language}">
+<head>
+    <title>{title}</title>
+    <link rel="stylesheet" type="text/css" href="style/nav.css"/>
+</head>
+<body>
+    <h1>{title}</h1>
+    {content_html}
+</body>
+</html>
+'''
+
+    def _build_opf(self, indexes) -> str:
+        manifest = "\n".join(
+            f'    <item id="chapter_{i}" href="{self._chapter_file(i)}" media-type="application/xhtml+xml"/>'
+            for i in indexes
+        )
+        spine = "\n".join(f'    <itemref idref="chapter_{i}"/>' for i in indexes)
+        return f'''<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="id" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="id">{escape(self.identifier)}</dc:identifier>
+    <dc:title>{escape(self.title)}</dc:title>
+    <dc:language>{self.language}</dc:language>
+    <dc:creator>{escape(self.author)}</dc:creator>
+    <meta property="dcterms:modified">{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</meta>
+  </metadata>
+  <manifest>
+    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+    <item id="nav_css" href="style/nav.css" media-type="text/css"/>
+{manifest}
+  </manifest>
+  <spine toc="ncx">
+    <itemref idref="nav"/>
+{spine}
+  </spine>
+</package>
+'''
+
+    def _build_ncx(self, indexes) -> str:
+        nav_points = "\n".join(
+            f'''    <navPoint id="chapter_{i}" playOrder="{order}">
+      <navLabel><text>{escape(self._titles[i])}</text></navLabel>
+      <content src="{self._chapter_file(i)}"/>
+    </navPoint>'''
+            for order, i in enumerate(indexes, start=1)
+        )
+        return f'''<?xml version="1.0" encoding="utf-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+  <head>
+    <meta name="dtb:uid" content="{escape(self.identifier)}"/>
+  </head>
+  <docTitle><text>{escape(self.title)}</text></docTitle>
+  <navMap>
+{nav_points}
+  </navMap>
+</ncx>
+'''
+
+    def _build_nav(self, indexes) -> str:
+        items = "\n".join(
+            f'      <li><a href="{self._chapter_file(i)}">{escape(self._titles[i])}</a></li>'
+            for i in indexes
+        )
+        return f'''<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="{self.language}" xml:lang="{self.language}">
+<head>
+  <title>{escape(self.title)}</title>
+</head>
+<body>
+  <nav epub:type="toc" id="id">
+    <h2>{escape(self.title)}</h2>
+    <ol>
+{items}
+    </ol>
+  </nav>
+</body>
+</html>
+'''
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+章节正文提取器
+
+从章节页面HTML中提取标题和 #chaptercontent 正文并清洗。提供三种后端：
+- parsel:     与 Scrapy 选择器相同的实现（XPath 取全部文本节点）
+- lxml:       直接用 lxml 按 id 定位正文节点，用预编译的 XPath 取文本，省去选择器包装
+- selectolax: 基于 lexbor 的解析器，需要额外安装 selectolax
+
+过滤关键词在模块加载时编译为一个正则表达式，每行只需一次匹配。
+"""
+import logging
+import re
+from typing import Iterable, Optional, Pattern, Tuple
+
+from book_crawler.config import INVALID_CHAPTER_KEYWORDS, PARAGRAPH_INDENT
+
+logger = logging.getLogger(__name__)
+
+CONTENT_ID = "chaptercontent"
+
+
+def compile_keyword_filter(keywords: Iterable[str]) -> Pattern:
+    """把关键词列表编译为一个正则表达式，匹配任意一个关键词（子串匹配）"""
+    # 长的关键词放在前面，避免被其前缀抢先匹配
+    ordered = sorted(set(keywords), key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, ordered)))
+
+
+_INVALID_LINE = compile_keyword_filter(INVALID_CHAPTER_KEYWORDS)
+
+
+def clean_lines(lines: Iterable[str]) -> str:
+    """清洗正文的各行：去掉空行和包含过滤关键词的行，加上段首缩进"""
+    search = _INVALID_LINE.search
+    return "\n".join(
+        PARAGRAPH_INDENT + line
+        for line in map(str.strip, lines)
+        if line and not search(line)
+    )
+
+
+def clean_content(text: str) -> str:
+    """清洗章节内容"""
+    if not text:  # 防止 None
+        return ""
+    return clean_lines(text.splitlines())
+
+
+class ParselExtractor:
+    """Scrapy 选择器实现"""
+
+    name = "parsel"
+
+    def __init__(self):
+        from parsel import Selector
+        self._selector = Selector
+
+    def extract(self, body: bytes, encoding: str) -> Tuple[Optional[str], str]:
+        """
+        提取章节标题和清洗后的正文
+
+        返回:
+            (标题, 正文)，页面中没有标题时标题为 None
+        """
+        sel = self._selector(text=body.decode(encoding, errors="replace"))
+        title = sel.css("h1::text").get()
+        raw_texts = sel.xpath(f'//*[@id="{CONTENT_ID}"]//text()').getall()
+        return title, clean_content("\n".join(raw_texts).strip())
+
+
+class LxmlExtractor:
+    """lxml 实现"""
+
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.etree
+        import lxml.html
+        self._html = lxml.html
+        self._parsers = {}
+        # 与 parsel 的 //text() 相同，预编译并关闭 smart_strings 以减少开销
+        self._texts = lxml.etree.XPath(".//text()", smart_strings=False)
+
+    def extract(self, body: bytes, encoding: str) -> Tuple[Optional[str], str]:
+        parser = self._parsers.get(encoding)
+        if parser is None:
+            parser = self._parsers[encoding] = self._html.HTMLParser(encoding=encoding)
+        try:
+            doc = self._html.document_fromstring(body, parser=parser)
+        except Exception:  # 空文档或无法解析
+            return None, ""
+
+        title = next((h1.text for h1 in doc.iter("h1") if h1.text), None)
+
+        node = doc.get_element_by_id(CONTENT_ID, None)
+        if node is None:
+            return title, ""
+        return title, clean_lines("\n".join(self._texts(node)).splitlines())
+
+
+class SelectolaxExtractor:
+    """selectolax (lexbor) 实现"""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def extract(self, body: bytes, encoding: str) -> Tuple[Optional[str], str]:
+        tree = self._parser(body.decode(encoding, errors="replace"))
+        title = None
+        for h1 in tree.css("h1"):
+            title = h1.text(deep=False) or None
+            if title:
+                break
+
+        node = tree.css_first(f"#{CONTENT_ID}")
+        if node is None:
+            return title, ""
+        return title, clean_lines(node.text(separator="\n").splitlines())
+
+
+EXTRACTORS = {
+    cls.name: cls
+    for cls in (ParselExtractor, LxmlExtractor, SelectolaxExtractor)
+}
+
+
+def get_extractor(name: str):
+    """
+    按名称创建提取器，未安装对应解析库时退回到 lxml
+    """
+    try:
+        cls = EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"未知的正文提取器: {name}，可选: {', '.join(EXTRACTORS)}")
+    try:
+        return cls()
+    except ImportError as e:
+        logger.warning(f"正文提取器 {name} 不可用（{e}），改用 lxml")
+        return LxmlExtractor()
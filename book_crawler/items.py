@@ -29,6 +29,10 @@ class ChapterItem(scrapy.Item):
     total_chapters = scrapy.Field()  # 章节总数
     domain = scrapy.Field()  # 使用的域名
     detail_url = scrapy.Field()  # 详情页链接
+    author = scrapy.Field()  # 作者
+    chapters = scrapy.Field()  # 章节列表 [{'title': ..., 'url': ...}]
+    catalog_version = scrapy.Field()  # 目录版本，每次增量刷新追加了新章节时加1
+    new_chapters = scrapy.Field()  # 本次增量刷新追加的章节数
 
 
 class ContentItem(scrapy.Item):
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+下载断点日志 - 记录已写入输出文件的章节索引
+
+日志是只追加的二进制文件，每个章节索引占 4 字节（小端 uint32）。
+相同 task_id 的任务重新启动时读取日志，只下载缺失的章节。
+"""
+import os
+import sys
+from array import array
+from typing import Iterable, Set
+
+
+class ChapterJournal:
+    """只追加的章节完成日志"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed: Set[int] = set()
+        self._file = None
+
+        if os.path.exists(path):
+            data = array("I")
+            with open(path, "rb") as f:
+                raw = f.read()
+            # 进程在写入一半时被杀死会留下不完整的记录，直接截掉
+            aligned = len(raw) - len(raw) % data.itemsize
+            if aligned != len(raw):
+                with open(path, "r+b") as f:
+                    f.truncate(aligned)
+            data.frombytes(raw[:aligned])
+            if sys.byteorder != "little":
+                data.byteswap()
+            self.completed.update(data)
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.completed
+
+    def record(self, indexes: Iterable[int]) -> None:
+        """追加记录已完成的章节索引"""
+        new = array("I", (i for i in indexes if i not in self.completed))
+        if not new:
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "ab")
+        self.completed.update(new)
+        if sys.byteorder != "little":
+            new.byteswap()
+        self._file.write(new.tobytes())
+        self._file.flush()
+
+    def clear(self) -> None:
+        """清空日志（输出文件需要从头重建时使用）"""
+        self.close()
+        self.completed.clear()
+        remove_journal(self.path)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def remove_journal(path: str) -> None:
+    """删除断点日志（任务完成后不再需要续传），文件不存在时忽略"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
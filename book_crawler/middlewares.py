@@ -120,3 +120,123 @@ class BookCrawlerDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+from scrapy.exceptions import NotConfigured
+from book_crawler.domain_health import domain_health, domain_of
+from book_crawler.priority import priority_gate, DEFAULT_CLASS
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    按域名自适应限速
+
+    把每个响应的延迟、状态码和下载异常记录到 domain_health，并把它算出的
+    请求间隔和并发数应用到对应的下载槽上。
+    """
+
+    # 视为封禁信号的状态码
+    BAN_STATUS = {403, 429, 503}
+
+    def __init__(self, crawler, tracker):
+        self.crawler = crawler
+        self.tracker = tracker
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler, domain_health)
+        crawler.signals.connect(s.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        self.tracker.attach()
+
+    def spider_closed(self, spider):
+        self.tracker.detach()
+
+    def request_reached_downloader(self, request, spider):
+        # 下载槽在请求第一次到达下载器时才创建，此时应用已学习到的设置
+        self._apply(request)
+
+    def process_response(self, request, response, spider):
+        domain = domain_of(request.url)
+        if response.status in self.BAN_STATUS:
+            self.tracker.record_ban(domain, self._retry_after(response))
+            spider.logger.warning(f"{domain} 返回 {response.status}，进入冷却期")
+        elif response.status >= 500:
+            self.tracker.record_failure(domain)
+        else:
+            self.tracker.record_success(domain, request.meta.get("download_latency", 0.0))
+        self._apply(request)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self.tracker.record_failure(domain_of(request.url))
+        self._apply(request)
+        return None
+
+    def _apply(self, request):
+        downloader = self.crawler.engine.downloader
+        slot = downloader.slots.get(downloader.get_slot_key(request))
+        if slot is not None:
+            slot.delay, slot.concurrency = self.tracker.limits(domain_of(request.url))
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get(b"Retry-After")
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None  # HTTP日期格式，使用默认冷却时间
+
+
+class PriorityGateMiddleware:
+    """
+    请求进入下载器前向 priority_gate 申请许可，响应或异常返回时归还
+
+    请求的优先级类别取自 request.meta["priority_class"]，没有时视为 interactive；
+    各类别的请求数、等待时间和被提前的次数记入爬虫统计 priority/<类别>/...
+    """
+
+    def __init__(self, crawler, gate):
+        self.crawler = crawler
+        self.gate = gate
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("PRIORITY_GATE_ENABLED"):
+            raise NotConfigured
+        return cls(crawler, priority_gate)
+
+    async def process_request(self, request, spider):
+        priority_class = request.meta.setdefault("priority_class", DEFAULT_CLASS)
+        waited = await self.gate.acquire(priority_class)
+        request.meta["_priority_permit"] = priority_class
+
+        stats = self.crawler.stats
+        stats.inc_value(f"priority/{priority_class}/requests")
+        if waited:
+            stats.inc_value(f"priority/{priority_class}/waited")
+            stats.inc_value(f"priority/{priority_class}/wait_time", waited)
+            stats.max_value(f"priority/{priority_class}/wait_time_max", waited)
+            if waited >= self.gate.max_wait:
+                stats.inc_value(f"priority/{priority_class}/promoted")
+        return None
+
+    def process_response(self, request, response, spider):
+        self._release(request)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._release(request)
+        return None
+
+    def _release(self, request):
+        # 前面的中间件直接返回响应时本中间件没有申请许可
+        priority_class = request.meta.pop("_priority_permit", None)
+        if priority_class is not None:
+            self.gate.release(priority_class)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+章节解析进程池
+
+把章节页面的正文提取和清洗交给独立的工作进程执行，reactor 线程只负责网络 I/O。
+工作进程不直接从带有 reactor 线程的进程 fork：支持 forkserver 的平台上由一个
+预加载了提取器模块的干净服务进程 fork 出工作进程，其他平台使用 spawn。每个
+工作进程只创建一次提取器。PARSE_WORKERS 为 0 时不启用，仍在爬虫线程中解析。
+"""
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from book_crawler.config import CONTENT_EXTRACTOR, PARSE_WORKERS
+
+# 工作进程内的提取器（每个进程首次调用时创建）
+_worker_extractor = None
+
+
+def _extract_in_worker(extractor_name: str, body: bytes, encoding: str) -> Tuple[Optional[str], str]:
+    global _worker_extractor
+    if _worker_extractor is None:
+        from book_crawler.extractors import get_extractor
+        _worker_extractor = get_extractor(extractor_name)
+    return _worker_extractor.extract(body, encoding)
+
+
+class ParsePool:
+    """按需启动的章节解析进程池"""
+
+    def __init__(self, workers: int, extractor_name: str):
+        self.workers = workers
+        self.extractor_name = extractor_name
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def submit(self, body: bytes, encoding: str) -> "Future[Tuple[Optional[str], str]]":
+        """提交一个章节页面，返回 (标题, 正文) 的 Future"""
+        return self._get_executor().submit(_extract_in_worker, self.extractor_name, body, encoding)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context())
+            return self._executor
+
+    @staticmethod
+    def _context():
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["book_crawler.extractors"])
+            return context
+        return multiprocessing.get_context("spawn")
+
+
+# 进程级单例
+parse_pool = ParsePool(PARSE_WORKERS, CONTENT_EXTRACTOR)
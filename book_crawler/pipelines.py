@@ -3,6 +3,7 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 import os
+import shutil
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
@@ -12,52 +13,91 @@ class BookCrawlerPipeline:
     def process_item(self, item, spider):
         return item
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from scrapy.utils.project import get_project_settings
-from config import get_content_txt_filename, get_content_epub_filename
-try:
-    from ebooklib import epub
-except ImportError:
-    print("警告: 未找到 ebooklib 库，无法生成 EPUB 格式文件")
-    epub = None
+from config import (
+    get_content_txt_filename,
+    get_content_epub_filename,
+    TXT_REORDER_WINDOW,
+    TXT_WRITE_BUFFER_SIZE,
+    get_epub_staging_directory,
+)
+from book_crawler.writers import OrderedTxtWriter
+from book_crawler.epub_writer import StreamingEpubWriter
 
 class TxtWriterPipeline:
-    """仅用于content爬虫的TXT文件写入pipeline"""
+    """仅用于content爬虫的TXT文件写入pipeline，按章节索引顺序写入"""
     def open_spider(self, spider):
         # 只有content爬虫才使用这个pipeline
         if spider.name != 'content':
             return
             
-        settings = get_project_settings()
-        self.executor = ThreadPoolExecutor(max_workers=settings.getint("WRITE_CONCURRENCY"))
-        self.tasks = []
         self.book_name = getattr(spider, 'book_name', '未知书名')
         self.output_file_name = get_content_txt_filename(self.book_name)
         os.makedirs(os.path.dirname(self.output_file_name), exist_ok=True)
-        self.output_file = open(self.output_file_name, "w", encoding="utf-8")
+
+        # 更新下载的新章节先写入 .part 文件，全部完成后再追加到已有文件，
+        # 续传时需要重建也不会影响已有的章节
+        appending = getattr(spider, 'append', False)
+        self.part_file_name = f"{self.output_file_name}.part" if appending else None
+        write_file_name = self.part_file_name or self.output_file_name
+
+        # 续传时已写入的章节由断点日志给出；日志中的章节不是从本次范围起点开始的连续章节时
+        # （上次有章节下载失败），追加写入会让这些章节排到文件末尾，改为按顺序重建文件，
+        # 已下载的章节从章节存储读取，不会重新请求网络
+        journal = getattr(spider, 'journal', None)
+        first_index = getattr(spider, 'first_index', 1)
+        if journal and not (os.path.exists(write_file_name) and self._is_prefix(journal.completed, first_index)):
+            spider.logger.warning(f"TxtWriterPipeline: 断点日志与输出文件不一致，按章节顺序重建 {write_file_name}")
+            journal.clear()
+        resuming = bool(journal) and os.path.exists(write_file_name)
+        if resuming:
+            spider.logger.info(f"TxtWriterPipeline: 续传模式，已写入 {len(journal)} 个章节，"
+                               f"追加写入 {write_file_name}")
+        elif appending:
+            spider.logger.info(f"TxtWriterPipeline: 更新模式，完成后追加到 {self.output_file_name}")
+        self.writer = OrderedTxtWriter(
+            write_file_name,
+            first_index=first_index,
+            window=TXT_REORDER_WINDOW,
+            buffer_size=TXT_WRITE_BUFFER_SIZE,
+            mode="a" if resuming else "w",
+            done=journal.completed if resuming and journal is not None else (),
+            on_flush=journal.record if journal is not None else None,
+        )
 
     def process_item(self, item, spider):
         if spider.name != 'content':
             return item
             
         spider.logger.info(f"写入章节: {item['chapter_title']} 内容长度={len(item.get('content', ''))}")
-        future = self.executor.submit(self.write_item, item)
-        self.tasks.append(future)
+        # 内容为空的章节只占位不写入，续传时会重新下载
+        text = self.format_item(item) if item.get('content') else None
+        self.writer.add(int(item.get('chapter_index', 0)), text)
         return item
 
-    def write_item(self, item):
+    def format_item(self, item):
         # 写入逻辑（章节格式化）
-        formatted = f"  {item['chapter_title']}\n\n{item['content']}\n\n--------\n\n"
-        self.output_file.write(formatted)
+        return f"  {item['chapter_title']}\n\n{item['content']}\n\n--------\n\n"
+
+    @staticmethod
+    def _is_prefix(done, first_index):
+        """本次范围内已写入的章节是否是从 first_index 开始的连续章节（分段下载时日志中还有之前分段的章节）"""
+        in_range = sorted(i for i in done if i >= first_index)
+        return not in_range or in_range[-1] - first_index + 1 == len(in_range)
 
     def close_spider(self, spider):
         if spider.name != 'content':
             return
-            
-        for task in as_completed(self.tasks):
-            task.result()  # 确保所有任务完成
-        self.output_file.close()
-        self.executor.shutdown()
+
+        complete = getattr(spider, 'complete', True)
+        self.writer.close(drop_pending=not complete)
+        if self.part_file_name and complete:
+            with open(self.part_file_name, 'rb') as src, open(self.output_file_name, 'ab') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.part_file_name)
+        if self.writer.skipped:
+            spider.logger.warning(f"TxtWriterPipeline: 以下章节未下载成功，已跳过: {self.writer.skipped}")
+        if self.writer.late:
+            spider.logger.warning(f"TxtWriterPipeline: {self.writer.late} 个章节到达过晚，已追加到文件末尾")
 
 
 class NoOutputPipeline:
@@ -67,7 +107,7 @@ class NoOutputPipeline:
 
 
 class EpubWriterPipeline:
-    """用于content爬虫的EPUB文件写入pipeline"""
+    """用于content爬虫的EPUB文件写入pipeline，章节到达即写入暂存目录，关闭时组装EPUB"""
     
     def open_spider(self, spider):
         # 只有content爬虫才使用这个pipeline
@@ -75,25 +115,20 @@ class EpubWriterPipeline:
             spider.logger.info(f"EpubWriterPipeline: 跳过非content爬虫: {spider.name}")
             return
             
-        if epub is None:
-            spider.logger.error("EPUB支持不可用，请安装 ebooklib: pip install ebooklib")
-            return
-            
         self.book_name = getattr(spider, 'book_name', '未知书名')
         self.author = getattr(spider, 'author', '未知作者')
         
         spider.logger.info(f"EpubWriterPipeline: 初始化EPUB写入器，书名: {self.book_name}, 作者: {self.author}")
         
-        # 初始化EPUB书籍
-        self.book = epub.EpubBook()
-        self.book.set_identifier('id123456')
-        self.book.set_title(self.book_name)
-        self.book.set_language('zh')
-        self.book.add_author(self.author)
-        
-        # 存储章节数据，按索引排序
-        self.chapter_data = {}  # 存储章节数据，按索引排序
-        self.spine = ['nav']
+        # 续传或更新下载时保留暂存目录中已写入的章节
+        self.journal = getattr(spider, 'journal', None)
+        self.writer = StreamingEpubWriter(
+            output_path=get_content_epub_filename(self.book_name),
+            staging_dir=get_epub_staging_directory(getattr(spider, 'staging_task', None) or spider.task_id),
+            title=self.book_name,
+            author=self.author,
+            resume=bool(self.journal) or getattr(spider, 'append', False),
+        )
         
         spider.logger.info("EpubWriterPipeline: EPUB书籍初始化完成")
         
@@ -101,25 +136,22 @@ class EpubWriterPipeline:
         if spider.name != 'content':
             return item
             
-        if epub is None:
-            spider.logger.warning("EpubWriterPipeline: ebooklib未安装，跳过EPUB处理")
-            return item
-            
         # 确保pipeline已初始化
-        if not hasattr(self, 'chapter_data'):
+        if not hasattr(self, 'writer'):
             spider.logger.warning("EpubWriterPipeline: 未正确初始化，跳过章节处理")
             return item
             
+        # 内容为空的章节不写入，续传时会重新下载
+        if not item.get('content'):
+            return item
+            
         # 获取章节索引
         chapter_index = int(item.get('chapter_index', 0))
+        self.writer.add_chapter(chapter_index, item['chapter_title'], item['content'])
+        if self.journal is not None:
+            self.journal.record([chapter_index])
         
-        # 存储章节数据
-        self.chapter_data[chapter_index] = {
-            'title': item['chapter_title'],
-            'content': item['content']
-        }
-        
-        spider.logger.info(f"EpubWriterPipeline: 收集EPUB章节: {item['chapter_title']} (索引: {chapter_index})")
+        spider.logger.info(f"EpubWriterPipeline: 写入EPUB章节: {item['chapter_title']} (索引: {chapter_index})")
         return item
         
     def close_spider(self, spider):
@@ -127,122 +159,25 @@ class EpubWriterPipeline:
             spider.logger.info(f"EpubWriterPipeline: 跳过非content爬虫关闭: {spider.name}")
             return
             
-        if epub is None:
-            spider.logger.error("EpubWriterPipeline: ebooklib未安装，无法生成EPUB")
+        if not hasattr(self, 'writer'):
+            spider.logger.error("EpubWriterPipeline: 写入器未初始化")
             return
             
-        # 检查是否有收集到的章节数据
-        if not hasattr(self, 'chapter_data'):
-            spider.logger.error("EpubWriterPipeline: 章节数据未初始化")
+        if not getattr(spider, 'finalize', True):
+            chapter_count = self.writer.close(assemble=False)
+            spider.logger.info(f"EpubWriterPipeline: 分段写入 {chapter_count} 个章节，EPUB在最后一个分段结束时生成")
             return
-            
-        if not self.chapter_data:
+
+        # 批量下载的最后一个分段即使没有新章节，也要用前面分段的章节生成EPUB
+        if not len(self.writer) and not getattr(spider, 'chunk', False):
+            self.writer.close(assemble=False)
             spider.logger.warning("EpubWriterPipeline: 没有收集到任何章节数据")
             return
             
         try:
-            spider.logger.info(f"EpubWriterPipeline: 开始生成EPUB，共收集到 {len(self.chapter_data)} 个章节")
-            
-            # 按索引排序创建章节
-            chapters = []
-            for index in sorted(self.chapter_data.keys()):
-                data = self.chapter_data[index]
-                spider.logger.info(f"EpubWriterPipeline: 创建章节 {index}: {data['title']}")
-                chapter = self._create_epub_chapter(data['title'], data['content'], index)
-                chapters.append(chapter)
-                self.spine.append(chapter)
-            
-            # 设置目录
-            self.book.toc = chapters
-            
-            # 添加导航文件
-            self.book.add_item(epub.EpubNcx())
-            self.book.add_item(epub.EpubNav())
-            
-            # 设置spine
-            self.book.spine = self.spine
-            
-            # 添加CSS样式
-            style = '''
-            body { 
-                font-family: "SimSun", "Songti SC", serif; 
-                line-height: 1.8; 
-                margin: 2em;
-                color: #333;
-            }
-            h1 { 
-                text-align: center; 
-                color: #333; 
-                margin: 2em 0;
-                font-size: 1.5em;
-                border-bottom: 1px solid #ccc;
-                padding-bottom: 0.5em;
-            }
-            p { 
-                text-indent: 2em; 
-                margin: 1em 0;
-                text-align: justify;
-            }
-            '''
-            nav_css = epub.EpubItem(
-                uid="nav_css",
-                file_name="style/nav.css",
-                media_type="text/css",
-                content=style
-            )
-            self.book.add_item(nav_css)
-            
-            # 输出EPUB文件
-            output_path = get_content_epub_filename(self.book_name)
-            spider.logger.info(f"EpubWriterPipeline: 准备写入EPUB文件到: {output_path}")
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            epub.write_epub(output_path, self.book, {})
-            
-            spider.logger.info(f"EpubWriterPipeline: EPUB文件已成功生成: {output_path}，共{len(chapters)}个章节")
+            spider.logger.info(f"EpubWriterPipeline: 开始生成EPUB，共 {len(self.writer)} 个章节")
+            chapter_count = self.writer.close()
+            spider.logger.info(f"EpubWriterPipeline: EPUB文件已成功生成: {self.writer.output_path}，共{chapter_count}个章节")
             
         except Exception as e:
             spider.logger.error(f"EpubWriterPipeline: 生成EPUB失败: {str(e)}", exc_info=True)
-    
-    def _create_epub_chapter(self, title: str, content: str, index: int) -> epub.EpubHtml:
-        """创建EPUB章节"""
-        chapter = epub.EpubHtml(
-            title=title,
-            file_name=f"chapter_{index:04d}.xhtml",
-            lang='zh',
-        )
-        
-        # 格式化内容
-        formatted_content = self._format_epub_content(title, content)
-        chapter.content = formatted_content
-        
-        # 添加到书籍
-        self.book.add_item(chapter)
-        
-        return chapter
-    
-    def _format_epub_content(self, title: str, content: str) -> str:
-        """格式EPUB章节内容"""
-        paragraphs = content.split('\n')
-        formatted_paragraphs = []
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if paragraph:
-                formatted_paragraphs.append(f'<p>{paragraph}</p>')
-        
-        content_html = '\n'.join(formatted_paragraphs)
-        
-        return f'''
-        <html>
-        <head>
-            <title>{title}</title>
-            <link rel="stylesheet" type="text/css" href="../style/nav.css"/>
-        </head>
-        <body>
-            <h1>{title}</h1>
-            {content_html}
-        </body>
-        </html>
-        '''
-
-
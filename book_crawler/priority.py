@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+请求优先级 - 在线阅读的章节优先于新下载的前几章，二者都优先于批量下载
+
+每个章节请求属于一个优先级类别：
+    interactive  在线阅读正在等待的章节（以及搜索、目录等接口在等待的请求）
+    first        新下载任务的前 N 个章节、在线阅读预取的章节
+    bulk         其余的下载请求（长篇下载的后续章节、批量下载）
+
+类别对应 Scrapy 的请求优先级，同一次爬取中由调度器的优先级队列先发出高优先级请求。
+进程内引擎同时运行的多个爬虫之间由 PriorityGate 协调：所有爬虫的请求在进入下载器前
+都要取得许可，许可总数有上限，空出的许可先给高优先级请求；批量请求最多只能占用
+总数减去保留数的许可，在线阅读的请求通常不必排队。等待超过 max_wait 秒的请求不论
+类别优先获得许可，低优先级请求不会被饿死。
+"""
+import asyncio
+import itertools
+import threading
+import time
+from typing import Dict, List
+
+from config import PRIORITY_GATE_MAX_ACTIVE, PRIORITY_BULK_RESERVED, PRIORITY_MAX_WAIT
+
+INTERACTIVE = "interactive"
+FIRST = "first"
+BULK = "bulk"
+
+# 类别 -> Scrapy 请求优先级（越大越先发出）
+PRIORITY_CLASSES: Dict[str, int] = {INTERACTIVE: 200, FIRST: 100, BULK: 0}
+
+# 没有标明类别的请求（搜索、目录等）都有接口在等待结果
+DEFAULT_CLASS = INTERACTIVE
+
+
+def request_priority(priority_class: str) -> int:
+    """类别对应的 Scrapy 请求优先级"""
+    return PRIORITY_CLASSES[priority_class]
+
+
+class _Waiter:
+    __slots__ = ("priority_class", "enqueued_at", "seq", "future")
+
+    def __init__(self, priority_class: str, seq: int, future: "asyncio.Future"):
+        self.priority_class = priority_class
+        self.enqueued_at = time.monotonic()
+        self.seq = seq
+        self.future = future
+
+
+class PriorityGate:
+    """进程内所有爬虫共享的下载许可，按优先级类别分配"""
+
+    def __init__(self, max_active: int, bulk_reserved: int, max_wait: float):
+        """
+        参数:
+            max_active: 同时处于下载器中的请求数上限（所有爬虫合计）
+            bulk_reserved: 为高优先级请求保留的许可数
+            max_wait: 等待超过该时间（秒）的请求优先获得许可
+        """
+        self.max_active = max_active
+        self.bulk_limit = max(1, max_active - bulk_reserved)
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {"granted": 0, "waited": 0, "promoted": 0, "wait_time_total": 0.0, "wait_time_max": 0.0}
+            for name in PRIORITY_CLASSES
+        }
+
+    async def acquire(self, priority_class: str) -> float:
+        """
+        取得一个下载许可，返回等待的秒数
+
+        被取消（如爬虫关闭）时不占用许可
+        """
+        with self._lock:
+            # 每次归还许可都会立即分给可以开始的等待者，这里有空余许可说明没有可以开始的请求在排队
+            if self._can_start(priority_class):
+                self._grant(priority_class, 0.0, promoted=False)
+                return 0.0
+            waiter = _Waiter(priority_class, next(self._seq), asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    return_permit = False
+                else:
+                    return_permit = not waiter.future.cancelled()
+            if return_permit:
+                self.release(priority_class)
+            raise
+
+    def release(self, priority_class: str) -> None:
+        """归还许可，并把空出的许可分给等待中的请求"""
+        with self._lock:
+            self._active[priority_class] = max(0, self._active[priority_class] - 1)
+            self._dispatch()
+
+    def snapshot(self) -> Dict:
+        """当前的许可使用情况和各类别的累计等待统计"""
+        with self._lock:
+            waiting = {name: 0 for name in PRIORITY_CLASSES}
+            for waiter in self._waiters:
+                waiting[waiter.priority_class] += 1
+            return {
+                "max_active": self.max_active,
+                "bulk_limit": self.bulk_limit,
+                "max_wait": self.max_wait,
+                "classes": {
+                    name: dict(self._stats[name], priority=PRIORITY_CLASSES[name],
+                               active=self._active[name], waiting=waiting[name],
+                               wait_time_avg=self._stats[name]["wait_time_total"] / self._stats[name]["granted"]
+                               if self._stats[name]["granted"] else 0.0)
+                    for name in PRIORITY_CLASSES
+                },
+            }
+
+    def _can_start(self, priority_class: str) -> bool:
+        if sum(self._active.values()) >= self.max_active:
+            return False
+        return priority_class != BULK or self._active[BULK] < self.bulk_limit
+
+    def _dispatch(self) -> None:
+        """按 (是否等待过久, 类别优先级, 先来后到) 把空出的许可分给可以开始的请求"""
+        now = time.monotonic()
+        while self._waiters:
+            eligible = [waiter for waiter in self._waiters
+                        if not waiter.future.done() and self._can_start(waiter.priority_class)]
+            self._waiters = [waiter for waiter in self._waiters if not waiter.future.done()]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (now - w.enqueued_at < self.max_wait,
+                                                  -PRIORITY_CLASSES[w.priority_class], w.seq))
+            self._waiters.remove(waiter)
+            waited = now - waiter.enqueued_at
+            self._grant(waiter.priority_class, waited, promoted=waited >= self.max_wait)
+            waiter.future.get_loop().call_soon_threadsafe(self._resolve, waiter, waited)
+
+    def _resolve(self, waiter: _Waiter, waited: float) -> None:
+        if waiter.future.cancelled():
+            # 取得许可前已被取消，许可转给下一个请求
+            self.release(waiter.priority_class)
+        else:
+            waiter.future.set_result(waited)
+
+    def _grant(self, priority_class: str, waited: float, promoted: bool) -> None:
+        self._active[priority_class] += 1
+        stats = self._stats[priority_class]
+        stats["granted"] += 1
+        if waited:
+            stats["waited"] += 1
+            stats["wait_time_total"] += waited
+            stats["wait_time_max"] = max(stats["wait_time_max"], waited)
+        if promoted:
+            stats["promoted"] += 1
+
+
+# 进程级单例
+priority_gate = PriorityGate(PRIORITY_GATE_MAX_ACTIVE, PRIORITY_BULK_RESERVED, PRIORITY_MAX_WAIT)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+下载进度事件总线
+
+content 爬虫（运行在爬虫引擎线程中）发布进度事件，FastAPI 的 SSE 接口在
+asyncio 事件循环中订阅。章节完成事件只保留最新的进度快照，由订阅方按固定
+间隔合并推送；章节失败和任务结束事件逐条保留，保证不会丢失。
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+EVENT_PROGRESS = "progress"
+EVENT_CHAPTER_FAILED = "chapter_failed"
+EVENT_FINISHED = "finished"
+EVENT_KEEPALIVE = "keepalive"
+
+
+class _TaskChannel:
+    """单个任务的事件状态"""
+
+    def __init__(self, max_events: int):
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self.events: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=max_events)
+        self.seq = 0
+        self.finished = False
+        self.updated_at = time.time()
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+
+class ProgressBus:
+    """线程安全的进度事件总线"""
+
+    def __init__(self, max_tasks: int = 256, max_events: int = 1000):
+        self.max_tasks = max_tasks
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._channels: "OrderedDict[str, _TaskChannel]" = OrderedDict()
+
+    def publish(self, task_id: str, event: str, data: Dict[str, Any]) -> None:
+        """
+        发布事件（可在任意线程调用）
+
+        参数:
+            event: EVENT_PROGRESS 只更新快照；其他事件逐条保留
+            data: 事件数据，EVENT_PROGRESS 时为完整的进度快照
+        """
+        with self._lock:
+            channel = self._channel(task_id)
+            if event == EVENT_PROGRESS:
+                channel.snapshot = data
+                channel.version += 1
+            else:
+                channel.seq += 1
+                channel.events.append((channel.seq, event, data))
+                if event == EVENT_FINISHED:
+                    channel.finished = True
+            channel.updated_at = time.time()
+            waiters = list(channel.waiters)
+
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                pass  # 订阅方的事件循环已关闭
+
+    def reset(self, task_id: str) -> None:
+        """任务（重新）开始时清空旧的快照和事件，已有的订阅保持有效"""
+        with self._lock:
+            channel = self._channel(task_id)
+            channel.snapshot = None
+            channel.events.clear()
+            channel.finished = False
+            channel.updated_at = time.time()
+
+    def snapshot(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务最新的进度快照"""
+        with self._lock:
+            channel = self._channels.get(task_id)
+            return dict(channel.snapshot) if channel and channel.snapshot else None
+
+    def has_task(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._channels
+
+    async def subscribe(self, task_id: str, min_interval: float,
+                        keepalive: Optional[float] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        订阅任务事件，产出 (事件类型, 数据)
+
+        两次推送之间至少间隔 min_interval 秒，期间的进度更新合并为一次；
+        任务结束事件推送后迭代结束。设置 keepalive 时，超过该秒数没有事件
+        则产出一次 EVENT_KEEPALIVE。
+        """
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        with self._lock:
+            channel = self._channel(task_id)
+            channel.waiters.append((loop, waiter))
+
+        last_version = 0
+        last_seq = 0
+        try:
+            while True:
+                with self._lock:
+                    snapshot = channel.snapshot
+                    version = channel.version
+                    events = [e for e in channel.events if e[0] > last_seq]
+                    waiter.clear()
+
+                if version != last_version and snapshot is not None:
+                    last_version = version
+                    yield EVENT_PROGRESS, dict(snapshot)
+                for seq, event, data in events:
+                    last_seq = seq
+                    yield event, data
+                    if event == EVENT_FINISHED:
+                        return
+
+                try:
+                    await asyncio.wait_for(waiter.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield EVENT_KEEPALIVE, {}
+                    continue
+                await asyncio.sleep(min_interval)
+        finally:
+            with self._lock:
+                channel.waiters.remove((loop, waiter))
+
+    def _channel(self, task_id: str) -> _TaskChannel:
+        channel = self._channels.get(task_id)
+        if channel is None:
+            channel = self._channels[task_id] = _TaskChannel(self.max_events)
+            self._evict()
+        else:
+            self._channels.move_to_end(task_id)
+        return channel
+
+    def _evict(self) -> None:
+        """任务数超过上限时，丢弃最早的、已结束且无人订阅的任务"""
+        if len(self._channels) <= self.max_tasks:
+            return
+        for task_id, channel in list(self._channels.items()):
+            if channel.finished and not channel.waiters:
+                del self._channels[task_id]
+                if len(self._channels) <= self.max_tasks:
+                    return
+
+
+# 进程级单例
+progress_bus = ProgressBus()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+搜索结果缓存 - 进程内 LRU + SQLite 持久化
+
+- 关键词先规范化再作为缓存键：NFKC（全角字母数字、全角空格转为半角）、
+  合并连续空白并去掉首尾空白、英文字母不区分大小写
+- 有结果和空结果分别使用不同的有效期，空结果只短暂缓存
+- 内存中保留最近使用的若干条，未命中时查询 SQLite；SQLite 中的条目超过上限时
+  按最近访问时间淘汰
+- 统计内存命中、持久化命中和未命中次数，用于调整容量和有效期
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from book_crawler.config import (
+    SEARCH_CACHE_FILE,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_EMPTY_TTL,
+    SEARCH_CACHE_MEMORY_SIZE,
+    SEARCH_CACHE_MAX_ENTRIES,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key         TEXT PRIMARY KEY,
+    keyword     TEXT NOT NULL,
+    results     TEXT NOT NULL,
+    fetched_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache (last_access);
+"""
+
+
+def normalize_keyword(keyword: str) -> str:
+    """规范化搜索关键词，作为缓存键"""
+    return " ".join(unicodedata.normalize("NFKC", keyword or "").split()).casefold()
+
+
+class SearchCache:
+    """搜索结果缓存"""
+
+    def __init__(self, db_path: str, ttl: float, empty_ttl: float, memory_size: int, max_entries: int):
+        """
+        参数:
+            db_path: 数据库文件路径
+            ttl: 有结果时的有效期（秒）
+            empty_ttl: 空结果的有效期（秒），0 表示不缓存空结果
+            memory_size: 内存中保留的条目数
+            max_entries: SQLite 中保留的条目数上限，0 表示不限制
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # 规范化关键词 -> (搜索结果, 过期时间)
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, keyword: str) -> Optional[Any]:
+        """获取搜索结果，未命中或已过期时返回 None"""
+        key = normalize_keyword(keyword)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            conn = self._connect()
+            row = conn.execute("SELECT results, expires_at FROM search_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self.expired += 1
+                    conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+
+            results = json.loads(row[0])
+            conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._remember(key, results, row[1])
+            self.store_hits += 1
+            return results
+
+    def put(self, keyword: str, results: Any) -> None:
+        """写入搜索结果"""
+        ttl = self.ttl if results else self.empty_ttl
+        if not ttl:
+            return
+        key = normalize_keyword(keyword)
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, keyword, results, fetched_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, keyword, json.dumps(results, ensure_ascii=False), now, expires_at, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+            self._remember(key, results, expires_at)
+
+    def invalidate(self, keyword: str) -> None:
+        """删除指定关键词的缓存"""
+        key = normalize_keyword(keyword)
+        with self._lock:
+            self._memory.pop(key, None)
+            conn = self._connect()
+            conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.store_hits
+            total = hits + self.misses
+            store_entries = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+                "memory_entries": len(self._memory),
+                "store_entries": store_entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, results: Any, expires_at: float) -> None:
+        self._memory[key] = (results, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """删除过期条目，条目数超过上限时删除最久未访问的条目"""
+        removed = conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,)).rowcount
+        if self.max_entries:
+            removed += conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.evictions += removed
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+
+# 进程级单例
+search_cache = SearchCache(SEARCH_CACHE_FILE, SEARCH_CACHE_TTL, SEARCH_CACHE_EMPTY_TTL,
+                           SEARCH_CACHE_MEMORY_SIZE, SEARCH_CACHE_MAX_ENTRIES)
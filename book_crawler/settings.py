@@ -14,6 +14,8 @@ from book_crawler.config import (
     RANDOMIZE_DOWNLOAD_DELAY,
     WRITE_CONCURRENCY,
     REQUEST_HEADERS,
+    ADAPTIVE_THROTTLE_ENABLED,
+    PRIORITY_GATE_ENABLED,
 )
 
 BOT_NAME = "book_crawler"
@@ -54,9 +56,21 @@ SPIDER_MIDDLEWARES = {
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "book_crawler.middlewares.BookCrawlerDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    # 位于 RetryMiddleware(550) 之前，重试前先看到原始的响应和异常
+    "book_crawler.middlewares.AdaptiveThrottleMiddleware": 570,
+    # 位于内置中间件之后，请求真正进入下载器前才申请许可
+    "book_crawler.middlewares.PriorityGateMiddleware": 900,
+}
+
+# 按域名自适应调整请求间隔和并发（取代 AutoThrottle，范围见 config.py 的 ADAPTIVE_* 配置）
+ADAPTIVE_THROTTLE_ENABLED = ADAPTIVE_THROTTLE_ENABLED
+
+# 按请求优先级类别（见 book_crawler/priority.py）分配进程内所有爬虫共享的下载许可
+PRIORITY_GATE_ENABLED = PRIORITY_GATE_ENABLED
+
+# 使用作业目录（JOBDIR）时请求保存在磁盘队列中；按先进先出取出，继续下载时恢复的章节先于新发出的章节下载
+SCHEDULER_DISK_QUEUE = "scrapy.squeues.PickleFifoDiskQueue"
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -1,23 +1,64 @@
 import scrapy
-import json
-import os
 from typing import Any, Optional
 
 import book_crawler.config as config
+from book_crawler.catalogs import load_catalog, save_catalog, merge_catalog, stamp_catalog
+from book_crawler.domain_health import domain_of
 from book_crawler.items import ChapterItem
 
 
+def catalog_from_item(item) -> dict:
+    """将 ChapterItem 转换为目录文件的数据结构"""
+    return {
+        'novel_info': {
+            'novel_id': item['novel_id'],
+            'novel_title': item['novel_title'],
+            'author': item.get('author'),
+            'total_chapters': item['total_chapters'],
+            'domain': item['domain'],
+            'detail_url': item['detail_url']
+        },
+        'chapters': item.get('chapters') or [],
+        'catalog_version': item.get('catalog_version', 1),
+    }
+
+
+def item_from_catalog(catalog: dict, new_chapters: int = 0) -> ChapterItem:
+    """将目录文件的数据结构转换为 ChapterItem"""
+    novel_info = catalog.get('novel_info', {})
+    item = ChapterItem()
+    item['novel_id'] = novel_info.get('novel_id')
+    item['novel_title'] = novel_info.get('novel_title')
+    item['total_chapters'] = len(catalog.get('chapters') or [])
+    item['domain'] = novel_info.get('domain')
+    item['detail_url'] = novel_info.get('detail_url')
+    item['author'] = novel_info.get('author')
+    item['chapters'] = catalog.get('chapters') or []
+    item['catalog_version'] = catalog.get('catalog_version', 1)
+    item['new_chapters'] = new_chapters
+    return item
+
+
 class CatalogSpider(scrapy.Spider):
     name: str = "catalog"
-    allowed_domains: list[str] = config.SUPPORTED_DOMAINS
-    handle_httpstatus_list: list[int] = [302]  # 处理重定向状态码
+    allowed_domains: list[str]
+    handle_httpstatus_list: list[int] = [302, 304]  # 处理重定向和条件请求的未修改状态码
     novel_url: Optional[str]
 
-    def __init__(self, novel_url: Optional[str] = None, keyword : Optional[str] = config.KEYWORD, **kwargs: Any):
+    def __init__(self, novel_url: Optional[str] = None, keyword: Optional[str] = None,
+                 incremental=False, domain: Optional[str] = None, **kwargs: Any):
         super().__init__(**kwargs)
+        self.allowed_domains = list(config.SUPPORTED_DOMAINS)
         self.novel_url = novel_url
-        self.keyword = keyword
-        self.logger.info(f"初始化目录爬虫，小说URL: {self.novel_url}")
+        self.keyword = keyword or config.DEFAULT_KEYWORD
+        # incremental=1 时与已保存的目录比较，只追加新章节
+        self.incremental = str(incremental).lower() in ("1", "true", "yes")
+        self.catalog_output_file = config.get_catalog_output_file(self.keyword)
+        self.existing = load_catalog(self.catalog_output_file) if self.incremental else None
+        # 相对URL使用的域名：调用方指定 > 已保存目录的域名 > 默认域名
+        saved_domain = ((self.existing or {}).get('novel_info') or {}).get('domain')
+        self.domain = domain_of(domain or saved_domain or config.DEFAULT_DOMAIN)
+        self.logger.info(f"初始化目录爬虫，小说URL: {self.novel_url}" + ("（增量模式）" if self.existing else ""))
 
 
     def start_requests(self):
@@ -27,21 +68,34 @@ class CatalogSpider(scrapy.Spider):
             return
 
         if self.novel_url.startswith('/'):
-            full_url = f"https://www.{config.CURRENT_DOMAIN}{self.novel_url}"
+            full_url = f"https://www.{self.domain}{self.novel_url}"
         else:
             full_url = self.novel_url
             
         self.logger.info(f"开始爬取小说目录: {full_url}")
-        
+
+        # 增量模式下带上次的 ETag / Last-Modified 发送条件请求，目录未变化时站点返回 304
+        headers = dict(config.REQUEST_HEADERS)
+        validators = (self.existing or {}).get('validators') or {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
         yield scrapy.Request(
             url=full_url,
             callback=self.parse_catalog,
-            headers=config.REQUEST_HEADERS,
+            headers=headers,
             meta={'novel_url': self.novel_url}
         )
     
     def parse_catalog(self, response):
         """解析小说目录页面"""
+        if response.status == 304 and self.existing:
+            self.logger.info("目录未变化（304）")
+            yield from self._keep_existing()
+            return
+
         try:
             # 提取小说基本信息
             novel_title = response.css(config.CSS_SELECTORS['title']).get()
@@ -84,38 +138,51 @@ class CatalogSpider(scrapy.Spider):
             chapter_item['total_chapters'] = total_chapters
             chapter_item['domain'] = domain
             chapter_item['detail_url'] = response.url
+            chapter_item['author'] = author
+            chapter_item['chapters'] = filtered_chapters
             
             self.logger.info(f"成功解析小说: {novel_title}")
             self.logger.info(f"总章节数: {total_chapters}")
             self.logger.info(f"使用域名: {domain}")
             
             # 保存章节信息到文件
-            output_data = {
-                'novel_info': {
-                    'novel_id': chapter_item['novel_id'],
-                    'novel_title': chapter_item['novel_title'],
-                    'author': author,
-                    'total_chapters': chapter_item['total_chapters'],
-                    'domain': chapter_item['domain'],
-                    'detail_url': chapter_item['detail_url']
-                },
-                'chapters': filtered_chapters
+            output_data = catalog_from_item(chapter_item)
+            validators = {
+                'etag': response.headers.get('ETag', b'').decode('latin-1'),
+                'last_modified': response.headers.get('Last-Modified', b'').decode('latin-1'),
             }
-            
+
+            if self.existing:
+                if not filtered_chapters:
+                    # 目录页解析不到章节（多半是错误页），保留已保存的目录
+                    self.logger.warning("新目录中没有章节，保留已保存的目录")
+                    yield from self._keep_existing()
+                    return
+                output_data, added = merge_catalog(self.existing, output_data, validators)
+                self.logger.info(f"增量刷新目录: 新增 {len(added)} 个章节，目录版本 {output_data['catalog_version']}")
+                chapter_item = item_from_catalog(output_data, new_chapters=len(added))
+            else:
+                stamp_catalog(output_data, validators)
+                chapter_item['catalog_version'] = output_data['catalog_version']
+                chapter_item['new_chapters'] = total_chapters
+
             # 使用配置中的输出文件路径
-            catalog_output_file = config.get_catalog_output_file(self.keyword)
-            self.logger.info(f"保存数据到 {catalog_output_file}")
-            os.makedirs(os.path.dirname(catalog_output_file), exist_ok=True)
-            with open(catalog_output_file, "w", encoding="utf-8") as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=4)
+            self.logger.info(f"保存数据到 {self.catalog_output_file}")
+            save_catalog(self.catalog_output_file, output_data)
             
-            self.logger.info(f"章节信息已保存到: {catalog_output_file}")
+            self.logger.info(f"章节信息已保存到: {self.catalog_output_file}")
             
             yield chapter_item
             
         except Exception as e:
             self.logger.error(f"解析目录页面时出错: {str(e)}", exc_info=True)
     
+    def _keep_existing(self):
+        """目录没有变化：只更新确认时间，输出已保存的目录"""
+        self.existing, _ = merge_catalog(self.existing, {})
+        save_catalog(self.catalog_output_file, self.existing)
+        yield item_from_catalog(self.existing)
+
     def _is_valid_chapter(self, title: str) -> bool:
         """
         判断是否为有效章节标题
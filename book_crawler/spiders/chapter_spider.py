@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+章节爬虫 - 按需下载目录中指定的几个章节并写入章节存储
+
+供在线阅读使用：只下载章节存储中还没有的章节，不写输出文件、不记录进度和断点日志。
+章节的下载、清洗和换镜像站重试与内容爬虫相同。
+"""
+import scrapy
+
+from ..config import domain_registry, CONTENT_EXTRACTOR, get_catalog_output_file
+from ..catalog_index import open_catalog_index
+from ..chapter_store import chapter_store
+from ..extractors import get_extractor
+from ..priority import INTERACTIVE, PRIORITY_CLASSES
+from .content_spider import ContentSpider
+
+
+class ChapterSpider(ContentSpider):
+    name = "chapter"
+    custom_settings = {"ITEM_PIPELINES": {}}  # 章节只写入章节存储，不写输出文件
+
+    def __init__(self, book_name: str = None, chapters: str = "", refresh=False,
+                 priority_class: str = INTERACTIVE, **kwargs):
+        """
+        参数:
+            book_name: 书名（目录文件按书名保存）
+            chapters: 要下载的章节索引（从1开始），逗号分隔，如 "12,13,14"
+            refresh: 为真时忽略章节存储，重新下载
+            priority_class: 请求优先级类别，读者正在等待的章节为 interactive，预取为 first
+        """
+        # 不调用 ContentSpider.__init__：章节爬虫没有输出文件、进度文件和断点日志
+        scrapy.Spider.__init__(self, **kwargs)
+        self.allowed_domains = domain_registry.get().copy()
+        self.failed_chapters = []
+        self.book_name = book_name
+        self.task_id = f"chapter:{book_name}"
+        self.chapter_indexes = [int(index) for index in str(chapters).split(",") if index.strip()]
+        self.refresh = str(refresh).lower() in ("1", "true", "yes")
+        self.priority_class = priority_class if priority_class in PRIORITY_CLASSES else INTERACTIVE
+        self.extractor = get_extractor(CONTENT_EXTRACTOR)
+        self.total_chapters = len(self.chapter_indexes)
+        self.downloaded_chapters = 0
+        self._pending = set()
+        self._window_open = None
+        self._resumed = set()
+        self.catalog = open_catalog_index(get_catalog_output_file(book_name)) if book_name else None
+        self.novel_info = self.catalog.novel_info if self.catalog is not None else {}
+        if self.catalog is None:
+            self.logger.error(f"未找到目录文件: {book_name}")
+
+    async def start(self):
+        # 重写了 start_requests 的子类需要同时重写 start，否则 Scrapy 2.13+ 会给出弃用警告
+        async for request in super().start():
+            yield request
+
+    def start_requests(self):
+        if not self.catalog:
+            return
+
+        chapters = {index: self.catalog[index - 1] for index in self.chapter_indexes
+                    if 0 < index <= len(self.catalog)}
+        cached = {} if self.refresh else chapter_store.get_many(
+            self.novel_info.get("novel_id"), (chapter.get("url", "") for chapter in chapters.values())
+        )
+        for index, chapter in chapters.items():
+            if chapter.get("url", "") in cached:
+                continue
+            yield self._chapter_request(index)
+
+    def _priority_class(self, chapter_index):
+        return self.priority_class
+
+    def _chapter_failed(self, chapter_title, chapter_index, url):
+        """章节最终下载失败：不写入章节存储，读取接口据此返回错误"""
+        self.failed_chapters.append(url)
+        return self._make_item(chapter_title, "", chapter_index, url, url.split("/")[2])
+
+    def _update_progress(self, current, total, status):
+        return None
+
+    def closed(self, reason):
+        pass
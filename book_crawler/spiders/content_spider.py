@@ -1,38 +1,36 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import json
 import os
-from json import JSONDecodeError
+import time
 import scrapy
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
 
 from ..config import (
-    SUPPORTED_DOMAINS,
-    PARAGRAPH_INDENT,
-    INVALID_CHAPTER_KEYWORDS,
+    domain_registry,
+    CONTENT_EXTRACTOR,
+    CONTENT_REQUEST_WINDOW,
+    CHAPTER_MIN_LENGTH,
+    CHAPTER_MAX_REDISPATCH,
     REQUEST_HEADERS,
     TEMP_OUTPUT_DIRECTORY,
     get_catalog_output_file,
 )
 from ..items import ContentItem
-
-def clean_content(text: str) -> str:
-    """清洗章节内容"""
-    if not text:  # 防止 None
-        return ""
-
-    lines = [line.strip() for line in text.splitlines()]
-    valid_lines = []
-    for line in lines:
-        if not line:
-            continue
-        if any(kw in line for kw in INVALID_CHAPTER_KEYWORDS):
-            continue
-        valid_lines.append(PARAGRAPH_INDENT + line)
-    return "\n".join(valid_lines)
+from ..catalog_index import open_catalog_index
+from ..extractors import get_extractor
+from ..parse_pool import parse_pool
+from ..chapter_store import chapter_store
+from ..journal import ChapterJournal, remove_journal
+from ..domain_health import domain_health, domain_of
+from ..progress import progress_bus, EVENT_PROGRESS, EVENT_CHAPTER_FAILED, EVENT_FINISHED
+from ..priority import FIRST, BULK, request_priority
+from config import get_journal_filename, PROGRESS_FLUSH_INTERVAL, CONTENT_PRIORITY_FIRST_CHAPTERS
 
 
 class ContentSpider(scrapy.Spider):
     name = "content"
-    allowed_domains = SUPPORTED_DOMAINS.copy()
 
     def __init__(self,
                  start_idx=1,
@@ -40,94 +38,254 @@ class ContentSpider(scrapy.Spider):
                  task_id=None,
                  keyword : str = None,
                  book_name: str = None,
+                 refresh=False,
+                 chunk=False,
+                 append=False,
+                 staging_task=None,
+                 finalize=True,
                  **kwargs):
         super().__init__(**kwargs)
+        self.allowed_domains = domain_registry.get().copy()
         self.failed_chapters = []
-        self.catalog = {}
+        self.catalog = None  # 目录索引（CatalogIndex），按章节范围读取
+        self.novel_info = {}
         self.keyword = keyword
         self.book_name = book_name or keyword
-        self.start_idx = int(start_idx) - 1
+        self.start_idx = max(0, int(start_idx) - 1)  # 转换为0-based索引
+        # chapter_index 是章节在目录中的位置（从1开始），与下载范围无关，
+        # 因此同一task_id分段下载时断点日志中的索引不会冲突
+        self.first_index = self.start_idx + 1
         self.end_idx = int(end_idx) if end_idx and end_idx != '-1' else -1
-        self.task_id = task_id or "default"
+        # 没有指定task_id时按书名和下载范围生成，不同的下载不会共用同一个断点日志和进度文件
+        self.task_id = task_id or f"{self.book_name}_{self.first_index}_{self.end_idx}"
         self.total_chapters = 0
         self.downloaded_chapters = 0
+        # 已进入调度器但还没有完成的章节（见 start）
+        self._pending = set()
+        self._window_open = None
+        # 作业目录恢复的、上次中断时还没有完成的章节
+        self._resumed = set()
+        self._all_requested = False
+        # refresh=1 时忽略章节存储，全部重新下载
+        self.refresh = str(refresh).lower() in ("1", "true", "yes")
+        # chunk=1 表示这是批量下载中的一个分段，任务结束事件由批量调度器发布
+        self.chunk = str(chunk).lower() in ("1", "true", "yes")
+        # finalize=0 表示批量下载的中间分段：EPUB只写入暂存目录，由最后一个分段组装
+        self.finalize = str(finalize).lower() in ("1", "true", "yes")
+        # append=1 表示更新下载：新章节追加到已有的输出文件
+        self.append = str(append).lower() in ("1", "true", "yes")
+        # EPUB暂存目录所属的任务：更新下载时为上次完整下载的任务，新章节合并到它的暂存目录
+        self.staging_task = staging_task or self.task_id
+        self.extractor = get_extractor(CONTENT_EXTRACTOR)
 
         # 进度文件路径
         self.progress_file = f"{TEMP_OUTPUT_DIRECTORY}/progress_{self.task_id}.json"
+        self._progress_written_at = 0.0
+        self._progress_status = None
+
+        # 断点日志：相同task_id重新启动时只下载缺失的章节
+        self.journal = ChapterJournal(get_journal_filename(self.task_id))
+        if self.journal:
+            self.logger.info(f"发现断点日志，已完成 {len(self.journal)} 个章节，继续下载")
 
         catalog_output_file = get_catalog_output_file(self.book_name)
 
         if os.path.exists(catalog_output_file):
             try:
-                with open(catalog_output_file, "r", encoding="utf-8") as f:
-                    self.catalog = json.load(f)
-            except JSONDecodeError as e:
-                self.logger.error(f"catalog读取时出错，该文件不是json文件: {str(e)}")
+                self.catalog = open_catalog_index(catalog_output_file)
+            except ValueError as e:
+                self.logger.error(f"目录索引读取时出错: {str(e)}")
+            if self.catalog is None:
+                self.logger.error(f"catalog读取时出错，该文件不是json文件: {catalog_output_file}")
+            else:
+                self.novel_info = self.catalog.novel_info
         else:
             self.logger.error(f"未找到目录文件: {catalog_output_file}")
             self.logger.error("请先运行目录爬虫")
 
         # 创建进度文件
+        progress_bus.reset(self.task_id)
         self._update_progress(0, self.end_idx - self.start_idx + 1, "starting")
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(spider._spider_idle, signal=signals.spider_idle)
+        return spider
+
+    async def start(self):
+        """
+        Scrapy 2.13+ 的起始请求入口：按窗口逐步发出章节请求
+
+        Scrapy 2.13 会一次性取完 start_requests 的结果放进调度器，这里同时处于调度器和
+        下载器中的章节请求不超过 CONTENT_REQUEST_WINDOW 个，一个章节完成后再发出下一个，
+        调度器占用的内存与下载范围的大小无关（更早版本的 Scrapy 直接按需读取 start_requests）
+        """
+        self._window_open = asyncio.Event()
+        for request_or_item in self.start_requests():
+            if isinstance(request_or_item, scrapy.Request):
+                while len(self._pending) >= CONTENT_REQUEST_WINDOW:
+                    self._window_open.clear()
+                    await self._window_open.wait()
+            yield request_or_item
+
     def start_requests(self):
         if not self.catalog:
             return
 
-        chapters = self.catalog.get("chapters", [])
-
-        # 计算实际的章节范围
-        start = max(0, self.start_idx - 1)  # 转换为0-based索引
-        end = len(chapters) if self.end_idx == -1 else min(self.end_idx, len(chapters))
-
-        target_chapters = chapters[start:end]
-        self.total_chapters = len(target_chapters)
+        # 计算实际的章节范围，按块从索引中读取，不一次性展开整个范围
+        start = self.start_idx
+        end = len(self.catalog) if self.end_idx == -1 else min(self.end_idx, len(self.catalog))
+        self.total_chapters = max(0, end - start)
 
         # 更新进度
         self._update_progress(0, self.total_chapters, "downloading")
 
-        for idx, chapter in enumerate(target_chapters):
-            url_path = chapter.get("url", "")
-            if not url_path.startswith("/book/"):
-                continue
-
-            # 轮流使用 allowed_domains 里的域名
-            domain = self.allowed_domains[idx % len(self.allowed_domains)]
-            full_url = f"https://www.{domain}{url_path}"
-
-            yield scrapy.Request(
-                full_url,
-                headers=REQUEST_HEADERS,
-                callback=self.parse,
-                meta={"chapter": chapter, "chapter_index": idx + 1},
-                dont_filter=True,
+        # 使用作业目录（JOBDIR）时，上次中断时还没有完成的章节请求由调度器从磁盘队列中恢复，
+        # 这里不再重复发出；中断时正在下载、没有留在队列中的章节在爬虫空闲时重新发出（见 _spider_idle）
+        self._resumed = set(getattr(self, "state", {}).get("pending", ())) - self.journal.completed
+        if self._resumed:
+            self.logger.info(f"从作业目录恢复 {len(self._resumed)} 个未完成的章节请求")
+
+        novel_id = self.novel_info.get("novel_id")
+        for block_start in range(start, end, CONTENT_REQUEST_WINDOW):
+            block = self.catalog.slice(block_start, min(block_start + CONTENT_REQUEST_WINDOW, end))
+            # 已下载过的章节直接从章节存储读取
+            cached = {} if self.refresh else chapter_store.get_many(
+                novel_id, (chapter.get("url", "") for chapter in block)
             )
 
-    def parse(self, response):
-        chapter = response.meta["chapter"]
-        chapter_index = response.meta["chapter_index"]
-        novel_info = self.catalog.get("novel_info", {})
+            for idx, chapter in enumerate(block, start=block_start):
+                url_path = chapter.get("url", "")
+                if not url_path.startswith("/book/"):
+                    continue
 
-        item = ContentItem()
-        item["novel_id"] = novel_info.get("novel_id")
-        item["novel_title"] = novel_info.get("novel_title")
-        item["chapter_title"] = (
-            response.css("h1::text").get(default=chapter.get("title", "")).strip()
+                # 断点日志中已完成的章节已经在输出文件里
+                if idx + 1 in self.journal:
+                    self.downloaded_chapters += 1
+                    continue
+                if idx + 1 in self._resumed:
+                    continue
+
+                hit = cached.get(url_path)
+                if hit:
+                    self.crawler.stats.inc_value("chapter_store/hit")
+                    self.downloaded_chapters += 1
+                    self._update_progress(self.downloaded_chapters, self.total_chapters, "downloading")
+                    yield self._make_item(hit["title"], hit["content"], idx + 1, url_path, "chapter_store")
+                    continue
+                self.crawler.stats.inc_value("chapter_store/miss")
+
+                yield self._chapter_request(idx + 1)
+        self._all_requested = True
+
+    @property
+    def complete(self):
+        """范围内的章节都已发出请求并处理完毕（没有被中途停止）"""
+        return self._all_requested and not self._pending and not self._resumed
+
+    def _request_scheduled(self, request, spider):
+        """
+        章节请求进入调度器后才算作未完成的章节
+
+        爬虫停止时最后发出的请求可能不会再进入调度器，它不会保存在作业目录的队列中
+        """
+        chapter_index = request.meta.get("chapter_index")
+        if chapter_index is not None:
+            self._pending.add(chapter_index)
+
+    def _chapter_done(self, chapter_index):
+        """一个章节请求最终完成（下载成功或放弃），窗口中空出一个位置"""
+        self._pending.discard(chapter_index)
+        self._resumed.discard(chapter_index)
+        if self._window_open is not None:
+            self._window_open.set()
+
+    def _spider_idle(self):
+        """
+        调度器中恢复的请求都已完成后，重新发出其余未完成的章节
+
+        正常停止时不会出现这种章节；进程被强制结束时作业目录中的队列可能与爬虫状态不一致
+        """
+        if not self._resumed:
+            return
+        lost, self._resumed = sorted(self._resumed), set()
+        self.logger.info(f"重新下载上次中断时正在下载的 {len(lost)} 个章节")
+        for chapter_index in lost:
+            self.crawler.engine.crawl(self._chapter_request(chapter_index))
+        raise DontCloseSpider
+
+    def _chapter_request(self, chapter_index, tried=()):
+        """
+        构造章节请求：按镜像站健康度选择域名，重新分派时避开已经试过的域名
+
+        meta 中只保存章节索引，章节URL和标题需要时从目录索引中读取
+
+        参数:
+            tried: 该章节已经试过的域名
+        """
+        domain = domain_health.choose(self.allowed_domains, exclude=tried)
+        full_url = f"https://www.{domain}{self.catalog[chapter_index - 1].get('url', '')}"
+        priority_class = self._priority_class(chapter_index)
+
+        return scrapy.Request(
+            full_url,
+            headers=REQUEST_HEADERS,
+            callback=self.parse,
+            errback=self.parse_failure,
+            priority=request_priority(priority_class),
+            meta={"chapter_index": chapter_index, "tried_domains": [*tried, domain],
+                  "priority_class": priority_class},
+            dont_filter=True,
         )
-        item["detail_url"] = response.url
-        item["domain"] = response.url.split("/")[2]
-        item['book_name'] = self.book_name
-        item["chapter_index"] = chapter_index  # 添加章节索引
 
-        # 提取正文
-        raw_texts = response.xpath('//*[@id="chaptercontent"]//text()').getall()
-        raw_text = "\n".join(raw_texts).strip() if raw_texts else ""
+    def _priority_class(self, chapter_index):
+        """新下载的前 CONTENT_PRIORITY_FIRST_CHAPTERS 个章节优先，其余章节和批量下载的分段为后台下载"""
+        if not self.chunk and chapter_index - self.first_index < CONTENT_PRIORITY_FIRST_CHAPTERS:
+            return FIRST
+        return BULK
+
+    def _redispatch(self, request, reason):
+        """换一个镜像站重新下载章节，超过次数上限时返回 None"""
+        tried = request.meta.get("tried_domains", [])
+        if len(tried) > CHAPTER_MAX_REDISPATCH:
+            return None
+        self.crawler.stats.inc_value("chapter/redispatched")
+        self.logger.info(f"{reason}，换镜像站重新下载: {request.url}")
+        return self._chapter_request(request.meta["chapter_index"], tried)
+
+    async def parse(self, response):
+        chapter_index = response.meta["chapter_index"]
+        chapter = self.catalog[chapter_index - 1]
 
-        item["content"] = clean_content(raw_text)
+        # 提取标题和正文（启用解析进程池时在工作进程中执行）
+        try:
+            if parse_pool.enabled:
+                title, content = await asyncio.wrap_future(parse_pool.submit(response.body, response.encoding))
+            else:
+                title, content = self.extractor.extract(response.body, response.encoding)
+        except Exception:
+            # 解析出错时 Scrapy 只记录异常，章节不会再完成，这里归还窗口位置
+            self._chapter_done(chapter_index)
+            raise
+        chapter_title = (title or chapter.get("title", "")).strip()
 
-        if not item["content"]:
+        if len(content) < CHAPTER_MIN_LENGTH:
+            # 空章节或错误页：记入镜像站健康度，换一个镜像站重试
+            domain_health.record_invalid(domain_of(response.url))
+            retry = self._redispatch(response.request, "章节内容为空")
+            if retry is not None:
+                yield retry
+                return
             self.logger.warning(f"章节内容为空: {response.url}")
-            self.failed_chapters.append(response.url)
+            self._chapter_done(chapter_index)
+            yield self._chapter_failed(chapter_title, chapter_index, response.url)
+            return
+
+        item = self._make_item(chapter_title, content, chapter_index, response.url, response.url.split("/")[2])
+        novel_id = self.novel_info.get("novel_id")
+        chapter_store.put(novel_id, chapter.get("url", ""), chapter_title, content)
 
         # 更新进度
         self.downloaded_chapters += 1
@@ -136,28 +294,99 @@ class ContentSpider(scrapy.Spider):
             self.total_chapters,
             "downloading"
         )
+        self._chapter_done(chapter_index)
 
         yield item
 
+    def parse_failure(self, failure):
+        """章节请求失败（重试后仍然失败）时换镜像站重新下载"""
+        request = failure.request
+        retry = self._redispatch(request, f"章节下载失败({failure.value.__class__.__name__})")
+        if retry is not None:
+            yield retry
+            return
+        self.logger.warning(f"章节下载失败: {request.url} {failure.value!r}")
+        chapter_index = request.meta["chapter_index"]
+        self._chapter_done(chapter_index)
+        yield self._chapter_failed(self.catalog[chapter_index - 1].get("title", ""), chapter_index, request.url)
+
+    def _chapter_failed(self, chapter_title, chapter_index, url):
+        """
+        记录最终失败的章节，返回内容为空的Item
+
+        空Item让写入管道知道该章节不会再到达，不必在重排序缓冲区中等待它
+        """
+        self.failed_chapters.append(url)
+        progress_bus.publish(self.task_id, EVENT_CHAPTER_FAILED, {
+            "chapter_index": chapter_index,
+            "chapter_title": chapter_title,
+            "url": url,
+        })
+        self.downloaded_chapters += 1
+        self._update_progress(self.downloaded_chapters, self.total_chapters, "downloading")
+        return self._make_item(chapter_title, "", chapter_index, url, url.split("/")[2])
+
+    def _make_item(self, chapter_title, content, chapter_index, detail_url, domain):
+        """构造章节Item"""
+        novel_info = self.novel_info
+
+        item = ContentItem()
+        item["novel_id"] = novel_info.get("novel_id")
+        item["novel_title"] = novel_info.get("novel_title")
+        item["chapter_title"] = chapter_title
+        item["detail_url"] = detail_url
+        item["domain"] = domain
+        item['book_name'] = self.book_name
+        item["chapter_index"] = chapter_index  # 添加章节索引
+        item["content"] = content
+        return item
+
     def closed(self, reason):
         """爬虫关闭时的回调"""
+        self.journal.close()
+        if reason == "finished" and not self.chunk and not self.failed_chapters:
+            # 所有章节都已写入，断点日志不再需要；批量下载的分段之间还要共用断点日志
+            remove_journal(self.journal.path)
+        if hasattr(self, "state"):
+            # 使用作业目录时，未完成的章节随爬虫状态保存，继续下载时据此恢复
+            self.state["pending"] = sorted(self._pending | self._resumed)
         if reason == "finished":
-            self._update_progress(self.downloaded_chapters, self.total_chapters, "completed")
+            status = "completed"
+        elif reason == "shutdown" and hasattr(self, "state"):
+            status = "paused"  # 被停止（超时、手动停止或服务关闭），可以从作业目录继续
         else:
-            self._update_progress(self.downloaded_chapters, self.total_chapters, "failed")
+            status = "failed"
+        progress_data = self._update_progress(self.downloaded_chapters, self.total_chapters, status)
+        if not self.chunk:
+            progress_bus.publish(self.task_id, EVENT_FINISHED, dict(progress_data, reason=reason))
 
     def _update_progress(self, current, total, status):
-        """更新进度到文件"""
+        """
+        更新进度
+
+        每次更新都发布到进度事件总线；进度文件的写入合并为每 PROGRESS_FLUSH_INTERVAL
+        秒最多一次，状态变化时立即写入。
+        """
+        progress_data = {
+            "task_id": self.task_id,
+            "current": current,
+            "total": total,
+            "percentage": int((current / total * 100)) if total > 0 else 0,
+            "status": status,
+            "failed_chapters": list(self.failed_chapters)
+        }
+        progress_bus.publish(self.task_id, EVENT_PROGRESS, progress_data)
+
+        now = time.monotonic()
+        if status == self._progress_status and now - self._progress_written_at < PROGRESS_FLUSH_INTERVAL:
+            return progress_data
+        self._progress_status = status
+        self._progress_written_at = now
         try:
-            progress_data = {
-                "task_id": self.task_id,
-                "current": current,
-                "total": total,
-                "percentage": int((current / total * 100)) if total > 0 else 0,
-                "status": status,
-                "failed_chapters": self.failed_chapters
-            }
-            with open(self.progress_file, "w", encoding="utf-8") as f:
-                json.dump(progress_data, f, ensure_ascii=False, indent=2)
+            tmp_file = f"{self.progress_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(progress_data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.progress_file)
         except Exception as e:
             self.logger.error(f"更新进度文件失败: {e}")
+        return progress_data
@@ -4,21 +4,21 @@ from urllib.parse import quote
 import scrapy
 
 import book_crawler.config as config
+from book_crawler.cookies import hm_cookie_pool, parse_hm_cookie, is_cookie_rejected
+from book_crawler.tools import generate_hm_cookie
 
 
 class SearchSpider(scrapy.Spider):
     name = "search"
-    allowed_domains = config.SUPPORTED_DOMAINS
 
     def __init__(self, keyword=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.allowed_domains = list(config.SUPPORTED_DOMAINS)
         self.keyword = keyword if keyword else config.DEFAULT_KEYWORD
-        config.KEYWORD = self.keyword
 
         # 当前域名索引
         self.current_domain_index = config.SUPPORTED_DOMAINS.index(config.DEFAULT_DOMAIN)
         self.current_domain = config.DEFAULT_DOMAIN
-        config.CURRENT_DOMAIN = self.current_domain
 
         # 重试控制
         self.retry_count = 0
@@ -27,17 +27,31 @@ class SearchSpider(scrapy.Spider):
         self.logger.info(f"初始化爬虫，搜索关键词: {self.keyword}, 使用域名: {self.current_domain}")
 
     def start_requests(self):
-        yield self.make_request()
+        request = self.make_request()
+        yield request
+
+        # 命中Cookie池但池中Cookie不足或即将过期时，顺带补充一个，不阻塞本次搜索
+        if request.callback == self.parse_api and hm_cookie_pool.needs_refresh(self.current_domain):
+            yield self.make_cookie_request(search_after=False)
 
     def make_request(self):
-        """构造请求"""
+        """构造请求：Cookie池命中时直接搜索，否则先获取 hm Cookie"""
+        cookie = hm_cookie_pool.acquire(self.current_domain)
+        if cookie is None:
+            self.crawler.stats.inc_value("hm_cookie/miss")
+            return self.make_cookie_request(search_after=True)
+
+        self.crawler.stats.inc_value("hm_cookie/hit")
+        return self.make_search_request(cookie)
+
+    def make_search_request(self, cookie):
+        """构造搜索接口请求"""
         encoded_keyword = quote(self.keyword)
         search_api_url = f"https://www.{self.current_domain}/user/search.html?q={encoded_keyword}&so=undefined"
 
         headers = config.REQUEST_HEADERS.copy()
         headers["referer"] = f"https://www.{self.current_domain}/s?q={encoded_keyword}"
-        from book_crawler.tools import get_cookies
-        cookies = get_cookies(domain=self.current_domain, keyword=self.keyword)
+        headers["cookie"] = f"hm={cookie}"
 
         self.logger.info(
             f"尝试请求: {search_api_url} "
@@ -47,16 +61,68 @@ class SearchSpider(scrapy.Spider):
             url=search_api_url,
             callback=self.parse_api,
             headers=headers,
-            cookies=cookies,
-            meta={"keyword": self.keyword, "domain": self.current_domain},
+            meta={
+                "keyword": self.keyword,
+                "domain": self.current_domain,
+                "hm_cookie": cookie,
+                # Cookie 由 hm_cookie_pool 统一管理，不经过 Scrapy 的 cookiejar
+                "dont_merge_cookies": True,
+            },
             errback=self.parse_failure,
             dont_filter=True,
         )
 
+    def make_cookie_request(self, search_after):
+        """
+        通过 Scrapy 下载器获取新的 hm Cookie
+
+        参数:
+            search_after: 获取成功后是否紧接着发起搜索请求
+        """
+        headers = config.REQUEST_HEADERS.copy()
+        headers["cookie"] = f"hm={generate_hm_cookie()}"
+        return scrapy.Request(
+            url=f"https://www.{self.current_domain}/user/hm.html?q={quote(self.keyword)}",
+            callback=self.parse_cookie,
+            headers=headers,
+            meta={
+                "keyword": self.keyword,
+                "domain": self.current_domain,
+                "search_after": search_after,
+                "dont_merge_cookies": True,
+                # 使用独立的下载槽，避免与搜索请求互相受 DOWNLOAD_DELAY 限制
+                "download_slot": f"hm-cookie:{self.current_domain}",
+            },
+            errback=self.parse_failure if search_after else self.parse_cookie_failure,
+            dont_filter=True,
+        )
+
+    def parse_cookie(self, response):
+        """解析 hm.html 返回的 Cookie 并放入Cookie池"""
+        domain = response.meta["domain"]
+        parsed = parse_hm_cookie(response.headers.getlist("Set-Cookie"), config.HM_COOKIE_TTL)
+
+        if parsed is None:
+            self.logger.warning(f"未获取到 hm Cookie，域名: {domain}")
+            if response.meta.get("search_after"):
+                yield from self.parse_failure(self._make_failure(response, "No hm cookie"))
+            return
+
+        cookie, expires_at = parsed
+        hm_cookie_pool.add(domain, cookie, expires_at)
+        self.crawler.stats.inc_value("hm_cookie/refreshed")
+
+        if response.meta.get("search_after"):
+            yield self.make_search_request(cookie)
+
+    def parse_cookie_failure(self, failure):
+        """后台补充Cookie失败时只记录日志，不影响搜索"""
+        self.logger.warning(f"补充 hm Cookie 失败: {getattr(failure, 'value', failure)}")
+
     def _make_failure(self, response, reason="Unknown"):
         """构造一个 fake failure 对象"""
         return type(
-            "FakeFailure", (), {"request": response.request, "value": reason}
+            "FakeFailure", (), {"request": response.request, "value": reason, "response": response}
         )()
 
     def parse_failure(self, failure):
@@ -67,6 +133,13 @@ class SearchSpider(scrapy.Spider):
             failure.request.meta.get("domain") if hasattr(failure, "request") else self.current_domain
         )
 
+        # 只有站点拒绝了请求（重定向或封禁状态码）时，使用的 Cookie 才不再复用；
+        # 空结果、网络错误与 Cookie 无关
+        used_cookie = failure.request.meta.get("hm_cookie") if hasattr(failure, "request") else None
+        response = getattr(failure, "response", None) or getattr(getattr(failure, "value", None), "response", None)
+        if used_cookie and is_cookie_rejected(response):
+            hm_cookie_pool.invalidate(current_domain, used_cookie)
+
         self.logger.error(
             f"请求失败: {getattr(failure, 'value', failure)}, "
             f"域名: {current_domain}, 当前域名重试次数: {self.retry_count}"
@@ -84,7 +157,6 @@ class SearchSpider(scrapy.Spider):
             self.retry_count = 0
             self.current_domain_index = (self.current_domain_index + 1) % len(config.SUPPORTED_DOMAINS)
             self.current_domain = config.SUPPORTED_DOMAINS[self.current_domain_index]
-            config.CURRENT_DOMAIN = self.current_domain
             self.logger.info(f"切换到备用域名: {self.current_domain}")
             yield self.make_request()
 
@@ -125,3 +197,12 @@ class SearchSpider(scrapy.Spider):
         except Exception as e:
             self.logger.error(f"保存 JSON 时出错: {e}", exc_info=True)
             yield from self.parse_failure(self._make_failure(response, "Save error"))
+            return
+
+        # 5. 逐条输出搜索结果，供进程内引擎直接收集
+        for entry in (data if isinstance(data, list) else [data]):
+            yield entry
+
+    def closed(self, reason):
+        """爬虫关闭时输出Cookie池统计"""
+        self.logger.info(f"hm Cookie 池统计: {hm_cookie_pool.stats()}")
@@ -1,7 +1,7 @@
 import hashlib
 import time
 import random
-from typing import List,Dict
+from typing import List
 
 import requests
 
@@ -18,22 +18,6 @@ def generate_hm_cookie() -> str:
     return md5.hexdigest()
 
 
-def get_cookies(domain : str, keyword : str) -> Dict[str, str]:
-    """
-    生成模拟的cookies
-    """
-    from book_crawler.config import REQUEST_HEADERS
-    from urllib.parse import quote
-    return {
-        'hm': (requests.get(
-            f'https://www.{domain}/user/hm.html?q={quote(keyword)}',
-            headers=REQUEST_HEADERS,
-            cookies={'hm': generate_hm_cookie()}
-        ).cookies
-               .values()[0])
-    }
-
-
 def get_supported_domains() -> List[str]:
     """
     安全地获取所有支持的域名列表
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+输出文件写入器
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class OrderedTxtWriter:
+    """
+    按 chapter_index 顺序写入TXT的重排序缓冲写入器
+
+    乱序到达的章节先放入以 chapter_index 为键的缓冲区，凑成连续的一段后
+    合并为一次大块写入。缓冲区超过 window 时认为缺失的章节已下载失败，
+    跳过它们继续写入，因此内存占用只与重排序窗口有关，与书的长度无关。
+
+    续传时以追加模式打开文件，并通过 done 传入已写入的章节索引，
+    写入器会把它们当作已经写过的章节跳过。done 必须是从 first_index 开始的
+    连续章节，否则缺失的章节只能追加到文件末尾（见 TxtWriterPipeline）。
+    """
+
+    def __init__(self, path: str, first_index: int = 1, window: int = 256,
+                 buffer_size: int = 1 << 20, mode: str = "w",
+                 done: Iterable[int] = (),
+                 on_flush: Optional[Callable[[List[int]], None]] = None):
+        """
+        参数:
+            done: 已写入文件的章节索引（续传时使用）
+            on_flush: 每段章节写入文件并刷新后的回调，参数为本次写入的章节索引
+        """
+        self.path = path
+        self.window = window
+        self.next_index = first_index
+        self.on_flush = on_flush
+        self._file = open(path, mode, encoding="utf-8", buffering=buffer_size)
+        self._done: Set[int] = set(done)
+        self._pending: Dict[int, Optional[str]] = {}
+        self._skipped: Set[int] = set()
+        self.written = 0
+        self.late = 0
+
+    def add(self, index: int, text: Optional[str]) -> None:
+        """
+        加入一个章节，能写入时立即写入
+
+        text 为 None 表示该章节下载失败：占住顺序位置但不写入内容
+        """
+        if index in self._done or index in self._pending:
+            return  # 重复的章节
+        if index < self.next_index:
+            if index in self._skipped and text is not None:
+                # 被窗口跳过后才到达的章节，只能追加到末尾
+                self._skipped.discard(index)
+                self.late += 1
+                self._write([(index, text)])
+            return
+
+        self._pending[index] = text
+        self._flush_ready()
+
+        if len(self._pending) > self.window:
+            # 缓冲区已满：跳过缺失的章节，从已到达的最小章节继续
+            resume_index = min(self._pending)
+            self._skipped.update(i for i in range(self.next_index, resume_index) if i not in self._done)
+            self.next_index = resume_index
+            self._flush_ready()
+
+    @property
+    def skipped(self) -> List[int]:
+        """被跳过且至今未到达的章节索引"""
+        return sorted(self._skipped)
+
+    def close(self, drop_pending: bool = False) -> None:
+        """
+        写出缓冲区中剩余的章节（按索引顺序）并关闭文件
+
+        参数:
+            drop_pending: 下载被中途停止时为真，缺失章节之后的章节不写入，
+                续传时重新读取，文件中的章节始终从 first_index 开始连续
+        """
+        if drop_pending:
+            self._pending.clear()
+        if self._pending:
+            indexes = sorted(self._pending)
+            self._skipped.update(
+                i for i in range(self.next_index, indexes[-1])
+                if i not in self._pending and i not in self._done
+            )
+            self._write([(i, self._pending.pop(i)) for i in indexes])
+            self.next_index = indexes[-1] + 1
+        self._file.close()
+
+    def _flush_ready(self) -> None:
+        run = []
+        while self.next_index in self._pending or self.next_index in self._done:
+            if self.next_index in self._pending:
+                run.append((self.next_index, self._pending.pop(self.next_index)))
+            self.next_index += 1
+        if run:
+            self._write(run)
+
+    def _write(self, chapters: List[Tuple[int, Optional[str]]]) -> None:
+        written = [(index, text) for index, text in chapters if text is not None]
+        if not written:
+            return
+        self._file.write("".join(text for _, text in written))
+        self.written += len(written)
+        if self.on_flush is not None:
+            self._file.flush()
+            indexes = [index for index, _ in written]
+            self._done.update(indexes)
+            self.on_flush(indexes)
@@ -11,6 +11,9 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 # ==================== 输出目录配置 ====================
 TEMP_OUTPUT_DIRECTORY = os.path.join(PROJECT_ROOT ,'temp')
 
+# 持久化缓存目录（位于temp子目录中，不受退出时的临时文件清理影响）
+CACHE_DIRECTORY = os.path.join(TEMP_OUTPUT_DIRECTORY, 'cache')
+
 # 移除自动创建output目录逻辑
 # os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
 
@@ -34,11 +37,41 @@ def get_content_epub_filename(book_name='剑来'):
     """获取EPUB格式的小说文件名"""
     return os.path.join(NOVELS_OUTPUT_DIRECTORY, f"{book_name}.epub")
 
+# 断点日志模板 - 记录已写入输出文件的章节，相同task_id的任务重启时据此续传
+JOURNAL_DIRECTORY = os.path.join(TEMP_OUTPUT_DIRECTORY, 'journal')
+
+def get_journal_filename(task_id):
+    """获取断点日志文件名"""
+    return os.path.join(JOURNAL_DIRECTORY, f"{task_id}.journal")
+
+# 作业目录模板 - 内容爬虫的调度队列和爬虫状态保存在磁盘上（Scrapy JOBDIR），超时或被中断的下载可以继续
+JOB_DIRECTORY = os.path.join(TEMP_OUTPUT_DIRECTORY, 'jobs')
+
+def get_job_directory(task_id):
+    """获取下载任务的作业目录"""
+    return os.path.join(JOB_DIRECTORY, task_id)
+
+# EPUB暂存目录模板 - 章节先写入暂存目录，下载结束时再组装为EPUB
+EPUB_STAGING_DIRECTORY = os.path.join(TEMP_OUTPUT_DIRECTORY, 'epub')
+
+def get_epub_staging_directory(task_id):
+    """获取EPUB暂存目录 - 按任务区分，同一本书的多个下载不会共用或清空彼此的暂存目录"""
+    return os.path.join(EPUB_STAGING_DIRECTORY, task_id)
+
 # 进度文件模板
 def get_progress_filename(task_id):
     """获取进度文件名"""
     return os.path.join(TEMP_OUTPUT_DIRECTORY, f"progress_{task_id}.json")
 
+# 进度推送配置 - 爬虫通过进度事件总线推送进度，进度文件只作为子进程模式和命令行的兜底
+PROGRESS_FLUSH_INTERVAL = 0.5  # 进度文件最短写入间隔（秒），状态变化时立即写入
+PROGRESS_EVENT_INTERVAL = 0.3  # SSE 推送进度的最短间隔（秒），期间的进度更新合并为一次
+
+# 任务存储 - 下载任务的状态保存在SQLite中，服务重启和多个工作进程之间共享
+TASK_STORE_FILE = os.path.join(CACHE_DIRECTORY, 'tasks.db')
+TASK_TTL = 7 * 24 * 3600  # 已结束任务的保留时间（秒），0 表示永久保留
+PAUSED_TASK_TTL = 30 * 24 * 3600  # 已暂停任务（可以继续下载）的保留时间（秒），过期后连同作业目录一起清除，0 表示永久保留
+
 # ==================== FastAPI相关配置 ====================
 
 # FastAPI服务器配置
@@ -46,14 +79,34 @@ FASTAPI_HOST = "127.0.0.1"
 FASTAPI_PORT = 8000
 
 # 并发控制配置
-REQUEST_CONCURRENCY = 3      # 请求并发数（降低以避免反爬虫）
+REQUEST_CONCURRENCY = 16     # 全局请求并发上限（各域名的实际速率由自适应限速控制）
 WRITE_CONCURRENCY = 5        # 写入并发数
 CONCURRENT_REQUESTS_PER_DOMAIN = 3           # 每个域名的并发数
 
+# TXT写入配置
+TXT_REORDER_WINDOW = 256          # 重排序缓冲区最多暂存的乱序章节数
+TXT_WRITE_BUFFER_SIZE = 1 << 20   # 文件写缓冲区大小（字节）
+
 # 反爬虫配置
-DOWNLOAD_DELAY = 2           # 请求间隔（秒）
+DOWNLOAD_DELAY = 2           # 请求间隔（秒），自适应限速的初始值
 RANDOMIZE_DOWNLOAD_DELAY = 1  # 随机延迟范围
 
+# 自适应限速配置 - 根据各镜像站的延迟、成功率和封禁信号在以下范围内调整请求间隔和并发数
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_MIN_DELAY = 0.0          # 请求间隔下限（秒），降到下限后才开始增加并发
+ADAPTIVE_MAX_DELAY = 10.0         # 请求间隔上限（秒）
+ADAPTIVE_MIN_CONCURRENCY = 1      # 每个域名的并发下限
+ADAPTIVE_MAX_CONCURRENCY = 8      # 每个域名的并发上限
+ADAPTIVE_TARGET_LATENCY = 2.0     # 目标平均延迟（秒），超过两倍时降速
+ADAPTIVE_BAN_COOLDOWN = 60        # 收到 403/429/503 后的冷却时间（秒）
+
+# 请求优先级配置 - 在线阅读 > 新下载的前几章/预取 > 批量下载，进程内所有爬虫共享下载许可
+PRIORITY_GATE_ENABLED = True
+PRIORITY_GATE_MAX_ACTIVE = 16         # 同时处于下载器中的请求数上限（所有爬虫合计）
+PRIORITY_BULK_RESERVED = 2            # 为高优先级请求保留的许可数，批量请求最多占用其余许可
+PRIORITY_MAX_WAIT = 30                # 等待超过该时间（秒）的请求优先获得许可，防止低优先级请求饿死
+CONTENT_PRIORITY_FIRST_CHAPTERS = 20  # 新下载任务的前N个章节使用较高优先级，便于尽快开始阅读
+
 # ==================== FastAPI应用配置 ====================
 
 # CORS配置 - 可经常性变动的配置
@@ -90,7 +143,7 @@ THREAD_POOL_MAX_WORKERS = 3  # 线程池最大工作线程数
 
 # 临时文件清理配置
 TEMP_CLEANUP_PATTERNS = [
-    "*.json",  # 搜索结果和目录缓存
+    "*.json",  # 搜索结果（目录及其索引保存在缓存目录中，不在此清理）
     "progress_*",  # 进度文件
     "*.tmp",  # 临时文件
     "*.cache"  # 缓存文件
@@ -102,5 +155,54 @@ DEFAULT_START_CHAPTER = 1
 DEFAULT_END_CHAPTER = -1  # -1表示全部章节
 DEFAULT_DOWNLOAD_MODE = "txt"  # txt或epub
 
+# 批量下载配置
+BATCH_MAX_ACTIVE_CRAWLS = 4   # 批量下载同时运行的爬虫数上限（每本书同一时间只运行一个分段）
+BATCH_CHUNK_SIZE = 100        # 每个分段的章节数，分段之间各书轮流调度
+
+# 追更配置 - 定期检查关注的书的目录，有新章节时自动下载
+FOLLOW_ENABLED = True                                        # 是否在服务启动时运行追更调度器
+FOLLOW_STATE_FILE = os.path.join(CACHE_DIRECTORY, 'follows.json')
+FOLLOW_DEFAULT_INTERVAL = 6 * 3600  # 默认检查间隔（秒）
+FOLLOW_MIN_INTERVAL = 10 * 60       # 最短检查间隔（秒）
+FOLLOW_JITTER = 0.2                 # 检查间隔的随机抖动比例
+FOLLOW_MIRROR_SPACING = 5           # 同一镜像站两次检查的最短间隔（秒）
+FOLLOW_MAX_ACTIVE = 2               # 同时进行的检查数上限
+
 # Scrapy爬虫超时配置（秒）
-SPIDER_TIMEOUT = 3600  # 1小时
+SPIDER_TIMEOUT = 3600  # 1小时，超过后下载任务暂停，可通过 /api/download/resume 继续
+SPIDER_STOP_GRACE = 30  # 超时停止爬虫后，等待它保存作业目录并退出的时间（秒）
+LOOKUP_TIMEOUT = 60    # 搜索和目录接口等待爬虫的超时时间
+
+# 目录文件在该时间（秒）内视为最新，超过后目录接口增量刷新目录（只追加新章节）
+CATALOG_TTL = 6 * 3600
+
+# 在线阅读配置 - /api/chapter 读取一个章节时在后台预取其后的章节
+CHAPTER_PREFETCH_COUNT = 3  # 默认预取的章节数
+CHAPTER_PREFETCH_MAX = 10   # 请求中允许指定的最大预取章节数
+
+# 目录分页配置 - /api/catalog 传入 offset/limit 或 chapter_range 时按页返回章节
+CATALOG_PAGE_SIZE = 200       # 只给出起点时每页返回的章节数
+CATALOG_PAGE_MAX_LIMIT = 1000  # 单页最多返回的章节数
+
+# 响应压缩配置 - 超过该大小（字节）且客户端支持时以 gzip 压缩响应
+GZIP_MINIMUM_SIZE = 1024
+GZIP_COMPRESS_LEVEL = 6
+# 下载的小说文件不经过全局压缩（需要保留 Content-Length 和 Range 断点续传），TXT 可在下载接口中按需压缩
+GZIP_EXCLUDE_CONTENT_TYPES = ("text/plain", "application/epub+zip")
+
+# 小说文件下载接口每次读取发送的块大小（字节），文件不会整个读入内存
+FILE_CHUNK_SIZE = 256 * 1024
+
+# 健康检查配置
+HEALTH_CHECK_URL = "https://www.baidu.com"
+HEALTH_CHECK_TIMEOUT = 5  # 秒
+
+# ==================== 爬虫引擎配置 ====================
+
+# 爬虫运行方式："inprocess" 使用常驻的进程内爬虫引擎，"subprocess" 每次启动 scrapy crawl 子进程
+CRAWL_ENGINE_MODE = "inprocess"
+CRAWL_ENGINE_LOG_LEVEL = "INFO"  # 进程内引擎的日志级别
+
+# 下载任务的内容爬虫使用作业目录（Scrapy JOBDIR）：调度队列、去重记录和爬虫状态保存在磁盘上，
+# 超时、停止或服务重启后可以从中断处继续下载（批量下载的分段较短，不使用作业目录）
+CONTENT_JOBDIR_ENABLED = True
@@ -0,0 +1,398 @@
+"""
+批量下载调度器 - 把多本书的下载拆成章节分段，在共享的进程内爬虫引擎上轮流执行
+
+- 每本书先获取目录（目录文件已存在时跳过），再按 chunk_size 拆成若干章节分段
+- 同一本书同一时间只运行一个分段（它们写同一个输出文件），分段之间通过
+  相同的 task_id 共享断点日志，依次追加到输出文件
+- 各书的分段按轮转顺序调度，同时运行的爬虫数不超过 max_active；
+  每个镜像站的总请求速率由 domain_health 在所有运行中的爬虫之间平分
+- 调度完全由爬虫结束的回调驱动，不占用等待线程；回调在引擎的 reactor 线程中触发，
+  状态写入、目录读取和EPUB组装交给调度器的工作线程，不阻塞共享引擎上的其他爬虫
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from book_crawler.catalog_index import open_catalog_index
+from book_crawler.catalogs import mark_downloaded
+from book_crawler.epub_writer import StreamingEpubWriter, TOC_FILE
+from book_crawler.config import get_catalog_output_file
+from book_crawler.journal import remove_journal
+from book_crawler.progress import progress_bus, EVENT_FINISHED
+from config import (
+    get_content_txt_filename,
+    get_content_epub_filename,
+    get_journal_filename,
+    get_epub_staging_directory,
+)
+from fastapi_app.model import DownloadMode
+
+# 正在进行或已结束的书的状态
+BOOK_QUEUED = "queued"
+BOOK_CATALOG = "catalog"
+BOOK_RUNNING = "running"
+BOOK_COMPLETED = "completed"
+BOOK_FAILED = "failed"
+BOOK_STOPPED = "stopped"
+
+FINISHED_STATES = (BOOK_COMPLETED, BOOK_FAILED, BOOK_STOPPED)
+
+
+def pipelines_for(mode: DownloadMode) -> Dict[str, int]:
+    """根据下载格式选择对应的pipeline"""
+    if mode == DownloadMode.epub:
+        return {"book_crawler.pipelines.EpubWriterPipeline": 300}
+    return {"book_crawler.pipelines.TxtWriterPipeline": 300}
+
+
+class BatchBook:
+    """批量任务中的一本书"""
+
+    def __init__(self, batch_id: str, novel_url: str, book_name: str,
+                 start_chapter: int, end_chapter: int, mode: DownloadMode):
+        self.task_id = str(uuid.uuid4())
+        self.batch_id = batch_id
+        self.novel_url = novel_url
+        self.book_name = book_name
+        self.start_chapter = start_chapter
+        self.end_chapter = end_chapter
+        self.mode = mode
+        self.path = get_content_epub_filename(book_name) if mode == DownloadMode.epub \
+            else get_content_txt_filename(book_name)
+        self.status = BOOK_QUEUED
+        self.message = "排队中"
+        self.chunks: Deque[Tuple[int, int]] = deque()
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.chapters_total = 0
+        self.chapters_done = 0   # 已结束的分段中处理过的章节数
+        self.failed_chapters = 0
+        self.catalog_ready = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        current = self.chapters_done
+        if self.status == BOOK_RUNNING:
+            snapshot = progress_bus.snapshot(self.task_id)
+            if snapshot and snapshot.get("status") == "downloading":
+                current += snapshot.get("current", 0)
+        return {
+            "task_id": self.task_id,
+            "book_name": self.book_name,
+            "novel_url": self.novel_url,
+            "start_chapter": self.start_chapter,
+            "end_chapter": self.end_chapter,
+            "mode": self.mode,
+            "path": self.path,
+            "status": self.status,
+            "message": self.message,
+            "chunks_done": self.chunks_done,
+            "chunks_total": self.chunks_total,
+            "current": current,
+            "total": self.chapters_total,
+            "failed_chapters": self.failed_chapters,
+        }
+
+
+class Batch:
+    """一次批量下载请求"""
+
+    def __init__(self, batch_id: str, books: List[BatchBook]):
+        self.batch_id = batch_id
+        self.books = books
+        self.created_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return all(book.status in FINISHED_STATES for book in self.books)
+
+    def to_dict(self, with_books: bool = True) -> Dict[str, Any]:
+        books = [book.to_dict() for book in self.books]
+        counts = {state: 0 for state in (BOOK_QUEUED, BOOK_CATALOG, BOOK_RUNNING) + FINISHED_STATES}
+        for book in books:
+            counts[book["status"]] += 1
+        current = sum(book["current"] for book in books)
+        total = sum(book["total"] for book in books)
+        data = {
+            "batch_id": self.batch_id,
+            "status": "finished" if self.finished else "running",
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created_at)),
+            "books": len(books),
+            "books_by_status": counts,
+            "current": current,
+            "total": total,
+            "percentage": int(current / total * 100) if total else 0,
+            "failed_chapters": sum(book["failed_chapters"] for book in books),
+        }
+        if with_books:
+            data["items"] = books
+        return data
+
+
+class BatchScheduler:
+    """批量下载调度器"""
+
+    def __init__(self, engine, max_active: int, chunk_size: int, max_batches: int = 100,
+                 on_update: Optional[Callable[..., None]] = None):
+        """
+        参数:
+            engine: 进程内爬虫引擎（CrawlEngine）
+            max_active: 同时运行的爬虫数上限
+            chunk_size: 每个分段的章节数
+            max_batches: 保留的批量任务数，超过时丢弃最早的已结束任务
+            on_update: 书的状态变化时的回调 on_update(task_id, **fields)，用于同步任务列表
+        """
+        self.engine = engine
+        self.max_active = max_active
+        self.chunk_size = chunk_size
+        self.max_batches = max_batches
+        self.on_update = on_update
+        self._lock = threading.RLock()
+        self._batches: "OrderedDict[str, Batch]" = OrderedDict()
+        self._ready: Deque[BatchBook] = deque()  # 等待运行下一步的书（轮转顺序）
+        self._active = 0
+        # 处理爬虫结束的回调、启动下一步、清理已结束的书
+        self._worker = ThreadPoolExecutor(max_workers=max_active, thread_name_prefix="batch")
+
+    def submit(self, entries: List[Dict[str, Any]],
+               on_created: Optional[Callable[[Batch], None]] = None) -> Batch:
+        """
+        提交一批下载
+
+        参数:
+            entries: 每项包含 novel_url、book_name、start_chapter、end_chapter、mode
+            on_created: 开始调度前的回调，用于登记各书的任务
+        """
+        batch_id = str(uuid.uuid4())
+        books = [
+            BatchBook(batch_id, entry["novel_url"], entry["book_name"],
+                      entry["start_chapter"], entry["end_chapter"], entry["mode"])
+            for entry in entries
+        ]
+        batch = Batch(batch_id, books)
+        if on_created is not None:
+            on_created(batch)
+        with self._lock:
+            self._batches[batch_id] = batch
+            self._evict()
+            self._ready.extend(books)
+        self._worker.submit(self._pump)
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def list(self) -> List[Batch]:
+        with self._lock:
+            return list(self._batches.values())
+
+    def stop(self, batch_id: str) -> bool:
+        """停止批量任务：排队中的书不再运行，正在运行的爬虫被停止"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return False
+            running = []
+            idle = []
+            for book in batch.books:
+                if book.status in FINISHED_STATES:
+                    continue
+                if book.status in (BOOK_CATALOG, BOOK_RUNNING):
+                    running.append(book.task_id)
+                book.chunks.clear()
+                self._finish(book, BOOK_STOPPED, "任务已停止")
+                if book.task_id not in running:
+                    idle.append(book)
+            self._ready = deque(book for book in self._ready if book.batch_id != batch_id)
+        for task_id in running:
+            self.engine.stop(task_id)
+        # 正在运行的书在爬虫结束后清理（见 _step_done）
+        for book in idle:
+            self._worker.submit(self._cleanup, book)
+        return True
+
+    def shutdown(self) -> None:
+        """停止工作线程，不再处理排队中的回调"""
+        self._worker.shutdown(wait=False, cancel_futures=True)
+
+    def _in_worker(self, callback: Callable[[BatchBook, Any], None], book: BatchBook) -> Callable[[Any], None]:
+        """把爬虫结束的回调从 reactor 线程交给工作线程执行"""
+        return lambda future: self._worker.submit(callback, book, future)
+
+    def _pump(self) -> None:
+        """在并发上限内启动等待中的书的下一步"""
+        while True:
+            with self._lock:
+                if self._active >= self.max_active or not self._ready:
+                    return
+                book = self._ready.popleft()
+                if book.status in FINISHED_STATES:
+                    continue
+                self._active += 1
+            try:
+                self._start(book)
+            except Exception as e:
+                self._step_done(book, error=e)
+
+    def _start(self, book: BatchBook) -> None:
+        if not book.catalog_ready:
+            catalog_file = get_catalog_output_file(book.book_name)
+            if os.path.exists(catalog_file):
+                self._plan(book, self._read_catalog(catalog_file))
+            else:
+                book.status = BOOK_CATALOG
+                book.message = "正在获取目录..."
+                self._notify(book)
+                future = self.engine.submit("catalog", tag=book.task_id,
+                                            novel_url=book.novel_url, keyword=book.book_name)
+                future.add_done_callback(self._in_worker(self._catalog_done, book))
+                return
+
+        if not book.chunks:
+            self._step_done(book)
+            return
+        start, end = book.chunks.popleft()
+        last_chunk = not book.chunks
+        book.status = BOOK_RUNNING
+        book.message = f"正在下载第 {start}-{end} 章"
+        self._notify(book)
+        future = self.engine.submit(
+            "content",
+            settings={"ITEM_PIPELINES": pipelines_for(book.mode)},
+            tag=book.task_id,
+            collect_items=False,
+            start_idx=start,
+            end_idx=end,
+            task_id=book.task_id,
+            book_name=book.book_name,
+            keyword=book.book_name,
+            mode=book.mode.value,
+            chunk=1,
+            # 中间分段只把章节写入暂存目录，最后一个分段结束时才组装整本EPUB
+            finalize=int(last_chunk),
+        )
+        future.add_done_callback(self._in_worker(self._chunk_done, book))
+
+    def _plan(self, book: BatchBook, chapter_count: int) -> None:
+        """根据目录章节数把下载范围拆成分段"""
+        start = max(1, book.start_chapter)
+        end = chapter_count if book.end_chapter == -1 else min(book.end_chapter, chapter_count)
+        book.chunks = deque(
+            (chunk_start, min(chunk_start + self.chunk_size - 1, end))
+            for chunk_start in range(start, end + 1, self.chunk_size)
+        )
+        book.chunks_total = len(book.chunks)
+        book.chapters_total = max(0, end - start + 1)
+        book.catalog_ready = True
+
+    def _catalog_done(self, book: BatchBook, future) -> None:
+        try:
+            result = future.result()
+            if book.status == BOOK_STOPPED:
+                return self._step_done(book)
+            if result.items:
+                chapter_count = len(result.items[0].get("chapters") or [])
+            else:
+                chapter_count = self._read_catalog(get_catalog_output_file(book.book_name))
+            if not chapter_count:
+                raise Exception("获取目录失败，未找到章节")
+            self._plan(book, chapter_count)
+            self._step_done(book)
+        except Exception as e:
+            self._step_done(book, error=e)
+
+    def _chunk_done(self, book: BatchBook, future) -> None:
+        try:
+            result = future.result()
+            snapshot = progress_bus.snapshot(book.task_id) or {}
+            book.chapters_done += snapshot.get("current", 0)
+            book.failed_chapters += len(snapshot.get("failed_chapters", []))
+            book.chunks_done += 1
+            if book.status == BOOK_STOPPED:
+                return self._step_done(book)
+            if not result.finished:
+                raise Exception(f"分段下载未完成: {result.reason}")
+            self._step_done(book)
+        except Exception as e:
+            self._step_done(book, error=e)
+
+    def _step_done(self, book: BatchBook, error: Optional[Exception] = None) -> None:
+        """
+        一步（目录或分段）结束：书还有剩余分段时排到队尾，书已结束时清理
+
+        在工作线程中运行；清理和状态同步完成后才释放并发名额、启动下一步
+        """
+        with self._lock:
+            if book.status not in FINISHED_STATES:
+                if error is not None:
+                    self._finish(book, BOOK_FAILED, str(error))
+                elif book.chunks:
+                    book.status = BOOK_QUEUED
+                    self._ready.append(book)
+                elif book.catalog_ready:
+                    self._finish(book, BOOK_COMPLETED, "下载完成")
+        if book.status in FINISHED_STATES:
+            self._cleanup(book)
+        self._notify(book)
+        with self._lock:
+            self._active -= 1
+        self._pump()
+
+    def _finish(self, book: BatchBook, status: str, message: str) -> None:
+        book.status = status
+        book.message = message
+        progress_bus.publish(book.task_id, EVENT_FINISHED, book.to_dict())
+        self._notify(book)
+
+    def _cleanup(self, book: BatchBook) -> None:
+        """
+        书结束且没有爬虫在运行后清理
+
+        - 分段之间共用的断点日志不再需要（批量任务不能继续下载）
+        - 完整下载完成时记录输出文件包含的章节数和EPUB暂存目录，供更新下载使用
+        - 书失败或被停止时，中间分段还没有组装EPUB，用暂存目录中已下载的章节组装
+        - 其余的EPUB暂存目录被删除
+        """
+        remove_journal(get_journal_filename(book.task_id))
+        staging = book.task_id if book.mode == DownloadMode.epub else None
+        if book.status == BOOK_COMPLETED and book.start_chapter <= 1 and book.end_chapter == -1:
+            staging = mark_downloaded(get_catalog_output_file(book.book_name), book.mode.value,
+                                      book.chapters_total, staging=staging)
+        elif staging and book.status != BOOK_COMPLETED:
+            staging_dir = get_epub_staging_directory(staging)
+            toc = os.path.join(staging_dir, TOC_FILE)
+            if os.path.exists(toc) and os.path.getsize(toc):
+                try:
+                    StreamingEpubWriter(book.path, staging_dir, title=book.book_name, resume=True).close()
+                except Exception as e:
+                    print(f"组装EPUB失败 {book.book_name}: {e}")
+        if staging:
+            shutil.rmtree(get_epub_staging_directory(staging), ignore_errors=True)
+
+    def _notify(self, book: BatchBook) -> None:
+        if self.on_update is not None:
+            self.on_update(book.task_id, status=book.status, message=book.message)
+
+    def _evict(self) -> None:
+        while len(self._batches) > self.max_batches:
+            for batch_id, batch in self._batches.items():
+                if batch.finished:
+                    del self._batches[batch_id]
+                    break
+            else:
+                return
+
+    @staticmethod
+    def _read_catalog(catalog_file: str) -> int:
+        """读取目录文件中的章节数"""
+        try:
+            index = open_catalog_index(catalog_file)
+        except ValueError:
+            return 0
+        return len(index) if index is not None else 0
@@ -0,0 +1,212 @@
+"""
+进程内爬虫引擎 - 在后台线程中常驻 Twisted reactor，按需运行 Scrapy 爬虫
+
+相比每次请求启动一个 `scrapy crawl` 子进程，Scrapy/Twisted 只导入一次，
+爬虫结果通过 item_scraped 信号直接返回，无需经过临时JSON文件。
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from itemadapter import ItemAdapter
+
+from config import CRAWL_ENGINE_LOG_LEVEL
+
+os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "book_crawler.settings")
+
+
+class CrawlResult:
+    """一次爬虫运行的结果"""
+
+    def __init__(self, spider_name: str):
+        self.spider_name = spider_name
+        self.items: List[Dict[str, Any]] = []
+        self.stats: Dict[str, Any] = {}
+        self.reason: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.reason == "finished"
+
+
+class CrawlEngine:
+    """
+    常驻的爬虫引擎
+
+    reactor 运行在独立的守护线程中，所有与 Scrapy 的交互都通过
+    reactor.callFromThread 投递到该线程执行，调用方拿到的是
+    concurrent.futures.Future，可以同步等待也可以在 asyncio 中 await。
+    """
+
+    def __init__(self, log_level: str = "INFO"):
+        self.log_level = log_level
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._reactor = None
+        self._runner = None
+        self._settings = None
+        self._crawlers: Dict[str, Any] = {}  # tag -> Crawler
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动 reactor 线程（重复调用无副作用）"""
+        with self._lock:
+            if self.running:
+                return
+
+            from scrapy.crawler import CrawlerRunner
+            from scrapy.utils.log import configure_logging
+            from scrapy.utils.project import get_project_settings
+
+            self._settings = get_project_settings()
+            self._settings.set("LOG_LEVEL", self.log_level, priority="cmdline")
+            # 并发运行多个爬虫时，每个爬虫都会占用一个 telnet 端口
+            self._settings.set("TELNETCONSOLE_ENABLED", False, priority="cmdline")
+            configure_logging(self._settings)
+
+            loop = asyncio.new_event_loop()
+            from twisted.internet import asyncioreactor
+            try:
+                asyncioreactor.install(eventloop=loop)
+            except Exception:
+                # reactor 已经安装过（例如重复创建引擎），直接复用
+                pass
+            from twisted.internet import reactor
+
+            self._reactor = reactor
+            self._runner = CrawlerRunner(self._settings)
+            self._thread = threading.Thread(
+                target=self._run_reactor,
+                args=(loop,),
+                name="crawl-engine",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run_reactor(self, loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        # 非主线程不能安装信号处理器
+        self._reactor.run(installSignalHandlers=False)
+
+    def submit(self, spider_name: str, settings: Optional[Dict[str, Any]] = None,
+               tag: Optional[str] = None, collect_items: bool = True, **spider_kwargs: Any) -> Future:
+        """
+        提交一次爬虫运行
+
+        参数:
+            spider_name: 爬虫名称（search / catalog / content / chapter）
+            settings: 仅对本次运行生效的 Scrapy 设置
+            tag: 运行标识（如 task_id），可用于 stop()
+            collect_items: 是否把爬取到的 item 收集到 CrawlResult.items；
+                内容/章节爬虫的 item 已由 pipeline 写入文件或章节存储，应传 False，
+                避免整本书的正文在内存中再保留一份
+            spider_kwargs: 传给爬虫构造函数的参数，等价于 `-a key=value`
+
+        返回:
+            Future[CrawlResult]
+        """
+        self.start()
+        future: Future = Future()
+        self._reactor.callFromThread(self._crawl, future, spider_name, settings, tag, collect_items, spider_kwargs)
+        return future
+
+    def run(self, spider_name: str, timeout: Optional[float] = None,
+            settings: Optional[Dict[str, Any]] = None, tag: Optional[str] = None,
+            collect_items: bool = True, **spider_kwargs: Any) -> CrawlResult:
+        """同步运行爬虫并等待结果"""
+        return self.submit(spider_name, settings=settings, tag=tag, collect_items=collect_items,
+                           **spider_kwargs).result(timeout)
+
+    def is_running(self, tag: str) -> bool:
+        """指定标识的爬虫运行是否还没有结束（包括已请求停止、正在关闭的运行）"""
+        return tag in self._crawlers
+
+    def stop(self, tag: str) -> bool:
+        """停止指定标识的爬虫运行"""
+        crawler = self._crawlers.get(tag)
+        if crawler is None:
+            return False
+        self._reactor.callFromThread(self._stop, crawler)
+        return True
+
+    def _stop(self, crawler) -> None:
+        """
+        在 reactor 线程中停止 Crawler
+
+        引擎还在打开爬虫时 crawler.stop() 会抛出 Engine not running，且 Crawler 已被标记为
+        不再运行，爬虫结束后不会再停止引擎，运行永远不会结束；此时等引擎启动后再停止
+        """
+        if crawler not in self._crawlers.values() or not crawler.crawling:
+            return
+        if crawler.engine is None or not crawler.engine.running:
+            self._reactor.callLater(0.1, self._stop, crawler)
+            return
+        crawler.stop()
+
+    def shutdown(self) -> None:
+        """停止所有爬虫并关闭 reactor"""
+        if not self.running:
+            return
+        self._reactor.callFromThread(self._shutdown)
+        self._thread.join(timeout=10)
+
+    def _shutdown(self) -> None:
+        d = self._runner.stop()
+        d.addBoth(lambda _: self._reactor.stop())
+
+    def _crawl(self, future: Future, spider_name: str, settings: Optional[Dict[str, Any]],
+               tag: Optional[str], collect_items: bool, spider_kwargs: Dict[str, Any]) -> None:
+        """在 reactor 线程中创建并启动 Crawler"""
+        from scrapy import signals
+        from scrapy.crawler import Crawler
+
+        # 启动前已被调用方取消（如等待超时）则不再运行；进入运行状态后 Future 不能再被取消
+        if not future.set_running_or_notify_cancel():
+            return
+
+        result = CrawlResult(spider_name)
+        try:
+            spidercls = self._runner.spider_loader.load(spider_name)
+            crawler_settings = self._settings.copy()
+            if settings:
+                crawler_settings.setdict(settings, priority="cmdline")
+            crawler = Crawler(spidercls, crawler_settings)
+        except Exception as e:
+            future.set_exception(e)
+            return
+
+        def on_item_scraped(item, response, spider):
+            result.items.append(ItemAdapter(item).asdict())
+
+        def on_spider_closed(spider, reason):
+            result.reason = reason
+
+        if collect_items:
+            crawler.signals.connect(on_item_scraped, signal=signals.item_scraped, weak=False)
+        crawler.signals.connect(on_spider_closed, signal=signals.spider_closed, weak=False)
+        if tag:
+            self._crawlers[tag] = crawler
+
+        def on_done(_):
+            if tag:
+                self._crawlers.pop(tag, None)
+            result.stats = dict(crawler.stats.get_stats())
+            future.set_result(result)
+
+        def on_error(failure):
+            if tag:
+                self._crawlers.pop(tag, None)
+            future.set_exception(failure.value)
+
+        d = self._runner.crawl(crawler, **spider_kwargs)
+        d.addCallbacks(on_done, on_error)
+
+
+# 进程级单例
+crawl_engine = CrawlEngine(log_level=CRAWL_ENGINE_LOG_LEVEL)
@@ -0,0 +1,320 @@
+"""
+追更调度器 - 定期检查关注的书的目录，有新章节时自动下载
+
+- 每本书有自己的检查间隔，实际间隔加入随机抖动；新关注或服务启动时，首次检查
+  时间在一个间隔内随机分布，避免大量书在同一时刻检查
+- 检查按镜像站分组：同一镜像站两次检查至少相隔 mirror_spacing 秒，被封禁的
+  镜像站推迟检查；同时进行的检查数不超过 max_active
+- 一次检查就是一次更新下载（增量刷新目录，只下载新章节并追加到输出文件），
+  由 runner 执行并返回 Future[新章节数]，失败时为 None
+- 关注列表和每本书的检查状态保存在 JSON 状态文件中，服务重启后继续按计划检查
+- 多个 uvicorn 工作进程时，只有拿到状态文件排他锁的进程运行调度线程，避免同一本书
+  被每个进程各检查一次；各进程通过状态文件共享关注列表，修改前重新读取并加写锁
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 系统：只支持单个工作进程，不加文件锁
+    fcntl = None
+
+import book_crawler.config as crawler_config
+from book_crawler.catalog_index import open_catalog_index
+from book_crawler.domain_health import domain_health, domain_of
+
+
+class FollowedBook:
+    """一本关注的书"""
+
+    FIELDS = ("book_name", "novel_url", "mode", "interval", "next_check_at", "last_checked_at",
+              "last_status", "last_message", "last_new_chapters", "total_new_chapters", "last_task_id")
+
+    def __init__(self, book_name: str, novel_url: str, mode: str, interval: float):
+        self.book_name = book_name
+        self.novel_url = novel_url
+        self.mode = mode
+        self.interval = interval
+        self.next_check_at = 0.0
+        self.last_checked_at: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_message: Optional[str] = None
+        self.last_new_chapters = 0
+        self.total_new_chapters = 0
+        self.last_task_id: Optional[str] = None
+        self.checking = False
+
+    @property
+    def mirror(self) -> str:
+        """
+        检查时请求的镜像站
+
+        相对URL与目录爬虫的选择一致：使用已保存目录的镜像站，没有目录时使用默认镜像站
+        """
+        if "://" in self.novel_url:
+            return domain_of(self.novel_url)
+        index = open_catalog_index(crawler_config.get_catalog_output_file(self.book_name))
+        saved_domain = index.novel_info.get("domain") if index is not None else None
+        return domain_of(saved_domain or crawler_config.DEFAULT_DOMAIN)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data["checking"] = self.checking
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FollowedBook":
+        book = cls(data["book_name"], data["novel_url"], data.get("mode", "txt"), data["interval"])
+        book.load(data)
+        return book
+
+    def load(self, data: Dict[str, Any]) -> None:
+        for field in self.FIELDS:
+            if field in data:
+                setattr(self, field, data[field])
+
+
+class FollowScheduler:
+    """追更调度器"""
+
+    def __init__(self, state_file: str, runner: Callable[[FollowedBook], "Future[Optional[int]]"],
+                 default_interval: float, min_interval: float, jitter: float,
+                 mirror_spacing: float, max_active: int, tick: float = 1.0):
+        """
+        参数:
+            state_file: 状态文件路径
+            runner: 执行一次更新下载，返回 Future[新章节数]（失败时为 None）
+            default_interval: 默认检查间隔（秒）
+            min_interval: 允许设置的最短检查间隔（秒）
+            jitter: 间隔的随机抖动比例，0.2 表示实际间隔在 ±20% 内随机
+            mirror_spacing: 同一镜像站两次检查的最短间隔（秒）
+            max_active: 同时进行的检查数上限
+            tick: 调度线程检查到期书目的间隔（秒）
+        """
+        self.state_file = state_file
+        self.runner = runner
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.mirror_spacing = mirror_spacing
+        self.max_active = max_active
+        self.tick = tick
+        self._lock = threading.RLock()
+        self._books: Dict[str, FollowedBook] = {}
+        self._mirror_last_check: Dict[str, float] = {}
+        self._active = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._leader_file = None
+        self._state_mtime: Optional[int] = None
+        with self._lock:
+            self._reload()
+
+    def start(self) -> bool:
+        """
+        启动调度线程
+
+        返回:
+            其他工作进程已在运行调度线程（持有 <state_file>.lock 的排他锁）时返回 False
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return True
+            if not self._acquire_leader():
+                return False
+            self._spread_overdue()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="follow-scheduler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._leader_file is not None:
+            self._leader_file.close()  # 关闭文件即释放锁
+            self._leader_file = None
+
+    def _acquire_leader(self) -> bool:
+        """获取调度线程的排他锁，锁在进程退出或 stop() 时释放"""
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        lock_file = open(f"{self.state_file}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._leader_file = lock_file
+        return True
+
+    def follow(self, book_name: str, novel_url: str, mode: str = "txt",
+               interval: Optional[float] = None) -> FollowedBook:
+        """关注一本书，已关注时更新其URL、格式和检查间隔"""
+        interval = max(self.min_interval, interval or self.default_interval)
+        with self._modify():
+            book = self._books.get(book_name)
+            if book is None:
+                book = self._books[book_name] = FollowedBook(book_name, novel_url, mode, interval)
+                book.next_check_at = time.time() + random.uniform(0, min(interval, self.default_interval))
+            else:
+                book.novel_url, book.mode = novel_url, mode
+                if interval != book.interval:
+                    book.interval = interval
+                    book.next_check_at = min(book.next_check_at, time.time() + self._jittered(interval))
+            return book
+
+    def unfollow(self, book_name: str) -> bool:
+        with self._modify():
+            return self._books.pop(book_name, None) is not None
+
+    def check_now(self, book_name: str) -> bool:
+        """把一本书的下一次检查提前到现在（仍受镜像站间隔限制）"""
+        with self._modify():
+            book = self._books.get(book_name)
+            if book is None:
+                return False
+            book.next_check_at = time.time()
+            return True
+
+    def get(self, book_name: str) -> Optional[FollowedBook]:
+        with self._lock:
+            self._reload()
+            return self._books.get(book_name)
+
+    def list(self) -> List[FollowedBook]:
+        with self._lock:
+            self._reload()
+            return sorted(self._books.values(), key=lambda book: book.next_check_at)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick):
+            try:
+                self._dispatch_due()
+            except Exception as e:
+                print(f"追更调度出错: {e}")
+
+    def _dispatch_due(self) -> None:
+        """启动已到期的检查：按到期先后，每个镜像站每 mirror_spacing 秒最多一次"""
+        now = time.time()
+        started = []
+        with self._lock:
+            # 其他工作进程可能修改了关注列表
+            self._reload()
+            due = sorted(
+                (book for book in self._books.values() if not book.checking and book.next_check_at <= now),
+                key=lambda book: book.next_check_at,
+            )
+            for book in due:
+                if self._active >= self.max_active:
+                    break
+                mirror = book.mirror
+                if now - self._mirror_last_check.get(mirror, 0.0) < self.mirror_spacing:
+                    continue
+                if domain_health.is_banned(mirror):
+                    continue
+                self._mirror_last_check[mirror] = now
+                book.checking = True
+                self._active += 1
+                started.append(book)
+
+        for book in started:
+            try:
+                future = self.runner(book)
+            except Exception as e:
+                self._check_done(book, None, str(e))
+                continue
+            future.add_done_callback(lambda f, book=book: self._check_done(book, *self._outcome(f)))
+
+    @staticmethod
+    def _outcome(future: Future):
+        try:
+            return future.result(), None
+        except Exception as e:
+            return None, str(e)
+
+    def _check_done(self, book: FollowedBook, new_chapters: Optional[int], error: Optional[str]) -> None:
+        with self._modify():
+            self._active -= 1
+            book.checking = False
+            now = time.time()
+            book.last_checked_at = now
+            if new_chapters is None:
+                book.last_status = "failed"
+                book.last_message = error or "更新失败"
+                # 失败后较快重试，但不短于最短间隔
+                book.next_check_at = now + self._jittered(max(self.min_interval, book.interval / 4))
+            else:
+                book.last_status = "completed"
+                book.last_message = f"新增 {new_chapters} 个章节" if new_chapters else "没有新章节"
+                book.last_new_chapters = new_chapters
+                book.total_new_chapters += new_chapters
+                book.next_check_at = now + self._jittered(book.interval)
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _spread_overdue(self) -> None:
+        """停机期间已到期的检查在一个间隔内随机分布，避免启动时集中检查"""
+        now = time.time()
+        with self._modify():
+            for book in self._books.values():
+                if book.next_check_at < now:
+                    book.next_check_at = now + random.uniform(0, min(book.interval, self.default_interval))
+
+    def _reload(self) -> None:
+        """状态文件被其他工作进程修改过时重新读取；已有的书原地更新，正在进行的检查仍然引用同一个对象"""
+        data = self._read_state()
+        if data is None:
+            return
+        books = {}
+        for entry in data.get("books", []):
+            book = self._books.get(entry["book_name"])
+            if book is None:
+                book = FollowedBook.from_dict(entry)
+            else:
+                book.load(entry)
+            books[book.book_name] = book
+        self._books = books
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        """读取状态文件，文件不存在、没有变化或无法解析时返回 None"""
+        try:
+            mtime = os.stat(self.state_file).st_mtime_ns
+            if mtime == self._state_mtime:
+                return None
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._state_mtime = mtime
+        return data
+
+    @contextmanager
+    def _modify(self) -> Iterator[None]:
+        """读取-修改-写回状态文件，多个工作进程的修改通过 <state_file>.write.lock 串行执行"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(f"{self.state_file}.write.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._reload()
+                yield
+                self._save()
+
+    def _save(self) -> None:
+        tmp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"books": [book.to_dict() for book in self._books.values()]}, f, ensure_ascii=False)
+        os.replace(tmp_file, self.state_file)
+        self._state_mtime = os.stat(self.state_file).st_mtime_ns
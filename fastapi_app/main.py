@@ -1,18 +1,27 @@
+import asyncio
 import os
 
 import requests
-from fastapi import FastAPI, HTTPException, Query, Body, Depends
+from fastapi import FastAPI, HTTPException, Query, Body, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+from fastapi.responses import StreamingResponse, Response, JSONResponse, FileResponse
 import subprocess
 import json
+import hashlib
+import zlib
 import uuid
 import signal
 import atexit
 import glob
+import shutil
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, Iterator
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_futures
 from pathlib import Path
+from urllib.parse import quote
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -20,7 +29,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from fastapi_app.model import SearchRequest, CatalogRequest,DownloadRequest,DownloadMode
+from fastapi_app.model import SearchRequest, CatalogRequest,DownloadRequest,DownloadMode,BatchRequest,UpdateRequest,FollowRequest
 
 from config import (
     TEMP_OUTPUT_DIRECTORY,
@@ -40,9 +49,57 @@ from config import (
     DEFAULT_START_CHAPTER,
     DEFAULT_END_CHAPTER,
     DEFAULT_DOWNLOAD_MODE,
-    SPIDER_TIMEOUT
+    SPIDER_TIMEOUT,
+    SPIDER_STOP_GRACE,
+    LOOKUP_TIMEOUT,
+    CATALOG_TTL,
+    CATALOG_PAGE_SIZE,
+    CATALOG_PAGE_MAX_LIMIT,
+    CHAPTER_PREFETCH_COUNT,
+    CHAPTER_PREFETCH_MAX,
+    GZIP_MINIMUM_SIZE,
+    GZIP_COMPRESS_LEVEL,
+    GZIP_EXCLUDE_CONTENT_TYPES,
+    FILE_CHUNK_SIZE,
+    FOLLOW_ENABLED,
+    FOLLOW_STATE_FILE,
+    FOLLOW_DEFAULT_INTERVAL,
+    FOLLOW_MIN_INTERVAL,
+    FOLLOW_JITTER,
+    FOLLOW_MIRROR_SPACING,
+    FOLLOW_MAX_ACTIVE,
+    get_epub_staging_directory,
+    HEALTH_CHECK_URL,
+    HEALTH_CHECK_TIMEOUT,
+    CRAWL_ENGINE_MODE,
+    CONTENT_JOBDIR_ENABLED,
+    BATCH_MAX_ACTIVE_CRAWLS,
+    BATCH_CHUNK_SIZE,
+    TASK_STORE_FILE,
+    TASK_TTL,
+    PAUSED_TASK_TTL,
+    PROGRESS_EVENT_INTERVAL,
+    PROGRESS_FLUSH_INTERVAL,
+    get_progress_filename,
+    get_job_directory,
+    get_journal_filename,
 )
 from book_crawler.config import get_catalog_output_file, get_search_output_file
+from book_crawler.spiders.catalog_spider import catalog_from_item
+from book_crawler.catalogs import catalog_checked_at, mark_downloaded
+from book_crawler.catalog_index import open_catalog_index
+from book_crawler.chapter_store import chapter_store
+from book_crawler.journal import remove_journal
+from book_crawler.priority import priority_gate, INTERACTIVE, FIRST
+from book_crawler.cookies import hm_cookie_pool
+from book_crawler.domain_health import domain_health
+from book_crawler.parse_pool import parse_pool
+from book_crawler.search_cache import search_cache, normalize_keyword
+from book_crawler.progress import progress_bus, EVENT_PROGRESS, EVENT_FINISHED, EVENT_KEEPALIVE
+from fastapi_app.engine import crawl_engine, CrawlResult
+from fastapi_app.batch import BatchScheduler, pipelines_for
+from fastapi_app.task_store import TaskStore
+from fastapi_app.follow import FollowScheduler
 
 app = FastAPI(title="小说爬虫API", description="基于Scrapy的小说爬虫FastAPI接口")
 
@@ -56,13 +113,34 @@ app.add_middleware(
     expose_headers=CORS_EXPOSE_HEADERS,
     max_age=CORS_MAX_AGE,
 )
+# 压缩较大的JSON响应（目录等）；SSE 进度流和小说文件不压缩
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL,
+                   exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + GZIP_EXCLUDE_CONTENT_TYPES)
 
 app.state.current_book_name = None
 app.state.current_keyword = None
 
 # 任务管理 - 使用config.py中的可配置线程池大小
 executor = ThreadPoolExecutor(max_workers=THREAD_POOL_MAX_WORKERS)
-tasks = {}  # 存储任务状态
+# 存储任务状态；已暂停的任务过期后删除它的作业目录、断点日志和EPUB暂存目录
+tasks = TaskStore(TASK_STORE_FILE, TASK_TTL, paused_ttl=PAUSED_TASK_TTL,
+                  on_evict_paused=lambda task: discard_paused_task(task["task_id"]))
+
+# SSE 连接在没有事件时发送注释行的间隔（秒），避免被代理断开
+SSE_KEEPALIVE_INTERVAL = 15
+
+# 正在进行的搜索/目录/健康检查，相同参数的并发请求共享同一次执行
+inflight_calls: Dict[Tuple[Any, ...], "asyncio.Future"] = {}
+
+
+def update_task(task_id: str, **fields: Any) -> None:
+    """更新任务状态"""
+    tasks.update(task_id, **fields)
+
+
+# 批量下载调度器 - 各书的状态变化同步到任务列表
+batch_scheduler = BatchScheduler(crawl_engine, max_active=BATCH_MAX_ACTIVE_CRAWLS,
+                                 chunk_size=BATCH_CHUNK_SIZE, on_update=update_task)
 
 
 # 清理函数 - 使用config.py中的清理模式配置
@@ -85,6 +163,43 @@ def cleanup_on_exit():
 atexit.register(cleanup_on_exit)
 
 
+@app.on_event("startup")
+def start_follow_scheduler():
+    """服务启动时运行追更调度器；多个工作进程时只在其中一个进程中运行"""
+    if FOLLOW_ENABLED and not follow_scheduler.start():
+        print("追更调度器已在其他工作进程中运行")
+
+
+@app.on_event("startup")
+def recover_interrupted_tasks():
+    """
+    服务启动时处理上次运行中被中断的任务（服务重启或进程被杀死时任务仍是 running，
+    批量下载的书还可能是 queued / catalog）
+
+    有作业目录的任务标记为已暂停，可以继续下载；其余任务标记为失败。
+    批量下载的书没有作业目录，标记为失败并删除分段共用的断点日志和EPUB暂存目录
+    """
+    for task in tasks.orphaned():
+        task_id = task["task_id"]
+        if task.get("batch_id"):
+            remove_journal(get_journal_filename(task_id))
+            remove_epub_staging(task_id)
+        elif pause_task(task_id, "服务重启，下载已中断，可继续下载"):
+            continue
+        update_task(task_id, status="failed", message="服务重启，任务已中断")
+
+
+@app.on_event("shutdown")
+def shutdown_crawl_engine():
+    """服务关闭时停止追更调度器、批量下载调度器、进程内爬虫引擎和章节解析进程池"""
+    follow_scheduler.stop()
+    batch_scheduler.shutdown()
+    crawl_engine.shutdown()
+    parse_pool.shutdown()
+    tasks.close()
+    search_cache.close()
+
+
 # 处理信号
 def signal_handler(signum, frame):
     """处理中断信号"""
@@ -155,6 +270,14 @@ def get_download_params(
     )
 
 
+class SpiderTimeout(Exception):
+    """爬虫运行超过 SPIDER_TIMEOUT，已被停止"""
+
+
+class TaskConflict(Exception):
+    """同一本书已有写同一输出文件的下载任务在进行中"""
+
+
 def run_scrapy_spider(spider_name: str, args: List[str] = []) -> Dict[str, Any]:
     """
     运行Scrapy爬虫并返回结果
@@ -165,57 +288,600 @@ def run_scrapy_spider(spider_name: str, args: List[str] = []) -> Dict[str, Any]:
         print(f"执行命令: {' '.join(cmd)}")
 
         # 执行Scrapy爬虫 - 使用config.py中的超时配置
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=".", timeout=SPIDER_TIMEOUT)
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=".")
+        try:
+            stdout, stderr = process.communicate(timeout=SPIDER_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            # 先发送 SIGINT 让 Scrapy 正常关闭（保存作业目录），超过等待时间再强制结束
+            process.send_signal(signal.SIGINT)
+            try:
+                process.communicate(timeout=SPIDER_STOP_GRACE)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+            raise SpiderTimeout("爬虫执行超时")
+
+        if process.returncode != 0:
+            raise Exception(f"爬虫执行失败: {stderr}")
+
+        return {"success": True, "stdout": stdout, "stderr": stderr}
+    except SpiderTimeout:
+        raise
+    except Exception as e:
+        raise Exception(f"执行爬虫时出错: {str(e)}")
+
+
+def run_spider(spider_name: str, settings: Optional[Dict[str, Any]] = None, tag: Optional[str] = None,
+               collect_items: bool = True, **spider_kwargs: Any) -> Optional[CrawlResult]:
+    """
+    运行爬虫 - 根据 CRAWL_ENGINE_MODE 选择进程内引擎或 scrapy crawl 子进程
+
+    进程内模式直接返回爬取结果；子进程模式返回 None，结果需从输出文件读取。
+    collect_items 为 False 时结果中不收集 item，用于输出已由 pipeline 落盘的内容/章节爬虫
+    """
+    if CRAWL_ENGINE_MODE == "subprocess":
+        args = []
+        for key, value in spider_kwargs.items():
+            args += ["-a", f"{key}={value}"]
+        for key, value in (settings or {}).items():
+            args += ["-s", f"{key}={json.dumps(value) if isinstance(value, dict) else value}"]
+        run_scrapy_spider(spider_name, args)
+        return None
+
+    tag = tag or f"{spider_name}:{uuid.uuid4()}"
+    future = crawl_engine.submit(spider_name, settings=settings, tag=tag, collect_items=collect_items,
+                                 **spider_kwargs)
+    try:
+        return future.result(SPIDER_TIMEOUT)
+    except FutureTimeoutError:
+        # 停止爬虫并等待它关闭，使用作业目录时未完成的请求和爬虫状态随之保存
+        crawl_engine.stop(tag)
+        wait_futures([future], SPIDER_STOP_GRACE)
+        raise SpiderTimeout("爬虫执行超时")
+    except Exception as e:
+        raise Exception(f"执行爬虫时出错: {str(e)}")
+
+
+async def run_spider_async(spider_name: str, settings: Optional[Dict[str, Any]] = None,
+                           tag: Optional[str] = None, timeout: float = SPIDER_TIMEOUT,
+                           collect_items: bool = True, **spider_kwargs: Any) -> Optional[CrawlResult]:
+    """
+    run_spider 的异步版本 - 等待爬虫结束时不阻塞事件循环
 
-        if result.returncode != 0:
-            raise Exception(f"爬虫执行失败: {result.stderr}")
+    进程内模式直接等待引擎返回的 Future，超时后停止这次爬虫运行；
+    子进程模式在线程池中等待 scrapy crawl 子进程
+    """
+    if CRAWL_ENGINE_MODE == "subprocess":
+        return await asyncio.to_thread(run_spider, spider_name, settings, tag, collect_items, **spider_kwargs)
 
-        return {"success": True, "stdout": result.stdout, "stderr": result.stderr}
-    except subprocess.TimeoutExpired:
+    tag = tag or f"{spider_name}:{uuid.uuid4()}"
+    future = crawl_engine.submit(spider_name, settings=settings, tag=tag, collect_items=collect_items,
+                                 **spider_kwargs)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        crawl_engine.stop(tag)
         raise Exception("爬虫执行超时")
     except Exception as e:
         raise Exception(f"执行爬虫时出错: {str(e)}")
 
 
+async def coalesce(key: Tuple[Any, ...], factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    合并相同 key 的并发调用 - 第一个调用者启动 factory()，其余调用者等待同一个结果
+
+    共享的任务不随单个请求取消：客户端断开时其他等待者仍能拿到结果
+    """
+    future = inflight_calls.get(key)
+    if future is None:
+        future = asyncio.ensure_future(factory())
+        inflight_calls[key] = future
+        future.add_done_callback(lambda _: inflight_calls.pop(key, None))
+    return await asyncio.shield(future)
+
+
+def load_json(path: str) -> Any:
+    """读取JSON文件，文件不存在时返回 None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_fresh_json(path: str, since: float) -> Any:
+    """读取在 since 之后写入的JSON文件（子进程模式下本次爬虫的输出）"""
+    try:
+        if os.path.getmtime(path) < since:
+            return None
+    except OSError:
+        return None
+    return load_json(path)
+
+
+async def fetch_search_results(keyword: str) -> Any:
+    """
+    获取搜索结果 - 优先读取搜索缓存，未命中时运行搜索爬虫并写入缓存
+
+    只有确认搜索正常完成时才写入缓存：爬虫异常结束或没有收到任何成功的响应（网络错误、
+    镜像站不可用）时的空列表不代表"没有搜索结果"，不能按空结果的保留期缓存
+    """
+    data = await asyncio.to_thread(search_cache.get, keyword)
+    if data is not None:
+        return data
+
+    started = time.time()
+    result = await run_spider_async("search", timeout=LOOKUP_TIMEOUT, keyword=keyword)
+    if result is not None:
+        data = result.items
+        cacheable = result.finished and result.stats.get("downloader/response_status_count/200", 0) > 0
+    else:
+        # 子进程模式：搜索爬虫只在得到非空结果时写出结果文件，没有本次的结果文件时无法区分空结果和失败
+        data = await asyncio.to_thread(load_fresh_json, get_search_output_file(keyword), started)
+        cacheable = data is not None
+        data = data or []
+    if cacheable:
+        await asyncio.to_thread(search_cache.put, keyword, data)
+    return data
+
+
+async def load_search_results(keyword: str) -> Any:
+    """读取已有的搜索结果（缓存过期时退回到搜索爬虫的输出文件）"""
+    data = await asyncio.to_thread(search_cache.get, keyword)
+    if data is None:
+        data = await asyncio.to_thread(load_json, get_search_output_file(keyword))
+    return data
+
+
+async def fetch_catalog(novel_url: str, book_name: str) -> Any:
+    """
+    获取小说目录 - 目录文件在 CATALOG_TTL 内直接读取，
+    过期时运行增量目录爬虫（只追加新章节），没有目录文件时运行目录爬虫
+    """
+    catalog_file = get_catalog_output_file(book_name)
+    index = await asyncio.to_thread(open_catalog_index, catalog_file)
+    if index is not None and catalog_is_fresh(index, catalog_file):
+        return index.to_dict()
+
+    result = await run_spider_async("catalog", timeout=LOOKUP_TIMEOUT, novel_url=novel_url, keyword=book_name,
+                                    incremental=int(index is not None))
+    if result is not None and result.items:
+        return catalog_from_item(result.items[0])
+    index = await asyncio.to_thread(open_catalog_index, catalog_file) or index
+    return index.to_dict() if index is not None else None
+
+
+def start_chapter_fetch(book_name: str, chapter_indexes: List[int], priority_class: str = INTERACTIVE) -> "asyncio.Future":
+    """
+    用一次章节爬虫运行下载多个章节（写入章节存储），priority_class 为这些请求的优先级类别
+
+    运行期间每个章节都登记在 inflight_calls 中，读取这些章节的请求等待同一次运行，
+    不会重复下载
+    """
+    future = asyncio.ensure_future(run_spider_async(
+        "chapter", timeout=LOOKUP_TIMEOUT, collect_items=False, book_name=book_name,
+        chapters=",".join(map(str, chapter_indexes)), priority_class=priority_class,
+    ))
+    # 预取没有等待者，取出异常避免 "exception was never retrieved"
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    for chapter_index in chapter_indexes:
+        key = ("chapter", book_name, chapter_index)
+        inflight_calls[key] = future
+        future.add_done_callback(
+            lambda _, key=key: inflight_calls.pop(key) if inflight_calls.get(key) is future else None
+        )
+    return future
+
+
+async def prefetch_chapters(book_name: str, index, chapter_index: int, count: int) -> List[int]:
+    """在后台下载 chapter_index 之后 count 个章节中章节存储还没有的章节，返回开始下载的章节索引"""
+    chapters = index.slice(chapter_index, chapter_index + count)
+    urls = {chapter["url"]: i for i, chapter in enumerate(chapters, start=chapter_index + 1)
+            if ("chapter", book_name, i) not in inflight_calls}
+    if not urls:
+        return []
+    cached = await asyncio.to_thread(chapter_store.get_many, index.novel_info.get("novel_id"), urls)
+    missing = sorted(i for url, i in urls.items()
+                     if url not in cached and ("chapter", book_name, i) not in inflight_calls)
+    if missing:
+        start_chapter_fetch(book_name, missing, priority_class=FIRST)
+    return missing
+
+
+def catalog_is_fresh(index, catalog_file: str) -> bool:
+    """目录文件在 CATALOG_TTL 内确认过，不需要刷新"""
+    return len(index) > 0 and time.time() - catalog_checked_at(index.meta, catalog_file) < CATALOG_TTL
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def raw_json_response(fields: Dict[str, Any], data_key: str, raw_data: bytes) -> Response:
+    """把已经是JSON的文件内容原样嵌入响应，不解析再序列化"""
+    head = json.dumps(fields, ensure_ascii=False)[:-1]
+    separator = ", " if fields else ""
+    body = b"".join((head.encode("utf-8"), f'{separator}"{data_key}": '.encode("utf-8"), raw_data, b"}"))
+    return Response(content=body, media_type="application/json")
+
+
+def download_file_url(book_name: str, mode: str) -> str:
+    """小说文件的下载接口地址"""
+    return f"/api/download/file/{quote(book_name, safe='')}?mode={mode}"
+
+
+def gzip_file_chunks(path: str) -> Iterator[bytes]:
+    """逐块读取并压缩文件，生成 gzip 数据流"""
+    compressor = zlib.compressobj(GZIP_COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    with open(path, "rb") as f:
+        while chunk := f.read(FILE_CHUNK_SIZE):
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
+
+def parse_catalog_span(offset: Optional[int], limit: Optional[int],
+                       chapter_range: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    把目录分页参数换算为 0-based 的章节范围 [start, end)
+
+    chapter_range 为 1-based 且包含两端，如 "101-200"、"101-"（从第101章起一页）；
+    三个参数都未提供时返回 None，表示返回整个目录
+    """
+    if chapter_range:
+        first, separator, last = chapter_range.strip().partition("-")
+        try:
+            start = int(first) - 1
+            end = int(last) if last.strip() else (start + CATALOG_PAGE_SIZE if separator else start + 1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="chapter_range 格式错误，应为 起始章节-结束章节，如 101-200")
+        if start < 0 or end <= start:
+            raise HTTPException(status_code=400, detail="chapter_range 超出范围")
+    elif offset is None and limit is None:
+        return None
+    else:
+        start = offset or 0
+        if start < 0 or (limit is not None and limit < 1):
+            raise HTTPException(status_code=400, detail="offset 不能小于0，limit 必须大于0")
+        end = start + (limit or CATALOG_PAGE_SIZE)
+    return start, min(end, start + CATALOG_PAGE_MAX_LIMIT)
+
+
+def catalog_etag(fields: Dict[str, Any], meta: Dict[str, Any], total: int, span: Optional[Tuple[int, int]]) -> str:
+    """
+    目录响应的弱 ETag
+
+    章节只会追加并提升目录版本，因此由目录版本、章节数、书籍信息和请求的范围
+    即可确定响应内容（checked_at 等刷新记录不影响）
+    """
+    key = json.dumps([fields, meta.get("catalog_version"), meta.get("novel_info"), total, span],
+                     ensure_ascii=False, sort_keys=True)
+    return f'W/"{hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def content_job_settings(task_id: str) -> Dict[str, Any]:
+    """下载任务的内容爬虫使用的作业目录设置（JOBDIR）"""
+    return {"JOBDIR": get_job_directory(task_id)} if CONTENT_JOBDIR_ENABLED else {}
+
+
+def is_resumable(task: Dict[str, Any]) -> bool:
+    """任务没有在运行，且保存了可以继续的作业目录"""
+    return task["status"] != "running" and os.path.isdir(get_job_directory(task["task_id"]))
+
+
+def pause_task(task_id: str, message: str) -> bool:
+    """
+    下载在完成前被中断：有作业目录时把任务标记为已暂停，之后可以通过 /api/download/resume 继续
+
+    返回:
+        没有作业目录（无法继续）时返回 False
+    """
+    if not os.path.isdir(get_job_directory(task_id)):
+        return False
+    update_task(task_id, status="paused", message=message)
+    return True
+
+
+def remove_resume_state(task_id: str) -> None:
+    """下载完成后删除作业目录和断点日志（有章节下载失败时爬虫不会自行删除断点日志）"""
+    shutil.rmtree(get_job_directory(task_id), ignore_errors=True)
+    remove_journal(get_journal_filename(task_id))
+
+
+
+def remove_epub_staging(task_id: str) -> None:
+    """删除任务的EPUB暂存目录"""
+    shutil.rmtree(get_epub_staging_directory(task_id), ignore_errors=True)
+
+
+def discard_paused_task(task_id: str) -> None:
+    """已暂停的任务超过保留期被清除后，删除它的续传文件（暂停的任务还没有记录为书的EPUB暂存目录）"""
+    remove_resume_state(task_id)
+    remove_epub_staging(task_id)
+
+
+def discard_epub_staging(catalog_file: str, task_id: str) -> None:
+    """下载结束后删除本任务的EPUB暂存目录，除非它是这本书的EPUB对应的暂存目录（更新下载时要合并新章节）"""
+    index = open_catalog_index(catalog_file)
+    if index is None or index.meta.get("epub_staging") != task_id:
+        remove_epub_staging(task_id)
+
 def run_download_task(task_id: str, novel_url: str, keyword: str, book_name: str, start_chapter: int, end_chapter: int,
-                      mode: DownloadMode, output_path: str):
+                      mode: DownloadMode, output_path: str, append: bool = False, staging_task: Optional[str] = None):
     """
     运行下载任务
+
+    参数:
+        append: 继续已暂停的更新下载时为真（追加到已有的输出文件），完成后记录已下载到 end_chapter
+        staging_task: 继续更新下载时新章节合并到的EPUB暂存目录所属的任务ID
     """
     try:
-        tasks[task_id]["status"] = "running"
-        tasks[task_id]["message"] = "正在获取目录..."
-        catalog_file = get_catalog_output_file(app.state.current_book_name)
+        update_task(task_id, status="running", message="正在获取目录...")
+        catalog_file = get_catalog_output_file(keyword)
         if not os.path.exists(catalog_file):
-            tasks[task_id]["status"] = "failed"
-            tasks[task_id]["message"] = "获取目录失败,目录文件不存在"
+            message = "获取目录失败,目录文件不存在"
+            update_task(task_id, status="failed", message=message)
+            progress_bus.publish(task_id, EVENT_FINISHED, {"task_id": task_id, "status": "failed",
+                                                           "message": message})
             return
 
-        # 根据mode选择对应的pipeline
-        if mode == DownloadMode.epub:
-            pipeline_setting = 'ITEM_PIPELINES={"book_crawler.pipelines.EpubWriterPipeline":300}'
-        else:  # txt模式
-            pipeline_setting = 'ITEM_PIPELINES={"book_crawler.pipelines.TxtWriterPipeline":300}'
-
-        # 运行内容爬虫
-        args = [
-            "-a", f"start_idx={start_chapter}",
-            "-a", f"end_idx={end_chapter}",
-            "-a", f"task_id={task_id}",
-            "-a", f'book_name={book_name}',
-            "-a", f'mode={mode.value}',
-            "-a", f'keyword={keyword}',
-            "-s", pipeline_setting
-        ]
-
-        result = run_scrapy_spider("content", args)
-        tasks[task_id]["status"] = "completed"
-        tasks[task_id]["message"] = "下载完成"
+        # 运行内容爬虫（根据mode选择对应的pipeline）
+        result = run_spider(
+            "content",
+            settings={"ITEM_PIPELINES": pipelines_for(mode), **content_job_settings(task_id)},
+            tag=task_id,
+            collect_items=False,
+            start_idx=start_chapter,
+            end_idx=end_chapter,
+            task_id=task_id,
+            book_name=book_name,
+            mode=mode.value,
+            keyword=keyword,
+            append=int(append),
+            staging_task=staging_task or "",
+        )
+        if (tasks.get(task_id) or {}).get("status") != "stopped":
+            if result is not None and not result.finished and pause_task(task_id, "下载已中断，可继续下载"):
+                return
+            update_task(task_id, status="completed", message="下载完成")
+            remove_resume_state(task_id)
+            if result is None or result.finished:
+                if append:
+                    mark_downloaded(catalog_file, mode.value, end_chapter)
+                elif start_chapter <= 1 and end_chapter == -1:
+                    # 完整下载：记录输出文件包含的章节数和EPUB暂存目录，供更新下载使用
+                    index = open_catalog_index(catalog_file)
+                    replaced = mark_downloaded(catalog_file, mode.value, len(index) if index is not None else 0,
+                                               staging=task_id if mode == DownloadMode.epub else None)
+                    if replaced:
+                        remove_epub_staging(replaced)
+            if mode == DownloadMode.epub:
+                discard_epub_staging(catalog_file, task_id)
+
+    except SpiderTimeout as e:
+        if not pause_task(task_id, f"下载超过 {SPIDER_TIMEOUT} 秒，已暂停，可继续下载"):
+            update_task(task_id, status="failed", message=str(e), error=str(e))
+            progress_bus.publish(task_id, EVENT_FINISHED, {"task_id": task_id, "status": "failed", "message": str(e)})
+    except Exception as e:
+        update_task(task_id, status="failed", message=str(e), error=str(e))
+        progress_bus.publish(task_id, EVENT_FINISHED, {"task_id": task_id, "status": "failed", "message": str(e)})
+
+
+def run_update_task(task_id: str, novel_url: str, book_name: str, mode: DownloadMode,
+                    output_path: str) -> Optional[int]:
+    """
+    运行更新下载任务 - 增量刷新目录，只下载新章节并追加到已有的输出文件
 
+    返回:
+        下载的新章节数，失败时返回 None
+    """
+    try:
+        update_task(task_id, status="running", message="正在检查新章节...")
+        catalog_file = get_catalog_output_file(book_name)
+        before = open_catalog_index(catalog_file)
+        before_count = len(before) if before is not None else 0
+        run_spider("catalog", tag=task_id, novel_url=novel_url, keyword=book_name, incremental=int(before is not None))
+        catalog = open_catalog_index(catalog_file)
+        if not catalog:
+            raise Exception("获取目录失败,目录文件不存在")
+        chapter_count = len(catalog)
+
+        # 输出文件已包含的章节数：优先使用上次下载记录的数量，否则视为刷新前目录中的章节都已下载
+        downloaded = (catalog.meta.get("downloaded") or {}).get(mode.value)
+        if downloaded is None:
+            downloaded = before_count
+        # EPUB的新章节合并到上次完整下载的暂存目录
+        staging_task = catalog.meta.get("epub_staging") if mode == DownloadMode.epub else None
+        staging_toc = os.path.join(get_epub_staging_directory(staging_task), "toc.tsv") if staging_task else None
+        if not os.path.exists(output_path) or (mode == DownloadMode.epub and not (staging_toc and os.path.exists(staging_toc))):
+            downloaded = 0  # 没有可以追加的输出文件，完整下载
+        if not downloaded:
+            staging_task = None  # 完整下载使用本任务自己的暂存目录
+
+        if downloaded >= chapter_count:
+            update_task(task_id, status="completed", message="没有新章节", new_chapters=0)
+            progress_bus.publish(task_id, EVENT_FINISHED, {"task_id": task_id, "status": "completed",
+                                                           "current": 0, "total": 0, "message": "没有新章节"})
+            return 0
+
+        update_task(task_id, message=f"正在下载新章节 {downloaded + 1}-{chapter_count}",
+                    start_chapter=downloaded + 1, end_chapter=chapter_count,
+                    new_chapters=chapter_count - downloaded, append=downloaded > 0, staging_task=staging_task)
+        result = run_spider(
+            "content",
+            settings={"ITEM_PIPELINES": pipelines_for(mode), **content_job_settings(task_id)},
+            tag=task_id,
+            collect_items=False,
+            start_idx=downloaded + 1,
+            end_idx=chapter_count,
+            task_id=task_id,
+            book_name=book_name,
+            mode=mode.value,
+            keyword=book_name,
+            append=int(downloaded > 0),
+            staging_task=staging_task or "",
+        )
+        if (tasks.get(task_id) or {}).get("status") != "stopped":
+            if result is not None and not result.finished and pause_task(task_id, "更新已中断，可继续下载"):
+                return None
+            update_task(task_id, status="completed", message="更新完成")
+            remove_resume_state(task_id)
+            if result is None or result.finished:
+                replaced = mark_downloaded(catalog_file, mode.value, chapter_count,
+                                           staging=(staging_task or task_id) if mode == DownloadMode.epub else None)
+                if replaced:
+                    remove_epub_staging(replaced)
+                return chapter_count - downloaded
+            if mode == DownloadMode.epub:
+                discard_epub_staging(catalog_file, task_id)
+        return None
+
+    except SpiderTimeout as e:
+        if not pause_task(task_id, f"更新超过 {SPIDER_TIMEOUT} 秒，已暂停，可继续下载"):
+            update_task(task_id, status="failed", message=str(e), error=str(e))
+            progress_bus.publish(task_id, EVENT_FINISHED, {"task_id": task_id, "status": "failed", "message": str(e)})
+        return None
     except Exception as e:
-        tasks[task_id]["status"] = "failed"
-        tasks[task_id]["message"] = str(e)
-        tasks[task_id]["error"] = str(e)
+        update_task(task_id, status="failed", message=str(e), error=str(e))
+        progress_bus.publish(task_id, EVENT_FINISHED, {"task_id": task_id, "status": "failed", "message": str(e)})
+        return None
+
+
+def start_update_task(novel_url: str, book_name: str, mode: DownloadMode, kind: str = "update") -> Tuple[str, Any]:
+    """
+    登记并在线程池中启动一个更新下载任务
+
+    同一本书已有写同一输出文件的任务在进行中（其他工作进程或追更检查启动的）时抛出 TaskConflict，
+    避免两个任务同时向输出文件追加
+
+    返回:
+        (任务ID, Future[新章节数])
+    """
+    task_id = str(uuid.uuid4())
+    if mode == DownloadMode.txt:
+        path = get_content_txt_filename(book_name)
+    else:
+        path = get_content_epub_filename(book_name)
+
+    active = tasks.create_unless_active(
+        task_id,
+        status="running",
+        kind=kind,
+        novel_url=novel_url,
+        book_name=book_name,
+        start_chapter=0,
+        end_chapter=0,
+        mode=mode.value,
+        path=path,
+        message="任务已启动",
+        start_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    if active is not None:
+        raise TaskConflict(f"《{book_name}》已有下载任务正在进行: {active['task_id']}")
+    future = executor.submit(
+        run_update_task,
+        task_id=task_id,
+        novel_url=novel_url,
+        book_name=book_name,
+        mode=mode,
+        output_path=path,
+    )
+    return task_id, future
+
+
+def run_follow_check(book) -> Any:
+    """追更调度器的一次检查：为关注的书启动更新下载"""
+    task_id, future = start_update_task(book.novel_url, book.book_name, DownloadMode(book.mode), kind="follow")
+    book.last_task_id = task_id
+    return future
+
+
+# 追更调度器 - 关注列表保存在状态文件中
+follow_scheduler = FollowScheduler(
+    FOLLOW_STATE_FILE,
+    runner=run_follow_check,
+    default_interval=FOLLOW_DEFAULT_INTERVAL,
+    min_interval=FOLLOW_MIN_INTERVAL,
+    jitter=FOLLOW_JITTER,
+    mirror_spacing=FOLLOW_MIRROR_SPACING,
+    max_active=FOLLOW_MAX_ACTIVE,
+)
+
+
+def read_progress(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    读取任务进度 - 优先使用进度事件总线中的最新快照，
+    子进程模式或服务重启后再读取进度文件
+    """
+    progress_data = progress_bus.snapshot(task_id)
+    if progress_data is not None:
+        return progress_data
+
+    progress_file = get_progress_filename(task_id)
+    if os.path.exists(progress_file):
+        try:
+            with open(progress_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return None
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """格式化一条 SSE 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def poll_progress_events(task_id: str):
+    """子进程模式下爬虫不在本进程内，退化为轮询进度文件"""
+    last = None
+    idle = 0.0
+    while True:
+        progress_data = await asyncio.to_thread(read_progress, task_id)
+        if progress_data and progress_data != last:
+            last = progress_data
+            idle = 0.0
+            if progress_data.get("status") in ("completed", "failed", "paused"):
+                yield format_sse(EVENT_FINISHED, progress_data)
+                return
+            yield format_sse(EVENT_PROGRESS, progress_data)
+        elif (task_status := (await asyncio.to_thread(tasks.get, task_id) or {}).get("status")) in (
+                "completed", "failed", "stopped", "paused"):
+            yield format_sse(EVENT_FINISHED, dict(last or {}, task_id=task_id, status=task_status))
+            return
+        elif idle >= SSE_KEEPALIVE_INTERVAL:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+        idle += PROGRESS_FLUSH_INTERVAL
+
+
+async def progress_events(task_id: str):
+    """把进度事件总线中的事件转换为 SSE 消息"""
+    # 任务已结束且事件已被清理时直接返回最终状态，避免订阅一个永远不会再有事件的任务
+    task_status = (await asyncio.to_thread(tasks.get, task_id) or {}).get("status")
+    if task_status in ("completed", "failed", "stopped", "paused") and not progress_bus.has_task(task_id):
+        progress_data = await asyncio.to_thread(read_progress, task_id)
+        yield format_sse(EVENT_FINISHED, dict(progress_data or {}, task_id=task_id, status=task_status))
+        return
+
+    async for event, data in progress_bus.subscribe(task_id, PROGRESS_EVENT_INTERVAL, SSE_KEEPALIVE_INTERVAL):
+        if event == EVENT_KEEPALIVE:
+            yield ": keepalive\n\n"
+        else:
+            yield format_sse(event, data)
 
 
 # 搜索小说 - 支持query和json两种方式
@@ -241,23 +907,14 @@ async def novel_search(
         app.state.current_book_name = search_keyword
         app.state.current_keyword = search_keyword
 
-        # 读取搜索结果
-        search_output_file = get_search_output_file(search_keyword)
+        # 读取搜索结果，没有缓存时执行Scrapy搜索爬虫（同一关键词的并发搜索只爬取一次）
+        data = await coalesce(("search", normalize_keyword(search_keyword)),
+                              lambda: fetch_search_results(search_keyword))
 
-        if os.path.exists(search_output_file):
-            with open(search_output_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return {"status": "success", "data": data, "message": "搜索完成", "keyword": search_keyword}
-
-        # 执行Scrapy搜索爬虫
-        result = run_scrapy_spider("search", ["-a", f"keyword={search_keyword}"])
-
-        if os.path.exists(search_output_file):
-            with open(search_output_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+        if data:
             return {"status": "success", "data": data, "message": "搜索完成", "keyword": search_keyword}
         else:
-            # 如果没有找到结果文件，返回空数组
+            # 如果没有找到结果，返回空数组
             return {"status": "success", "data": [], "message": "搜索完成，但未找到结果", "keyword": search_keyword}
 
     except Exception as e:
@@ -265,10 +922,15 @@ async def novel_search(
 
 
 # 获取小说目录 - 支持query和json两种方式
+@app.get("/api/catalog")
 @app.post("/api/catalog")
 async def novel_catalog(
         request: CatalogRequest = Body(None),
-        novel_id: int = Query(None, description="小说ID")
+        novel_id: int = Query(None, description="小说ID"),
+        offset: Optional[int] = Query(None, description="分页起点（0-based）"),
+        limit: Optional[int] = Query(None, description="每页章节数"),
+        chapter_range: Optional[str] = Query(None, description="章节范围（1-based，含两端），如 101-200"),
+        if_none_match: Optional[str] = Header(None),
 ):
     """
     获取小说目录接口 - 支持query参数和JSON请求体两种方式
@@ -276,6 +938,10 @@ async def novel_catalog(
     使用方式：
     1. JSON方式：POST {"novel_id": 1}
     2. Query方式：POST /api/catalog?novel_id=1
+    3. 分页：加上 offset/limit（如 offset=0&limit=200）或 chapter_range（如 101-200），
+       只返回该范围的章节，响应中的 page 给出总章节数；GET 方式便于浏览器缓存
+
+    响应带有 ETag，请求头 If-None-Match 与之相同时返回 304
     """
     try:
         # 优先使用JSON请求体，其次使用query参数
@@ -283,16 +949,18 @@ async def novel_catalog(
         novel_id_value -= 1
         if novel_id_value is None:
             raise HTTPException(status_code=400, detail="必须提供小说ID")
+        if request:
+            offset = request.offset if request.offset is not None else offset
+            limit = request.limit if request.limit is not None else limit
+            chapter_range = request.chapter_range or chapter_range
+        span = parse_catalog_span(offset, limit, chapter_range)
 
 
         # 从搜索结果中获取对应小说的URL
-        search_file = get_search_output_file(app.state.current_keyword)
-        if not os.path.exists(search_file) or not app.state.current_keyword:
+        search_results = await load_search_results(app.state.current_keyword) if app.state.current_keyword else None
+        if search_results is None:
             raise HTTPException(status_code=404, detail="搜索结果文件不存在，请先执行搜索")
 
-        with open(search_file, "r", encoding="utf-8") as f:
-            search_results = json.load(f)
-
         if novel_id_value >= len(search_results):
             raise HTTPException(status_code=404, detail="小说ID超出范围")
 
@@ -300,45 +968,57 @@ async def novel_catalog(
         novel_url = novel_info["url_list"]
         book_name = novel_info.get("articlename", "未知书名")
         app.state.current_book_name = book_name
+        fields = {
+            "status": "success",
+            "message": "目录获取完成",
+            "novel_id": novel_id_value,
+            "book_name": book_name,
+            "novel_url": novel_url,
+        }
 
-        catalog_file = get_catalog_output_file(app.state.current_book_name)
-        if os.path.exists(catalog_file):
-            with open(catalog_file, "r", encoding="utf-8") as f:
-                catalog_data = json.load(f)
-            return {
-                "status": "success",
-                "data": catalog_data,
-                "message": "目录获取完成",
-                "novel_id": novel_id_value,
-                "book_name": book_name,
-                "novel_url": novel_url
-            }
-
-        # 执行Scrapy目录爬虫
-        result = run_scrapy_spider("catalog", ["-a", f"novel_url={novel_url}", "-a", f"keyword={book_name}"])
-
-        # 读取目录结果
-
-        if os.path.exists(catalog_file):
-            with open(catalog_file, "r", encoding="utf-8") as f:
-                catalog_data = json.load(f)
-            return {
-                "status": "success",
-                "data": catalog_data,
-                "message": "目录获取完成",
-                "novel_id": novel_id_value,
-                "book_name": book_name,
-                "novel_url": novel_url
-            }
+        # 没有目录文件或目录过期时执行Scrapy目录爬虫（同一本书的并发请求只爬取一次）
+        catalog_file = get_catalog_output_file(book_name)
+        index = await asyncio.to_thread(open_catalog_index, catalog_file)
+        catalog_data = None
+        if index is None or not catalog_is_fresh(index, catalog_file):
+            catalog_data = await coalesce(("catalog", novel_url, book_name),
+                                          lambda: fetch_catalog(novel_url, book_name))
+            index = await asyncio.to_thread(open_catalog_index, catalog_file)
+
+        if index is not None and len(index) > 0:
+            meta, total = index.meta, len(index)
+        elif catalog_data:
+            # 爬虫返回了目录但没有写入目录文件
+            meta, total = catalog_data, len(catalog_data.get("chapters") or [])
+        else:
+            return dict(fields, data=[], message="目录获取完成，但未找到结果")
+
+        etag = catalog_etag(fields, meta, total, span)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if span is None:
+            if index is not None and len(index) > 0:
+                # 直接返回目录文件内容，不解析目录JSON
+                response = raw_json_response(fields, "data", await asyncio.to_thread(read_bytes, catalog_file))
+                response.headers.update(headers)
+                return response
+            return JSONResponse(dict(fields, data=catalog_data), headers=headers)
+
+        # 分页：通过目录索引只读取该范围的章节
+        start, end = span[0], min(span[1], total)
+        if index is not None and len(index) > 0:
+            chapters = index.slice(start, end)
         else:
-            return {
-                "status": "success",
-                "data": [],
-                "message": "目录获取完成，但未找到结果",
-                "novel_id": novel_id_value,
-                "book_name": book_name,
-                "novel_url": novel_url
-            }
+            chapters = catalog_data["chapters"][start:end]
+        data = {
+            "novel_info": meta.get("novel_info") or {},
+            "catalog_version": meta.get("catalog_version", 1),
+            "chapters": chapters,
+        }
+        page = {"offset": start, "limit": max(end - start, 0), "total": total, "has_more": end < total}
+        return JSONResponse(dict(fields, data=data, page=page), headers=headers)
 
     except HTTPException:
         raise
@@ -346,6 +1026,60 @@ async def novel_catalog(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 在线阅读 - 读取一个清洗后的章节，并在后台预取其后的章节
+@app.get("/api/chapter/{book_name}/{chapter_index}")
+async def read_chapter(
+        book_name: str,
+        chapter_index: int,
+        prefetch: int = Query(CHAPTER_PREFETCH_COUNT, ge=0, le=CHAPTER_PREFETCH_MAX, description="预取其后的章节数"),
+):
+    """
+    读取一个章节（chapter_index 从1开始，与目录顺序一致）
+
+    章节存储中有该章节时直接返回；没有时通过进程内爬虫引擎只下载这一个章节。
+    同时在后台下载其后 prefetch 个章节，读下一章时通常已在章节存储中。
+    需要先获取该书的目录
+    """
+    index = await asyncio.to_thread(open_catalog_index, get_catalog_output_file(book_name))
+    if index is None:
+        raise HTTPException(status_code=404, detail="目录不存在，请先获取目录")
+    if not 0 < chapter_index <= len(index):
+        raise HTTPException(status_code=404, detail="章节索引超出范围")
+
+    chapter = index[chapter_index - 1]
+    novel_id = index.novel_info.get("novel_id")
+    hit = await asyncio.to_thread(chapter_store.get, novel_id, chapter["url"])
+    future = None
+    if hit is None:
+        # 正在预取该章节时等待同一次下载
+        future = inflight_calls.get(("chapter", book_name, chapter_index)) \
+            or start_chapter_fetch(book_name, [chapter_index])
+    prefetched = await prefetch_chapters(book_name, index, chapter_index, prefetch) if prefetch else []
+
+    if future is not None:
+        try:
+            await asyncio.shield(future)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"章节下载失败: {e}")
+        hit = await asyncio.to_thread(chapter_store.get, novel_id, chapter["url"])
+        if hit is None:
+            raise HTTPException(status_code=502, detail="章节下载失败，所有镜像站均未返回有效内容")
+
+    return {
+        "status": "success",
+        "data": {
+            "book_name": book_name,
+            "chapter_index": chapter_index,
+            "title": hit["title"] or chapter["title"],
+            "content": hit["content"],
+            "url": chapter["url"],
+            "total_chapters": len(index),
+        },
+        "source": "fetched" if future is not None else "chapter_store",
+        "prefetching": prefetched,
+    }
+
+
 # 开始下载小说 - 支持query和json两种方式
 @app.post("/api/download/start")
 async def start_download(
@@ -354,7 +1088,8 @@ async def start_download(
         book_name: str = Query("temp", description="书名"),
         start_chapter: int = Query(1, description="起始章节"),
         end_chapter: int = Query(-1, description="结束章节(-1表示全部)"),
-        mode: DownloadMode = Query("txt", description="下载格式")
+        mode: DownloadMode = Query("txt", description="下载格式"),
+        task_id: Optional[str] = Query(None, description="已有任务ID，传入时从断点继续下载")
 ):
     """
     开始下载小说接口 - 支持query参数和JSON请求体两种方式
@@ -366,7 +1101,7 @@ async def start_download(
     try:
         # 优先使用JSON请求体，其次使用query参数
         if request and any([request.novel_url, request.book_name, request.start_chapter != 1, request.end_chapter != -1,
-                            request.mode != "txt"]):
+                            request.mode != "txt", request.task_id]):
             download_data = request
         else:
             download_data = DownloadRequest(
@@ -374,14 +1109,15 @@ async def start_download(
                 book_name=book_name,
                 start_chapter=start_chapter,
                 end_chapter=end_chapter,
-                mode=mode
+                mode=mode,
+                task_id=task_id
             )
 
         if not download_data.novel_url:
             raise HTTPException(status_code=400, detail="必须提供小说URL")
 
-        # 生成任务ID
-        task_id = str(uuid.uuid4())
+        # 生成任务ID（传入已有任务ID时沿用，内容爬虫会根据断点日志续传）
+        task_id = download_data.task_id or str(uuid.uuid4())
 
         # 根据模式选择输出文件路径
         if download_data.mode == DownloadMode.txt:
@@ -390,21 +1126,23 @@ async def start_download(
             path = get_content_epub_filename(download_data.book_name)
 
         # 初始化任务状态
-        tasks[task_id] = {
-            "status": "running",
-            "novel_url": download_data.novel_url,
-            "task_id": task_id,
-            "book_name": download_data.book_name,
-            "start_chapter": download_data.start_chapter,
-            "end_chapter": download_data.end_chapter,
-            "mode": download_data.mode,
-            "path": path,
-            "progress": 0,
-            "current_chapter": 0,
-            "total_chapters": 0,
-            "message": "任务已启动",
-            "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        }
+        await asyncio.to_thread(
+            tasks.create,
+            task_id,
+            status="running",
+            novel_url=download_data.novel_url,
+            book_name=download_data.book_name,
+            keyword=app.state.current_book_name,
+            start_chapter=download_data.start_chapter,
+            end_chapter=download_data.end_chapter,
+            mode=download_data.mode.value,
+            path=path,
+            progress=0,
+            current_chapter=0,
+            total_chapters=0,
+            message="任务已启动",
+            start_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        )
 
         # 启动下载任务
         executor.submit(
@@ -430,6 +1168,7 @@ async def start_download(
                 "end_chapter": download_data.end_chapter,
                 "mode": download_data.mode,
                 "path": path,
+                "download_url": download_file_url(download_data.book_name, download_data.mode.value),
             },
         }
 
@@ -437,6 +1176,124 @@ async def start_download(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 下载小说文件 - 支持断点续传（Range）和ETag缓存，TXT可选gzip压缩传输
+@app.api_route("/api/download/file/{book_name}", methods=["GET", "HEAD"])
+async def download_file(
+        book_name: str,
+        mode: DownloadMode = Query(DownloadMode.txt, description="文件格式"),
+        compress: bool = Query(False, alias="gzip", description="TXT以gzip压缩传输（不支持Range）"),
+        range_header: Optional[str] = Header(None, alias="range"),
+        if_none_match: Optional[str] = Header(None),
+        accept_encoding: Optional[str] = Header(None),
+):
+    """
+    获取已下载的TXT/EPUB文件
+
+    文件按块发送（服务器支持 http.response.pathsend 时由服务器直接发送文件），
+    不会整个读入内存；支持 Range/If-Range 断点续传和 If-None-Match。
+    gzip=true 且客户端接受 gzip 时，TXT 整个文件压缩后流式传输（没有 Content-Length，不支持 Range）
+    """
+    if not book_name or os.path.basename(book_name) != book_name or book_name in (".", ".."):
+        raise HTTPException(status_code=400, detail="书名不合法")
+    path = get_content_txt_filename(book_name) if mode == DownloadMode.txt else get_content_epub_filename(book_name)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="文件不存在，请先下载")
+
+    # 正在写入的文件内容不完整
+    running = await asyncio.to_thread(tasks.list, status="running", book_name=book_name)
+    if any(task.get("mode") == mode.value for task in running):
+        raise HTTPException(status_code=409, detail="该书正在下载中，请在任务完成后获取文件")
+
+    filename = os.path.basename(path)
+    media_type = "text/plain; charset=utf-8" if mode == DownloadMode.txt else "application/epub+zip"
+    response = FileResponse(path, media_type=media_type, filename=filename, stat_result=stat_result)
+    response.chunk_size = FILE_CHUNK_SIZE
+    etag = response.headers["etag"]
+
+    if compress and mode == DownloadMode.txt and not range_header and "gzip" in (accept_encoding or ""):
+        etag = f'W/{etag[:-1]}-gzip"'
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return StreamingResponse(gzip_file_chunks(path), media_type=media_type, headers={
+            "Content-Encoding": "gzip",
+            "Content-Disposition": response.headers["content-disposition"],
+            "ETag": etag,
+            "Last-Modified": response.headers["last-modified"],
+            "Vary": "Accept-Encoding",
+        })
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return response
+
+
+# 更新下载 - 只下载目录中新增的章节并追加到已有的输出文件
+@app.post("/api/download/update")
+async def update_download(request: UpdateRequest):
+    """
+    更新下载接口 - 增量刷新目录后只下载新章节，追加到已有的TXT/EPUB
+
+    使用方式：
+    POST {"novel_url": "/book/1/", "book_name": "剑来", "mode": "txt"}
+    """
+    try:
+        task_id, _ = await asyncio.to_thread(start_update_task, request.novel_url, request.book_name, request.mode)
+        task = await asyncio.to_thread(tasks.get, task_id)
+        return {"status": "success", "task_id": task_id, "message": "更新任务已启动", "path": task["path"]}
+    except TaskConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# 追更 - 关注列表
+@app.get("/api/follow")
+async def list_follows():
+    """
+    获取关注的书及其检查状态（按下一次检查时间排序）
+    """
+    books = await asyncio.to_thread(follow_scheduler.list)
+    return {"status": "success", "data": [book.to_dict() for book in books]}
+
+
+@app.post("/api/follow")
+async def follow_book(request: FollowRequest):
+    """
+    关注一本书，定期检查目录并自动下载新章节
+
+    使用方式：
+    POST {"novel_url": "/book/1/", "book_name": "剑来", "mode": "txt", "interval": 21600}
+    """
+    try:
+        book = await asyncio.to_thread(follow_scheduler.follow, request.book_name, request.novel_url,
+                                       request.mode.value, request.interval)
+        return {"status": "success", "data": book.to_dict(), "message": "已关注"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/api/follow/{book_name}")
+async def unfollow_book(book_name: str):
+    """
+    取消关注
+    """
+    if not await asyncio.to_thread(follow_scheduler.unfollow, book_name):
+        raise HTTPException(status_code=404, detail="未关注该书")
+    return {"status": "success", "message": "已取消关注"}
+
+
+@app.post("/api/follow/{book_name}/check")
+async def check_followed_book(book_name: str):
+    """
+    立即检查一本关注的书（仍受镜像站检查间隔限制）
+    """
+    if not await asyncio.to_thread(follow_scheduler.check_now, book_name):
+        raise HTTPException(status_code=404, detail="未关注该书")
+    return {"status": "success", "message": "已安排检查"}
+
+
 # 获取下载状态
 @app.get("/api/download/status/{task_id}")
 async def download_status(task_id: str):
@@ -444,29 +1301,25 @@ async def download_status(task_id: str):
     获取下载状态
     """
     try:
-        # 检查任务是否存在
-        if task_id not in tasks:
+        # 检查任务是否存在（任务存储和进度文件的读取放到线程中，不阻塞事件循环）
+        task = await asyncio.to_thread(tasks.get, task_id)
+        if task is None:
             raise HTTPException(status_code=404, detail="任务不存在")
 
-        # 读取进度文件
-        progress_file = os.path.join(TEMP_OUTPUT_DIRECTORY, f"progress_{task_id}.json")
-        progress_data = None
-
-        if os.path.exists(progress_file):
-            try:
-                with open(progress_file, "r", encoding="utf-8") as f:
-                    progress_data = json.load(f)
-            except Exception as e:
-                pass
+        # 读取进度
+        progress_data = await asyncio.to_thread(read_progress, task_id)
+        resumable = await asyncio.to_thread(is_resumable, task)
 
         # 构建响应
         response_data = {
             "task_id": task_id,
-            "status": tasks[task_id]["status"],
-            "book_name": tasks[task_id]["book_name"],
-            "novel_url": tasks[task_id]["novel_url"],
-            "start_chapter": tasks[task_id]["start_chapter"],
-            "end_chapter": tasks[task_id]["end_chapter"]
+            "status": task["status"],
+            "book_name": task["book_name"],
+            "novel_url": task["novel_url"],
+            "start_chapter": task["start_chapter"],
+            "end_chapter": task["end_chapter"],
+            "message": task.get("message"),
+            "resumable": resumable,
         }
 
         if progress_data:
@@ -492,6 +1345,106 @@ async def download_status(task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 批量下载
+@app.post("/api/batch/start")
+async def start_batch(request: BatchRequest):
+    """
+    批量下载接口 - 一次提交多本书
+
+    使用方式：
+    POST {"entries": [{"novel_url": "/book/1/", "book_name": "剑来", "start_chapter": 1, "end_chapter": -1, "mode": "txt"}, ...]}
+
+    每本书登记为一个下载任务，可通过 /api/download/status/{task_id} 查询单本进度，
+    通过 /api/batch/{batch_id} 查询汇总进度
+    """
+    if CRAWL_ENGINE_MODE == "subprocess":
+        raise HTTPException(status_code=400, detail="批量下载需要进程内爬虫引擎（CRAWL_ENGINE_MODE = \"inprocess\"）")
+    if not request.entries:
+        raise HTTPException(status_code=400, detail="必须提供至少一本书")
+
+    def register_tasks(batch):
+        start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for book in batch.books:
+            tasks.create(
+                book.task_id,
+                status=book.status,
+                novel_url=book.novel_url,
+                batch_id=batch.batch_id,
+                book_name=book.book_name,
+                start_chapter=book.start_chapter,
+                end_chapter=book.end_chapter,
+                mode=book.mode.value,
+                path=book.path,
+                message=book.message,
+                start_time=start_time,
+            )
+
+    try:
+        batch = await asyncio.to_thread(batch_scheduler.submit, [entry.dict() for entry in request.entries],
+                                        on_created=register_tasks)
+        return {"status": "success", "batch_id": batch.batch_id, "message": "批量下载已启动",
+                "data": batch.to_dict()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# 批量下载列表
+@app.get("/api/batch")
+async def list_batches():
+    """
+    获取所有批量下载的汇总状态
+    """
+    return {"status": "success", "data": [batch.to_dict(with_books=False) for batch in batch_scheduler.list()]}
+
+
+# 批量下载状态
+@app.get("/api/batch/{batch_id}")
+async def batch_status(batch_id: str):
+    """
+    获取批量下载的汇总状态和每本书的进度
+    """
+    batch = batch_scheduler.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+    return {"status": "success", "data": batch.to_dict()}
+
+
+# 停止批量下载
+@app.post("/api/batch/stop/{batch_id}")
+async def stop_batch(batch_id: str):
+    """
+    停止批量下载：排队中的书不再下载，正在下载的书立即停止
+    """
+    if not await asyncio.to_thread(batch_scheduler.stop, batch_id):
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+    return {"status": "success", "batch_id": batch_id, "message": "批量下载已停止"}
+
+
+# 推送下载进度
+@app.get("/api/download/events/{task_id}")
+async def download_events(task_id: str):
+    """
+    以 SSE (text/event-stream) 推送下载进度
+
+    事件类型：
+    - progress: 进度快照（与 /api/download/status 的进度字段相同），合并推送
+    - chapter_failed: 单个章节下载失败
+    - finished: 任务结束，之后连接关闭
+    """
+    if not progress_bus.has_task(task_id) and await asyncio.to_thread(tasks.get, task_id) is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    if CRAWL_ENGINE_MODE == "subprocess":
+        events = poll_progress_events(task_id)
+    else:
+        events = progress_events(task_id)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # 停止下载
 @app.post("/api/download/stop/{task_id}")
 async def stop_download(task_id: str):
@@ -499,11 +1452,10 @@ async def stop_download(task_id: str):
     停止下载任务
     """
     try:
-        if task_id not in tasks:
+        # 标记任务为停止状态，并停止引擎中对应的爬虫
+        if not await asyncio.to_thread(tasks.update, task_id, status="stopped", message="任务已停止"):
             raise HTTPException(status_code=404, detail="任务不存在")
-
-        # 标记任务为停止状态
-        tasks[task_id]["status"] = "stopped"
+        crawl_engine.stop(task_id)
 
         return {"status": "success", "task_id": task_id, "message": "下载任务已停止"}
     except HTTPException:
@@ -512,48 +1464,141 @@ async def stop_download(task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 继续下载
+@app.post("/api/download/resume/{task_id}")
+async def resume_download(task_id: str):
+    """
+    继续已暂停（超时、服务重启）或已停止的下载任务
+
+    内容爬虫从任务的作业目录恢复未完成的请求，并按断点日志跳过已写入的章节，
+    已下载的章节不会重新下载。批量下载的任务没有作业目录，不能继续
+    """
+    task = await asyncio.to_thread(tasks.get, task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if task["status"] == "running" or crawl_engine.is_running(task_id):
+        raise HTTPException(status_code=409, detail="任务正在运行")
+    if not await asyncio.to_thread(is_resumable, task):
+        raise HTTPException(status_code=409, detail="任务没有可以继续的作业目录")
+
+    mode = DownloadMode(task.get("mode") or DEFAULT_DOWNLOAD_MODE)
+    await asyncio.to_thread(update_task, task_id, status="running", message="继续下载")
+    executor.submit(
+        run_download_task,
+        task_id=task_id,
+        novel_url=task["novel_url"],
+        keyword=task.get("keyword") or task["book_name"],
+        book_name=task["book_name"],
+        start_chapter=task["start_chapter"],
+        end_chapter=task["end_chapter"],
+        mode=mode,
+        output_path=task["path"],
+        append=bool(task.get("append")),
+        staging_task=task.get("staging_task"),
+    )
+    return {
+        "status": "success",
+        "task_id": task_id,
+        "message": "下载任务已继续",
+        "details": {
+            "book_name": task["book_name"],
+            "start_chapter": task["start_chapter"],
+            "end_chapter": task["end_chapter"],
+            "mode": mode,
+            "path": task["path"],
+            "download_url": download_file_url(task["book_name"], mode.value),
+        },
+    }
+
+
+def list_task_summaries(status: Optional[str], book_name: Optional[str],
+                        batch_id: Optional[str]) -> List[Dict[str, Any]]:
+    """任务列表中每个任务的摘要（包含当前进度）"""
+    task_list = []
+    for task_info in tasks.list(status=status, book_name=book_name, batch_id=batch_id):
+        task_id = task_info["task_id"]
+        progress_data = read_progress(task_id) or {}
+        task_list.append({
+            "task_id": task_id,
+            "status": task_info["status"],
+            "book_name": task_info["book_name"],
+            "novel_url": task_info["novel_url"],
+            "start_chapter": task_info["start_chapter"],
+            "current_chapter": progress_data.get("current", 0),
+            "end_chapter": task_info["end_chapter"],
+            "start_time": task_info["start_time"],
+            "resumable": is_resumable(task_info),
+        })
+    return task_list
+
+
 # 获取任务列表
 @app.get("/api/download/tasks")
-async def get_tasks():
+async def get_tasks(
+        status: Optional[str] = Query(None, description="按任务状态过滤"),
+        book_name: Optional[str] = Query(None, description="按书名过滤"),
+        batch_id: Optional[str] = Query(None, description="按批量任务ID过滤")
+):
     """
-    获取所有下载任务列表
+    获取下载任务列表
     """
     try:
-        task_list = []
-        for task_id, task_info in tasks.items():
-            progress_file = os.path.join(TEMP_OUTPUT_DIRECTORY, f"progress_{task_id}.json")
-            progress_data = None
-
-            if os.path.exists(progress_file):
-                try:
-                    with open(progress_file, "r", encoding="utf-8") as f:
-                        progress_data = json.load(f)
-                except Exception as e:
-                    pass
-            task_list.append({
-                "task_id": task_id,
-                "status": task_info["status"],
-                "book_name": task_info["book_name"],
-                "novel_url": task_info["novel_url"],
-                "start_chapter": task_info["start_chapter"],
-                "current_chapter": progress_data.get("current", 0),
-                "end_chapter": task_info["end_chapter"],
-                "start_time": task_info["start_time"]
-            })
-
+        # 查询任务存储并逐个读取进度文件，放到线程中执行，不阻塞事件循环
+        task_list = await asyncio.to_thread(list_task_summaries, status, book_name, batch_id)
         return {"status": "success", "data": task_list}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Cookie池统计
+@app.get("/api/stats/cookies")
+async def cookie_stats():
+    """
+    获取搜索接口 hm Cookie 池的命中统计
+    """
+    return {"status": "success", "data": hm_cookie_pool.stats()}
+
+
+# 搜索缓存统计
+@app.get("/api/stats/search_cache")
+async def search_cache_stats():
+    """
+    获取搜索结果缓存的命中统计（内存命中、持久化命中、未命中、命中率、条目数）
+    """
+    return {"status": "success", "data": await asyncio.to_thread(search_cache.stats)}
+
+
+# 镜像站统计
+@app.get("/api/stats/domains")
+async def domain_stats():
+    """
+    获取各镜像站当前的请求间隔、并发数、速率（次/秒）、延迟和成功率
+    """
+    return {"status": "success", "data": domain_health.snapshot()}
+
+
+# 请求优先级统计
+@app.get("/api/stats/priority")
+async def priority_stats():
+    """
+    获取各请求优先级类别（interactive / first / bulk）当前占用和等待的下载许可数，
+    以及累计的请求数、等待次数、等待时间和因等待过久被提前的次数
+    """
+    return {"status": "success", "data": priority_gate.snapshot()}
+
+
 # 健康检查接口
 @app.get("/health")
 async def health_check():
     """
     健康检查接口
     """
+    def probe():
+        return requests.get(HEALTH_CHECK_URL, timeout=HEALTH_CHECK_TIMEOUT)
+
     try:
-        response = requests.get("https://www.baidu.com")
+        # 在线程中探测外网，并发的健康检查共享同一次探测
+        await coalesce(("health",), lambda: asyncio.to_thread(probe))
         return {"status": "healthy", "message": "服务运行正常"}
     except Exception as e:
         return {"status": "unhealthy", "message": "无法连接到互联网"}
@@ -4,6 +4,7 @@
 
 
 from enum import Enum
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -13,6 +14,9 @@ class SearchRequest(BaseModel):
 
 class CatalogRequest(BaseModel):
     novel_id: int
+    offset: Optional[int] = None         # 分页起点（0-based）
+    limit: Optional[int] = None          # 每页章节数
+    chapter_range: Optional[str] = None  # 章节范围（1-based，含两端），如 "101-200"
 
 
 class DownloadMode(str, Enum):
@@ -26,3 +30,29 @@ class DownloadRequest(BaseModel):
     start_chapter: int = 1
     end_chapter: int = -1
     mode: DownloadMode = DownloadMode.txt
+    task_id: Optional[str] = None  # 传入已有任务ID时从断点继续下载
+
+
+class UpdateRequest(BaseModel):
+    novel_url: str
+    book_name: str
+    mode: DownloadMode = DownloadMode.txt
+
+
+class FollowRequest(BaseModel):
+    novel_url: str
+    book_name: str
+    mode: DownloadMode = DownloadMode.txt
+    interval: Optional[int] = None  # 检查间隔（秒），不传时使用默认间隔
+
+
+class BatchEntry(BaseModel):
+    novel_url: str
+    book_name: str
+    start_chapter: int = 1
+    end_chapter: int = -1
+    mode: DownloadMode = DownloadMode.txt
+
+
+class BatchRequest(BaseModel):
+    entries: List[BatchEntry]
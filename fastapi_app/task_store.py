@@ -0,0 +1,267 @@
+"""
+下载任务存储 - 基于 SQLite (WAL) 持久化任务状态
+
+服务重启后任务列表仍然可用；多个 uvicorn 工作进程共享同一个数据库文件，
+看到一致的任务列表。常用的查询字段（状态、书名、批量任务ID）单独成列并建立
+索引，其余字段以 JSON 保存。已结束的任务超过保留期后自动清除；已暂停的任务
+还可以继续下载，使用单独的、更长的保留期。
+
+未结束的任务记录运行它的进程（owner），服务重启后据此找出被中断的任务。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id     TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    book_name   TEXT,
+    batch_id    TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    finished_at REAL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_book_name ON tasks (book_name);
+CREATE INDEX IF NOT EXISTS idx_tasks_batch_id ON tasks (batch_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_finished_at ON tasks (finished_at);
+"""
+
+# 单独成列的字段，其余字段保存在 data 中
+_COLUMNS = ("status", "book_name", "batch_id")
+
+# 已结束的任务状态
+FINISHED_STATUSES = ("completed", "failed", "stopped")
+
+# 已暂停的任务状态：还可以继续下载，不算已结束，按最后更新时间单独计算保留期
+PAUSED_STATUS = "paused"
+
+# 还在进行中的任务状态：单本下载为 running；批量下载的书还可能在排队（queued）或获取目录（catalog）
+ACTIVE_STATUSES = ("running", "queued", "catalog")
+
+
+class TaskStore:
+    """基于 SQLite 的任务存储"""
+
+    def __init__(self, db_path: str, ttl: float, evict_interval: float = 60, paused_ttl: float = 0,
+                 on_evict_paused: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        参数:
+            db_path: 数据库文件路径
+            ttl: 已结束任务的保留时间（秒），0 表示永久保留
+            evict_interval: 两次清除过期任务的最短间隔（秒）
+            paused_ttl: 已暂停任务的保留时间（秒），从最后一次更新算起，0 表示永久保留
+            on_evict_paused: 清除已暂停的任务后对每个任务的回调，用于删除它的作业目录等续传文件
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.evict_interval = evict_interval
+        self.paused_ttl = paused_ttl
+        self.on_evict_paused = on_evict_paused
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_evict = 0.0
+        # 当前进程的标识：PID 加随机后缀，重启后复用了相同 PID 的进程也能区分
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def create(self, task_id: str, **fields: Any) -> None:
+        """新建任务，相同 task_id 的任务会被覆盖（断点续传时沿用旧任务ID）"""
+        fields.setdefault("status", "running")
+        fields.setdefault("owner", self.owner)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._insert(conn, task_id, fields)
+        self.evict_expired()
+
+    def create_unless_active(self, task_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """
+        新建任务，除非同一本书已有写同一输出文件（path）的任务还在进行中
+
+        检查和写入在同一个写事务中完成，多个工作进程同时启动同一本书的下载时只有一个成功
+
+        返回:
+            已在进行中的任务；新建成功时返回 None
+        """
+        fields.setdefault("status", "running")
+        fields.setdefault("owner", self.owner)
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    "SELECT task_id, status, book_name, batch_id, data FROM tasks"
+                    f" WHERE book_name = ? AND status IN ({placeholders})",
+                    (fields.get("book_name"), *ACTIVE_STATUSES),
+                ).fetchall()
+                for row in rows:
+                    task = self._row_to_task(row)
+                    if task.get("path") == fields.get("path"):
+                        return task
+                self._insert(conn, task_id, fields)
+        self.evict_expired()
+        return None
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT task_id, status, book_name, batch_id, data FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def update(self, task_id: str, **fields: Any) -> bool:
+        """
+        更新任务字段，任务不存在时返回 False
+
+        读取、合并、写回在同一个写事务中完成，多个进程同时更新时不会丢失字段
+        """
+        now = time.time()
+        if fields.get("status") == "running":
+            fields.setdefault("owner", self.owner)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT task_id, status, book_name, batch_id, data FROM tasks WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                if row is None:
+                    return False
+                task = self._row_to_task(row)
+                task.update(fields)
+                finished = task["status"] in FINISHED_STATUSES
+                conn.execute(
+                    "UPDATE tasks SET status = ?, book_name = ?, batch_id = ?, updated_at = ?,"
+                    " finished_at = CASE WHEN ? THEN COALESCE(finished_at, ?) ELSE NULL END, data = ?"
+                    " WHERE task_id = ?",
+                    (task["status"], task.get("book_name"), task.get("batch_id"), now,
+                     finished, now, self._dumps(task), task_id),
+                )
+        return True
+
+    def list(self, status: Optional[str] = None, book_name: Optional[str] = None,
+             batch_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按创建时间列出任务，可按状态、书名、批量任务ID过滤"""
+        conditions, params = [], []
+        for column, value in (("status", status), ("book_name", book_name), ("batch_id", batch_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT task_id, status, book_name, batch_id, data FROM tasks"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def orphaned(self) -> List[Dict[str, Any]]:
+        """还在进行中、但运行它的进程已经退出的任务（服务重启或进程被杀死）"""
+        orphans = []
+        tasks = [task for status in ACTIVE_STATUSES for task in self.list(status=status)]
+        for task in tasks:
+            owner = task.get("owner")
+            if owner == self.owner:
+                continue
+            pid = str(owner or "0").split(":")[0]
+            if not pid.isdigit() or int(pid) == os.getpid() or not _process_alive(int(pid)):
+                orphans.append(task)
+        return orphans
+
+    def evict_expired(self, force: bool = False) -> int:
+        """清除超过保留期的已结束任务和已暂停任务，返回清除的任务数"""
+        now = time.time()
+        if not (self.ttl or self.paused_ttl) or (not force and now - self._last_evict < self.evict_interval):
+            return 0
+        self._last_evict = now
+        evicted = 0
+        paused = []
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if self.ttl:
+                    evicted += conn.execute(
+                        "DELETE FROM tasks WHERE finished_at IS NOT NULL AND finished_at < ?", (now - self.ttl,)
+                    ).rowcount
+                if self.paused_ttl:
+                    rows = conn.execute(
+                        "SELECT task_id, status, book_name, batch_id, data FROM tasks"
+                        " WHERE status = ? AND updated_at < ?", (PAUSED_STATUS, now - self.paused_ttl),
+                    ).fetchall()
+                    paused = [self._row_to_task(row) for row in rows]
+                    conn.executemany("DELETE FROM tasks WHERE task_id = ?", [(task["task_id"],) for task in paused])
+                    evicted += len(paused)
+        if self.on_evict_paused is not None:
+            for task in paused:
+                self.on_evict_paused(task)
+        return evicted
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # isolation_level=None：事务由 with conn / BEGIN IMMEDIATE 显式控制
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _insert(self, conn: sqlite3.Connection, task_id: str, fields: Dict[str, Any]) -> None:
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, status, book_name, batch_id, created_at, updated_at,"
+            " finished_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (task_id, fields["status"], fields.get("book_name"), fields.get("batch_id"), now, now,
+             now if fields["status"] in FINISHED_STATUSES else None, self._dumps(fields)),
+        )
+
+    @staticmethod
+    def _dumps(fields: Dict[str, Any]) -> str:
+        data = {key: value for key, value in fields.items() if key not in _COLUMNS and key != "task_id"}
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _row_to_task(row) -> Dict[str, Any]:
+        task_id, status, book_name, batch_id, data = row
+        task = json.loads(data)
+        task.update(task_id=task_id, status=status, book_name=book_name)
+        if batch_id is not None:
+            task["batch_id"] = batch_id
+        return task
+
+
+def _process_alive(pid: int) -> bool:
+    """进程是否仍在运行；无法判断时（非 POSIX 系统）视为仍在运行"""
+    if pid <= 0:
+        return False
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
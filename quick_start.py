@@ -27,6 +27,8 @@ from config import (
     TEMP_CLEANUP_PATTERNS
 )
 from book_crawler.config import get_catalog_output_file, get_search_output_file
+from book_crawler.search_cache import search_cache
+from book_crawler.catalog_index import open_catalog_index, CatalogIndex
 
 # 确保临时目录存在
 os.makedirs(TEMP_OUTPUT_DIRECTORY, exist_ok=True)
@@ -88,46 +90,49 @@ def search_novel(keyword: str) -> List[Dict[str, Any]]:
     print(f"正在搜索小说: {keyword}...")
     
     # 检查是否已有搜索结果
-    search_output_file = get_search_output_file(keyword)
-    if os.path.exists(search_output_file):
-        with open(search_output_file, "r", encoding="utf-8") as f:
-            print(f"找到缓存的搜索结果")
-            return json.load(f)
+    cached = search_cache.get(keyword)
+    if cached is not None:
+        print(f"找到缓存的搜索结果")
+        return cached
     
     # 执行搜索爬虫
     try:
+        search_output_file = get_search_output_file(keyword)
+        if os.path.exists(search_output_file):
+            os.remove(search_output_file)
         run_scrapy_spider("search", ["-a", f"keyword={keyword}"])
         
         if os.path.exists(search_output_file):
             with open(search_output_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+                results = json.load(f)
+            search_cache.put(keyword, results)
+            return results
         else:
+            search_cache.put(keyword, [])
             print("搜索完成，但未找到结果")
             return []
     except Exception as e:
         print(f"搜索失败: {str(e)}")
         return []
 
-def get_novel_catalog(novel_url: str, book_name: str) -> Optional[Dict[str, Any]]:
+def get_novel_catalog(novel_url: str, book_name: str) -> Optional[CatalogIndex]:
     """
-    获取小说目录
+    获取小说目录（目录索引，按章节范围读取）
     """
     print(f"正在获取《{book_name}》的目录...")
     
     # 检查是否已有目录结果
     catalog_file = get_catalog_output_file(book_name)
     if os.path.exists(catalog_file):
-        with open(catalog_file, "r", encoding="utf-8") as f:
-            print(f"找到缓存的目录结果")
-            return json.load(f)
+        print(f"找到缓存的目录结果")
+        return open_catalog_index(catalog_file)
     
     # 执行目录爬虫
     try:
         run_scrapy_spider("catalog", ["-a", f"novel_url={novel_url}", "-a", f"keyword={book_name}"])
         
         if os.path.exists(catalog_file):
-            with open(catalog_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return open_catalog_index(catalog_file)
         else:
             print("获取目录完成，但未找到结果")
             return None
@@ -234,16 +239,16 @@ def main():
         novel_url = selected_novel['url_list']
         
         # 4. 获取目录
-        catalog_data = get_novel_catalog(novel_url, book_name)
-        if not catalog_data:
+        catalog_index = get_novel_catalog(novel_url, book_name)
+        if catalog_index is None:
             continue
         
-        chapters = catalog_data.get('chapters', [])
-        if not chapters:
+        chapter_count = len(catalog_index)
+        if not chapter_count:
             print("未找到章节信息")
             continue
         
-        print(f"\n《{book_name}》共有 {len(chapters)} 章")
+        print(f"\n《{book_name}》共有 {chapter_count} 章")
         
         # 5. 选择下载范围
         while True:
@@ -261,12 +266,12 @@ def main():
                 end_chapter = int(end_chapter)
                 
                 if end_chapter == -1:
-                    end_chapter = len(chapters)
+                    end_chapter = chapter_count
                 
-                if 1 <= start_chapter <= end_chapter <= len(chapters):
+                if 1 <= start_chapter <= end_chapter <= chapter_count:
                     break
                 else:
-                    print(f"请输入有效的章节范围 (1-{len(chapters)})")
+                    print(f"请输入有效的章节范围 (1-{chapter_count})")
             except ValueError:
                 print("请输入有效的数字")
         